@@ -0,0 +1,5 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+__author__ = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
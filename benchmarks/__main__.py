@@ -0,0 +1,333 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import subprocess
+from pathlib import Path
+from typing import List
+from typing import Dict
+from typing import Callable
+
+from trigger import TriggerDB
+from trigger import __version__
+from trigger.predicates import col
+from trigger.utils import RESET_COLOR_CODE
+from trigger.utils import ORANGE_COLOR_CODE
+from trigger.utils import GREEN_COLOR_CODE
+from trigger.utils import RED_COLOR_CODE
+from benchmarks.server import PASSWORD
+
+__author__ = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# accounts of the synthetic data used by the cases
+EMAILS = ['DE000000', 'DE000001', 'DE000002', 'DE000003']
+
+# benchmark cases as name -> function of the database returning the number of records
+CASES: Dict[str, Callable[[TriggerDB], int]] = {}
+
+def case (name: str):
+  '''
+  Register a benchmark case
+  '''
+  def _register (func):
+    CASES[name] = func
+    return func
+  return _register
+
+@case('select')
+def _select (db: TriggerDB) -> int:
+  return len(db.select('myair', where={'email': '=DE000000'}, limit=10_000))
+
+@case('select_stream')
+def _select_stream (db: TriggerDB) -> int:
+  return sum(1 for _ in db.select('myair', where={'email': '=DE000000'}, limit=10_000, stream=True))
+
+@case('select_columnar')
+def _select_columnar (db: TriggerDB) -> int:
+  return len(db.select('myair', where={'email': '=DE000000'}, limit=10_000, columnar=True))
+
+@case('fetch')
+def _fetch (db: TriggerDB) -> int:
+  return len(
+    db.from_('myair')
+      .select('email', 'day', 'hour', 'pm25')
+      .where(col('email') == 'DE000001', col('hour').between(8, 18))
+      .order_by('pm25')
+      .limit(10_000)
+      .fetch()
+  )
+
+@case('paginate')
+def _paginate (db: TriggerDB) -> int:
+  return sum(1 for _ in db.iter_select('ecg', where={'email': '=DE000002'}, page_size=2_000))
+
+@case('parallel')
+def _parallel (db: TriggerDB) -> int:
+  where = {'year': '=2025', 'month': '=9', 'email': '=DE000003'}
+  return len(db.parallel_select('ppg', where=where, workers=8, shard='day'))
+
+@case('fan_out')
+def _fan_out (db: TriggerDB) -> int:
+  where = col('email').isin(EMAILS) & (col('hour') < 6)
+  return len(db.select('smartwatchlow', where=where, limit=10_000))
+
+@case('accounts')
+def _accounts (db: TriggerDB) -> int:
+  query = db.from_('sleep').select('email', 'day', 'hour', 'sleepquality').limit(10_000)
+  return sum(len(res.rows) for res in db.fetch_for_accounts(query, emails=EMAILS, workers=4))
+
+def percentile (values: List[float], q: float) -> float:
+  '''
+  Get the percentile of the values, with linear interpolation
+
+  Parameters
+  ----------
+  values: list
+    Measures
+
+  q: float
+    Percentile in [0, 100]
+
+  Returns
+  -------
+  value: float
+    Percentile of the measures
+  '''
+  values = sorted(values)
+  pos = (len(values) - 1) * q / 100
+  lo = int(pos)
+  hi = min(lo + 1, len(values) - 1)
+  return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+def measure (func: Callable[[], int], repeat: int, warmup: int = 1) -> dict:
+  '''
+  Measure the throughput, the latency and the peak memory
+  of the function
+
+  Parameters
+  ----------
+  func: Callable
+    Function to measure, returning the number of records
+
+  repeat: int
+    Number of timed executions
+
+  warmup: int (default := 1)
+    Number of executions discarded before the measures
+
+  Returns
+  -------
+  stats: dict
+    Records, rows/sec, p50/p99 latency (ms) and peak of the
+    traced memory (MiB)
+  '''
+  for _ in range(warmup):
+    func()
+
+  latencies, rows = [], 0
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    rows += func()
+    latencies.append(time.perf_counter() - tic)
+
+  # the tracing slows down the execution, so it is not timed
+  tracemalloc.start()
+  try:
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+
+  return {
+    'rows': rows // repeat,
+    'repeat': repeat,
+    'rows_per_sec': rows / sum(latencies),
+    'p50_ms': percentile(latencies, 50) * 1e3,
+    'p99_ms': percentile(latencies, 99) * 1e3,
+    'peak_mib': peak / 2 ** 20,
+  }
+
+def measure_startup (repeat: int) -> dict:
+  '''
+  Measure the time of the import of the package in a new interpreter
+
+  Parameters
+  ----------
+  repeat: int
+    Number of timed executions
+
+  Returns
+  -------
+  stats: dict
+    p50/p99 latency (ms) of the import
+  '''
+  cmd = [sys.executable, '-c', 'import trigger']
+  latencies = []
+  for _ in range(repeat + 1):
+    tic = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    latencies.append(time.perf_counter() - tic)
+  # the first execution fills the caches of the filesystem
+  latencies = latencies[1:]
+  return {
+    'rows': 0,
+    'repeat': repeat,
+    'rows_per_sec': None,
+    'p50_ms': percentile(latencies, 50) * 1e3,
+    'p99_ms': percentile(latencies, 99) * 1e3,
+    'peak_mib': None,
+  }
+
+def git_commit () -> str:
+  '''
+  Get the current commit of the repository, if any
+  '''
+  try:
+    res = subprocess.run(
+      ['git', 'rev-parse', '--short', 'HEAD'],
+      capture_output=True, text=True, check=True,
+      cwd=Path(__file__).resolve().parent,
+    )
+    return res.stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def compare (results: dict, baseline: dict, threshold: float) -> List[str]:
+  '''
+  Compare the results with a baseline
+
+  Parameters
+  ----------
+  results: dict
+    Current results
+
+  baseline: dict
+    Results of the reference run
+
+  threshold: float
+    Maximum relative slowdown
+
+  Returns
+  -------
+  regressions: list
+    Description of the regressions
+  '''
+  if results['dataset'] != baseline['dataset']:
+    print(
+      f'{ORANGE_COLOR_CODE}[WARN]{RESET_COLOR_CODE} The baseline uses a different dataset: '
+      'the measures are not comparable',
+      file=sys.stderr
+    )
+
+  regressions = []
+  for name, stats in results['cases'].items():
+    base = baseline['cases'].get(name)
+    if base is None:
+      continue
+    if stats['rows_per_sec'] and base['rows_per_sec']:
+      change = stats['rows_per_sec'] / base['rows_per_sec'] - 1
+      if change < -threshold:
+        regressions.append(f'{name}: rows/sec {change:+.1%}')
+    change = stats['p50_ms'] / base['p50_ms'] - 1
+    if change > threshold:
+      regressions.append(f'{name}: p50 latency {change:+.1%}')
+  return regressions
+
+def parse_args ():
+  '''
+  Parse the command line arguments of the benchmarks
+  '''
+  parser = argparse.ArgumentParser(
+    prog='benchmarks',
+    description='Benchmarks of the pyTrigger queries against a local mock of the Trigger server.',
+  )
+  parser.add_argument(
+    '--cases', '-c',
+    nargs='+',
+    choices=list(CASES) + ['startup'],
+    default=list(CASES) + ['startup'],
+    help='Benchmark cases to run (default to all)',
+  )
+  parser.add_argument('--repeat', '-r', type=int, default=10, help='Number of timed executions of each case')
+  parser.add_argument('--days', type=int, default=7, help='Number of days of the synthetic data')
+  parser.add_argument('--output', '-o', type=str, default=None, help='JSON file of the results')
+  parser.add_argument('--baseline', '-b', type=str, default=None, help='JSON file of the results to compare with')
+  parser.add_argument(
+    '--threshold', '-t',
+    type=float,
+    default=0.1,
+    help='Maximum relative slowdown with respect to the baseline (default to 0.1)',
+  )
+  return parser.parse_args()
+
+def main ():
+  args = parse_args()
+  dataset = {'users': len(EMAILS), 'days': args.days, 'step': 60, 'seed': 42}
+
+  # the server runs in another process, so it does not compete for the GIL
+  server = subprocess.Popen(
+    [sys.executable, '-m', 'benchmarks.server'] + [f'--{key}={val}' for key, val in dataset.items()],
+    stdout=subprocess.PIPE,
+    text=True,
+    cwd=Path(__file__).resolve().parent.parent,
+  )
+  try:
+    url = server.stdout.readline().strip()
+    cfg = {'email': 'DE000000', 'password': PASSWORD}
+    results = {
+      'commit': git_commit(),
+      'version': __version__,
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+      'dataset': dataset,
+      'cases': {},
+    }
+
+    with TriggerDB(cfg=cfg, host=url, spinner=False, logout=False) as db:
+      for name in args.cases:
+        if name == 'startup':
+          continue
+        results['cases'][name] = measure(lambda: CASES[name](db), repeat=args.repeat)
+        _report(name, results['cases'][name])
+    if 'startup' in args.cases:
+      results['cases']['startup'] = measure_startup(repeat=args.repeat)
+      _report('startup', results['cases']['startup'])
+  finally:
+    server.terminate()
+    server.wait()
+
+  if args.output is not None:
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    print(f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Results saved to {args.output}')
+
+  if args.baseline is not None:
+    baseline = json.loads(Path(args.baseline).read_text())
+    regressions = compare(results, baseline, threshold=args.threshold)
+    for reg in regressions:
+      print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Regression of {reg} against {baseline.get("commit")}')
+    if regressions:
+      exit(1)
+    print(f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} No regressions against {baseline.get("commit")}')
+
+def _report (name: str, stats: dict):
+  '''
+  Print the measures of a benchmark case
+  '''
+  rate = f'{stats["rows_per_sec"]:>12,.0f} rows/s' if stats['rows_per_sec'] else ' ' * 19
+  peak = f'{stats["peak_mib"]:8.1f} MiB' if stats['peak_mib'] is not None else ''
+  print(
+    f'{name:<16} {stats["rows"]:>8} rows {rate} '
+    f'p50 {stats["p50_ms"]:8.1f} ms  p99 {stats["p99_ms"]:8.1f} ms {peak}',
+    flush=True
+  )
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,332 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import re
+import json
+import uuid
+import random
+import threading
+from functools import partial
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer
+from http.server import BaseHTTPRequestHandler
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Callable
+
+from trigger.db import TriggerDB
+from trigger._timerange import TIME_COLUMNS
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'PASSWORD',
+  'MockServer',
+  'generate_tables',
+]
+
+# password accepted for every account
+PASSWORD = 'benchmark'
+
+# condition as column, operator and value
+_CONDITION = re.compile(r'^([A-Za-z_]\w*)(>=|<=|!=|=|>|<)(.*)$')
+# aggregated column as FUNC(column)
+_AGGREGATE = re.compile(r'^([A-Z]+)\((\w+|\*)\)$', re.IGNORECASE)
+# columns stored as strings
+_STRING_COLUMNS = {'email', 'created_at', 'last_login'}
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+  '=': lambda a, b: a == b,
+  '!=': lambda a, b: a != b,
+  '>': lambda a, b: a > b,
+  '<': lambda a, b: a < b,
+  '>=': lambda a, b: a >= b,
+  '<=': lambda a, b: a <= b,
+}
+
+_AGGREGATES: Dict[str, Callable[[list], Any]] = {
+  'COUNT': len,
+  'SUM': lambda vals: sum(vals) if vals else None,
+  'AVG': lambda vals: sum(vals) / len(vals) if vals else None,
+  'MIN': lambda vals: min(vals) if vals else None,
+  'MAX': lambda vals: max(vals) if vals else None,
+}
+
+def generate_tables (users: int = 4, days: int = 7, step: int = 60, seed: int = 42) -> Dict[str, List[dict]]:
+  '''
+  Generate the synthetic records of all the tables of the
+  Trigger APIs.
+  The same parameters always give the same records, so the
+  measures are comparable among different runs
+
+  Parameters
+  ----------
+  users: int (default := 4)
+    Number of accounts
+
+  days: int (default := 7)
+    Number of days of the recordings, starting from 2025-09-01
+
+  step: int (default := 60)
+    Seconds between two consecutive records of an account
+
+  seed: int (default := 42)
+    Seed of the random values
+
+  Returns
+  -------
+  tables: dict
+    Records of each table
+  '''
+  rng = random.Random(seed)
+  emails = [f'DE{idx:06d}' for idx in range(users)]
+  tables = {}
+
+  for table, columns in TriggerDB._available_tables.items():
+    if table == 'accounts':
+      tables[table] = [
+        {'id': idx, 'email': email, 'created_at': '2025-01-01', 'last_login': '2025-09-01'}
+        for idx, email in enumerate(emails)
+      ]
+      continue
+
+    measures = [col for col in columns if col not in TIME_COLUMNS and col not in ('email', 'userId')]
+    rows = []
+    for idx, email in enumerate(emails):
+      for seconds in range(0, days * 86_400, step):
+        day, rest = divmod(seconds, 86_400)
+        row = {
+          'email': email,
+          'userId': idx,
+          'year': 2025,
+          'month': 9,
+          'day': 1 + day,
+          'hour': rest // 3600,
+          'minute': rest % 3600 // 60,
+          'second': rest % 60,
+        }
+        if 'microsecond' in columns:
+          row['microsecond'] = 0
+        for col in measures:
+          row[col] = round(rng.random() * 100, 3)
+        rows.append(row)
+    tables[table] = rows
+
+  return tables
+
+def _value (column: str, value: str):
+  '''
+  Convert the value of the condition to the type of the column
+  '''
+  if column in _STRING_COLUMNS:
+    return value
+  try:
+    return float(value)
+  except ValueError:
+    return value
+
+def _handle_select (records: List[dict], by_email: Dict[str, List[dict]], query: Dict[str, str]) -> List[dict]:
+  '''
+  Evaluate the query on the records of the table, as the
+  Trigger server does (conditions in conjunction, ordering
+  by multiple columns, limit and aggregated functions).
+  The records of an account are looked up by email, as an
+  index of the database would do
+  '''
+  conditions: List[Tuple[str, Callable, Any]] = []
+  for cond in filter(None, query.get('where', '').split(',')):
+    column, op, value = _CONDITION.match(cond).groups()
+    conditions.append((column, _OPERATORS[op], _value(column, value)))
+    if column == 'email' and op == '=':
+      records = by_email.get(value, [])
+
+  rows = [
+    row for row in records
+    if all(column in row and op(row[column], value) for column, op, value in conditions)
+  ]
+  select = query.get('select', '*').split(',')
+
+  aggregates = [_AGGREGATE.match(col) for col in select]
+  if all(aggregates) and aggregates:
+    res = {}
+    for col, match in zip(select, aggregates):
+      func, column = match.group(1).upper(), match.group(2)
+      values = rows if column == '*' else [row[column] for row in rows]
+      res[col] = _AGGREGATES[func](values)
+    return [res]
+
+  if query.get('orderBy'):
+    keys = query['orderBy'].split(',')
+    rows.sort(key=lambda row: tuple(row[key] for key in keys), reverse=query.get('order', 'ASC') == 'DESC')
+  rows = rows[:int(query.get('limit', 100))]
+  select = list(rows[0].keys()) if select == ['*'] and rows else select
+  return [{col: row[col] for col in select} for row in rows]
+
+class _Handler (BaseHTTPRequestHandler):
+  '''
+  Handler of the requests of the mock server
+  '''
+
+  protocol_version = 'HTTP/1.1'
+
+  def __init__ (self, server_state: 'MockServer', *args, **kwargs):
+    self.state = server_state
+    super().__init__(*args, **kwargs)
+
+  def log_message (self, format, *args):
+    pass
+
+  def _send (self, status: int, body: str, content_type: str = 'text/plain'):
+    payload = body.encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def do_POST (self):
+    size = int(self.headers.get('Content-Length', 0))
+    data = {key: vals[0] for key, vals in parse_qs(self.rfile.read(size).decode('utf-8')).items()}
+    path = urlparse(self.path).path.rstrip('/')
+
+    if path.endswith('/auth'):
+      if data.get('password') != PASSWORD:
+        return self._send(401, 'Invalid credentials')
+      token = uuid.uuid4().hex
+      with self.state.lock:
+        self.state.tokens.add(token)
+      return self._send(200, token)
+
+    if path.endswith('/logout'):
+      with self.state.lock:
+        self.state.tokens.discard(data.get('token'))
+      return self._send(200, 'Logout success')
+
+    self._send(404, 'Not found')
+
+  def do_GET (self):
+    url = urlparse(self.path)
+    query = {key: vals[0] for key, vals in parse_qs(url.query).items()}
+    table = url.path.rstrip('/').rsplit('/', 1)[-1]
+
+    if self.headers.get('token') not in self.state.tokens:
+      return self._send(401, 'Unauthorized')
+    if table not in self.state.tables:
+      return self._send(404, 'Not found')
+
+    with self.state.lock:
+      self.state.requests += 1
+    try:
+      rows = _handle_select(self.state.tables[table], self.state.by_email[table], query)
+    except (AttributeError, KeyError, ValueError) as e:
+      return self._send(400, f'Invalid query: {e}')
+    self._send(200, json.dumps(rows), content_type='application/json')
+
+class MockServer (object):
+  '''
+  Local stand-in of the Trigger server APIs, speaking the
+  same /auth, /logout and /<table>/ protocol over synthetic
+  records of all the tables.
+
+  Parameters
+  ----------
+  port: int (default := 0)
+    Port of the server. If 0, a free port is used
+
+  **kwargs: dict
+    Parameters of the synthetic records (see generate_tables)
+
+  Examples
+  --------
+  Example of queries against the local server::
+
+    from trigger import TriggerDB
+    from benchmarks.server import MockServer, PASSWORD
+
+    with MockServer(users=2, days=1) as server:
+      with TriggerDB(cfg={'email': 'DE000000', 'password': PASSWORD}, host=server.url) as db:
+        res = db.select('myair', limit=10)
+  '''
+
+  def __init__ (self, port: int = 0, **kwargs):
+    self.tables = generate_tables(**kwargs)
+    self.by_email = {
+      table: {email: [row for row in rows if row['email'] == email] for email in {row['email'] for row in rows}}
+      for table, rows in self.tables.items()
+    }
+    self.tokens = set()
+    self.requests = 0
+    self.lock = threading.Lock()
+    self._server = ThreadingHTTPServer(('127.0.0.1', port), partial(_Handler, self))
+    self._server.daemon_threads = True
+    self._thread = None
+
+  @property
+  def url (self) -> str:
+    '''
+    Base url of the APIs
+    '''
+    host, port = self._server.server_address[:2]
+    return f'http://{host}:{port}/api'
+
+  def start (self):
+    '''
+    Serve the requests in a background thread
+    '''
+    self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    self._thread.start()
+    return self
+
+  def serve_forever (self):
+    '''
+    Serve the requests in the current thread
+    '''
+    self._server.serve_forever()
+
+  def stop (self):
+    '''
+    Stop the server and release the port
+    '''
+    if self._thread is not None:
+      self._server.shutdown()
+      self._thread.join()
+      self._thread = None
+    self._server.server_close()
+
+  def __enter__ (self):
+    return self.start()
+
+  def __exit__ (self, exc_type, exc_value, traceback):
+    self.stop()
+
+def main ():
+  import argparse
+
+  parser = argparse.ArgumentParser(
+    prog='benchmarks.server',
+    description='Local stand-in of the Trigger server APIs with synthetic records.',
+  )
+  parser.add_argument('--port', type=int, default=0, help='Port of the server (default to a free port)')
+  parser.add_argument('--users', type=int, default=4, help='Number of accounts')
+  parser.add_argument('--days', type=int, default=7, help='Number of days of the recordings')
+  parser.add_argument('--step', type=int, default=60, help='Seconds between two consecutive records')
+  parser.add_argument('--seed', type=int, default=42, help='Seed of the random values')
+  args = parser.parse_args()
+
+  server = MockServer(port=args.port, users=args.users, days=args.days, step=args.step, seed=args.seed)
+  # the url is the first line of the output
+  print(server.url, flush=True)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.stop()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import threading
+import pytest
+from trigger import AsyncTriggerDB
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+CFG = {'email': 'DE000000', 'password': PASSWORD}
+
+@pytest.fixture(scope='module')
+def server ():
+  '''
+  Local mock of the server
+  '''
+  with MockServer(users=3, days=1, step=600) as server:
+    yield server
+
+class TestAsyncTriggerDB:
+  '''
+  Test the asynchronous interface
+  '''
+
+  def test_context_manager (self, server):
+    '''
+    Test the login and the logout of the context manager and
+    the queries out of it
+    '''
+    async def main ():
+      db = AsyncTriggerDB(cfg=CFG, host=server.url)
+      with pytest.raises(RuntimeError, match='Login required'):
+        await db.accounts()
+      with pytest.raises(RuntimeError, match='Login required'):
+        await db.select('myair', limit=10)
+      with pytest.raises(RuntimeError, match='Login required'):
+        async for _ in db.iter_select('myair'):
+          pass
+
+      async with db:
+        assert len(server.tokens) == 1
+        assert len(await db.accounts()) == 3
+        rows = await db.from_('myair').where(email='=DE000001').limit(10).fetch()
+        assert len(rows) == 10
+        rows = [row async for row in db.iter_select('ecg', columns=['email', 'ecg'], page_size=100)]
+        assert len(rows) == 432
+
+      assert not server.tokens
+      with pytest.raises(RuntimeError, match='Login required'):
+        await db.select('myair', limit=10)
+
+    asyncio.run(main())
+
+  def test_concurrency (self, server):
+    '''
+    Test the number of requests in flight is bounded
+    '''
+    lock = threading.Lock()
+    flight = {'now': 0, 'max': 0}
+
+    async def main ():
+      async with AsyncTriggerDB(cfg=CFG, host=server.url, max_concurrency=3) as db:
+        request = db._client._request
+
+        def _request (*args, **kwargs):
+          with lock:
+            flight['now'] += 1
+            flight['max'] = max(flight['max'], flight['now'])
+          try:
+            time.sleep(0.02)
+            return request(*args, **kwargs)
+          finally:
+            with lock:
+              flight['now'] -= 1
+
+        db._client._request = _request
+        return await asyncio.gather(*(
+          db.select('myair', where={'email': f'=DE00000{idx % 3}'}, limit=5)
+          for idx in range(12)
+        ))
+
+    results = asyncio.run(main())
+    assert len(results) == 12 and all(len(rows) == 5 for rows in results)
+    assert 1 < flight['max'] <= 3
+
+    with pytest.raises(ValueError):
+      AsyncTriggerDB(max_concurrency=0)
+
+  def test_cancel_iteration (self, server):
+    '''
+    Test the cancellation of the iteration while the records
+    are consumed in the pool of threads
+    '''
+    def slow_rows ():
+      for idx in range(10):
+        time.sleep(0.05)
+        yield {'idx': idx}
+
+    rows = slow_rows()
+
+    async def main ():
+      async with AsyncTriggerDB(cfg=CFG, host=server.url) as db:
+        async def consume ():
+          async for _ in db._iter_rows(rows, batch=10):
+            pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+          await task
+
+    asyncio.run(main())
+    # the generator is closed after the pending call
+    assert rows.gi_frame is None
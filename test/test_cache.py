@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+from trigger import QueryCache
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestQueryCache:
+  '''
+  Test the on-disk cache of the query results
+  '''
+
+  def test_hit_and_miss (self, tmp_path):
+    '''
+    Test the retrieval of the stored results
+    '''
+    cache = QueryCache(path=tmp_path)
+    params = {'select': 'pm25', 'where': 'year=2025,month=9', 'limit': 100}
+
+    assert cache.get('myair', params) is None
+    cache.put('myair', params, [{'pm25': 1.}])
+    # the order of the conditions is normalized
+    swapped = dict(params, where='month=9,year=2025')
+    assert cache.get('myair', swapped) == [{'pm25': 1.}]
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+  def test_expiration (self, tmp_path):
+    '''
+    Test the time-to-live of the results of the current day
+    and the persistence of the past ones
+    '''
+    cache = QueryCache(path=tmp_path, ttl=-1)
+    past = {'select': 'pm25', 'where': 'year=2020,month=1,day=1', 'limit': 100}
+    today = {'select': 'pm25', 'where': 'email=DE000086', 'limit': 100}
+
+    cache.put('myair', past, [])
+    cache.put('myair', today, [])
+    assert cache.get('myair', past) == []
+    assert cache.get('myair', today) is None
+
+  def test_eviction (self, tmp_path):
+    '''
+    Test the removal of the least recently used entries
+    '''
+    rows = [{'pm25': float(i)} for i in range(100)]
+    cache = QueryCache(path=tmp_path, max_bytes=5000)
+
+    for i in range(10):
+      cache.put('myair', {'limit': i}, rows)
+
+    assert cache.stats()['bytes'] <= 5000
+    assert cache.get('myair', {'limit': 9}) == rows
+    assert cache.get('myair', {'limit': 0}) is None
+
+  def test_scope (self, tmp_path):
+    '''
+    Test the results of different servers and accounts are not shared
+    '''
+    cache = QueryCache(path=tmp_path)
+    params = {'select': 'pm25', 'limit': 100}
+
+    cache.put('myair', params, [{'pm25': 1.}], scope='http://localhost|DE000000')
+    assert cache.get('myair', params, scope='http://localhost|DE000000') == [{'pm25': 1.}]
+    assert cache.get('myair', params, scope='http://localhost|DE000001') is None
+    assert cache.get('myair', params, scope='http://127.0.0.1|DE000000') is None
+    assert cache.get('myair', params) is None
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import io
+import sys
+import json
+import pytest
+import trigger
+from functools import partial
+from trigger import TriggerDB
+from trigger.__main__ import main
+from trigger.__main__ import export_query
+from trigger.__main__ import load_batch
+from trigger.__main__ import parse_where
+from trigger.predicates import Condition
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+CFG = {'email': 'DE000000', 'password': PASSWORD}
+
+@pytest.fixture(scope='module')
+def server ():
+  '''
+  Local mock of the server
+  '''
+  with MockServer(users=2, days=1, step=600) as server:
+    yield server
+
+@pytest.fixture(scope='module')
+def db (server):
+  '''
+  Database connected to the local mock of the server
+  '''
+  with TriggerDB(cfg=CFG, host=server.url, spinner=False) as db:
+    yield db
+
+class TestCli:
+  '''
+  Test the parsing of the queries of the command line
+  '''
+
+  def test_parse_where (self):
+    '''
+    Test the conditions as strings and dictionary
+    '''
+    assert parse_where(None) == []
+    assert parse_where(['hour>=8', 'hour<12']) == [Condition('hour', '>=8'), Condition('hour', '<12')]
+    assert parse_where('email=DE000086') == [Condition('email', '=DE000086')]
+    assert parse_where({'email': '=DE000086'}) == [Condition('email', '=DE000086')]
+
+  def test_load_batch (self, tmp_path):
+    '''
+    Test the specifications of the batch file
+    '''
+    path = tmp_path / 'queries.jsonl'
+    path.write_text(
+      '{"table": "myair", "select": ["hour", "pm25"], "limit": 10}\n'
+      '\n'
+      '{"table": "ecg", "where": {"email": "=DE000086"}, "output": "ecg.csv"}\n'
+    )
+    specs = load_batch(str(path))
+    assert [spec['table'] for spec in specs] == ['myair', 'ecg']
+
+    path.write_text('{"table": "myair", "columns": ["hour"]}\n')
+    with pytest.raises(ValueError, match='unknown keys'):
+      load_batch(str(path))
+
+    path.write_text('{"select": ["hour"]}\n')
+    with pytest.raises(ValueError, match='line 1'):
+      load_batch(str(path))
+
+  def test_export_aggregate (self, db):
+    '''
+    Test the export of the aggregated functions, which are not
+    paginated, for the command line and the batch queries
+    '''
+    out = io.StringIO()
+    # trigger -t myair -s 'COUNT(*)' -w email=DE000001
+    spec = {'table': 'myair', 'select': ['COUNT(*)'], 'where': ['email=DE000001'], 'orderby': None, 'limit': None}
+    assert export_query(db, spec, out, 'json') == 1
+    assert json.loads(out.getvalue()) == [{'COUNT(*)': 144}]
+
+    out = io.StringIO()
+    spec = {'table': 'myair', 'select': 'AVG(pm25)', 'where': {'hour': '<6'}}
+    assert export_query(db, spec, out, 'ndjson') == 1
+    assert 'AVG(pm25)' in json.loads(out.getvalue())
+
+    out = io.StringIO()
+    spec = {'table': 'myair', 'select': ['hour', 'pm25'], 'limit': 250}
+    assert export_query(db, spec, out, 'csv') == 250
+
+  def test_main (self, server, tmp_path, monkeypatch):
+    '''
+    Test the output file of the command line is removed when
+    the query fails and the exit code of the batch queries
+    '''
+    monkeypatch.setattr(trigger, 'TriggerDB', partial(TriggerDB, cfg=CFG, host=server.url))
+
+    path = tmp_path / 'out.csv'
+    monkeypatch.setattr(sys, 'argv', ['trigger', '-t', 'myair', '-s', 'hour', '-l', '5', '--output', str(path), '-q'])
+    main()
+    assert len(path.read_text().splitlines()) == 6
+
+    monkeypatch.setattr(sys, 'argv', ['trigger', '-t', 'myair', '-s', 'unknown', '--output', str(path), '-q'])
+    with pytest.raises(ValueError):
+      main()
+    assert not path.exists()
+
+    batch = tmp_path / 'queries.jsonl'
+    batch.write_text('{"table": "myair", "select": ["unknown"]}\n')
+    monkeypatch.setattr(sys, 'argv', ['trigger', '--batch', str(batch), '--output', str(tmp_path), '-q'])
+    with pytest.raises(SystemExit) as status:
+      main()
+    assert status.value.code == 1
+    assert not (tmp_path / 'queries_1.json').exists()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import pytest
+from trigger import TriggerDB
+from trigger import _credentials
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+@pytest.fixture
+def config_dir (tmp_path, monkeypatch):
+  '''
+  Move the configuration files in a temporary directory
+  '''
+  monkeypatch.setattr(_credentials, 'CONFIG_DIR', tmp_path)
+  monkeypatch.setattr(_credentials, 'CONFIG_FILE', tmp_path / 'credentials.json')
+  monkeypatch.setattr(_credentials, 'KEY_FILE', tmp_path / 'secret.key')
+  monkeypatch.setattr(_credentials, 'TOKEN_FILE', tmp_path / 'token.json')
+  return tmp_path
+
+class TestTokenCache:
+  '''
+  Test the cache of the session tokens
+  '''
+
+  def test_store_and_load (self, config_dir):
+    '''
+    Test the token is stored encrypted and loaded back
+    '''
+    _credentials._store_token('DE000086', 'secret-token', ttl=60)
+
+    assert 'secret-token' not in (config_dir / 'token.json').read_text()
+    assert _credentials._load_token('DE000086') == 'secret-token'
+    assert _credentials._load_token('DE000087') is None
+
+  def test_expiration (self, config_dir):
+    '''
+    Test the expired tokens are not re-used
+    '''
+    _credentials._store_token('DE000086', 'secret-token', ttl=-1)
+    assert _credentials._load_token('DE000086') is None
+
+  def test_clear (self, config_dir):
+    '''
+    Test the removal of the token
+    '''
+    _credentials._store_token('DE000086', 'secret-token', ttl=60)
+    _credentials._clear_token('DE000086')
+    assert _credentials._load_token('DE000086') is None
+
+  def test_concurrent_store (self, config_dir):
+    '''
+    Test the tokens stored by concurrent processes are not lost
+    '''
+    context = multiprocessing.get_context('fork')
+    workers = [
+      context.Process(target=lambda idx=idx: [_credentials._store_token(f'DE{idx}{i:04d}', 'token', ttl=60) for i in range(20)])
+      for idx in range(4)
+    ]
+    for worker in workers:
+      worker.start()
+    for worker in workers:
+      worker.join()
+
+    assert len(_credentials._read_tokens()) == 80
+
+  def test_reuse (self, config_dir):
+    '''
+    Test the cached token is not logged out on exit and it is
+    re-used by the next connection
+    '''
+    cfg = {'email': 'DE000000', 'password': PASSWORD}
+    with MockServer(users=1, days=1, step=3600) as server:
+      with TriggerDB(cfg=cfg, host=server.url, spinner=False, token_cache=True) as db:
+        token = db._token
+      assert server.tokens == {token}
+
+      # the required logout invalidates the token
+      with TriggerDB(cfg=cfg, host=server.url, spinner=False, token_cache=True, logout=True) as db:
+        assert db._token == token
+        assert len(db.accounts()) == 1
+      assert not server.tokens
+      assert _credentials._load_token('DE000000') is None
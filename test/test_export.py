@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from trigger.export import _npy_header
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestExport:
+  '''
+  Test the incremental writing of the .npy files
+  '''
+
+  def test_header_in_place (self, tmp_path):
+    '''
+    Test the header re-written after the data
+    '''
+    np = pytest.importorskip('numpy')
+    dtype = np.dtype([('timestamp', '<i8'), ('ecg', '<f8')])
+    descr = np.lib.format.dtype_to_descr(dtype)
+    samples = np.array([(1, .5), (2, .25), (3, .125)], dtype=dtype)
+
+    header = _npy_header(descr, 0)
+    assert len(header) % 64 == 0
+
+    path = tmp_path / 'signal.npy'
+    with open(path, 'wb') as fp:
+      fp.write(header)
+      fp.write(samples.tobytes())
+      fp.seek(0)
+      fp.write(_npy_header(descr, len(samples), length=len(header)))
+
+    loaded = np.load(path, mmap_mode='r')
+    assert loaded.shape == (3, )
+    assert (loaded == samples).all()
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from trigger import TriggerDB
+from trigger import col
+from trigger.lazy import aggregate
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+np = pytest.importorskip('numpy')
+
+@pytest.fixture(scope='module')
+def db ():
+  '''
+  Database connected to the local mock of the server
+  '''
+  with MockServer(users=3, days=1, step=600) as server:
+    with TriggerDB(cfg={'email': 'DE000000', 'password': PASSWORD}, host=server.url, spinner=False) as db:
+      yield db
+
+class TestLazyFrame:
+  '''
+  Test the lazy queries with pushdown to the server
+  '''
+
+  def test_aggregate (self):
+    '''
+    Test the local aggregation of the groups
+    '''
+    data = {
+      'email': np.array(['b', 'a', 'b', 'a'], dtype=object),
+      'hour': np.array([1, 0, 1, 1]),
+      'pm25': np.array([1., 2., np.nan, 4.]),
+    }
+    res = aggregate(data, keys=['email', 'hour'], aggregates=['COUNT(*)', 'COUNT(pm25)', 'AVG(pm25)', 'MAX(pm25)'])
+    assert list(res['email']) == ['a', 'a', 'b']
+    assert list(res['hour']) == [0, 1, 1]
+    assert list(res['COUNT(*)']) == [1, 1, 2]
+    assert list(res['COUNT(pm25)']) == [1, 1, 1]
+    assert list(res['AVG(pm25)']) == [2., 4., 1.]
+    assert list(res['MAX(pm25)']) == [2., 4., 1.]
+
+    res = aggregate(data, keys=[], aggregates=['SUM(pm25)', 'MIN(pm25)'])
+    assert list(res['SUM(pm25)']) == [7.] and list(res['MIN(pm25)']) == [1.]
+
+  def test_pushdown (self, db):
+    '''
+    Test the aggregated requests of the known groups give the
+    same result of the local aggregation
+    '''
+    frame = (
+      db.lazy('myair')
+        .filter(col('email').isin(['DE000000', 'DE000002']), hour='<6')
+        .groupby('email', 'hour')
+        .agg('COUNT(*)', pm25='AVG', pm10=['MIN', 'MAX'])
+    )
+    assert 'aggregated requests: 12' in frame.explain()
+    remote = frame.collect()
+    local = frame.collect(max_requests=0)
+    assert len(remote) == len(local) == 12
+    assert list(remote['COUNT(*)']) == [6] * 12
+    for column in remote.columns:
+      assert list(remote.to_numpy(column)) == pytest.approx(list(local.to_numpy(column))) \
+        if column != 'email' else list(remote[column]) == list(local[column])
+
+  def test_alternatives (self, db):
+    '''
+    Test the groups of the alternative conditions are not
+    split when the separating column is not a key
+    '''
+    frame = db.lazy('myair').filter(col('email').isin(['DE000000', 'DE000002'])).groupby('hour').agg('COUNT(*)', pm25='AVG')
+    assert 'aggregated requests' not in frame.explain()
+    rs = frame.collect()
+    local = frame.collect(max_requests=0)
+    assert list(rs['hour']) == list(range(24))
+    assert list(rs['COUNT(*)']) == [12] * 24
+    assert list(rs.to_numpy('AVG(pm25)')) == pytest.approx(list(local.to_numpy('AVG(pm25)')))
+
+    # the alternatives separated by a key are still aggregated by the server
+    frame = db.lazy('myair').filter(col('hour').isin([1, 2])).groupby('hour').agg('COUNT(*)')
+    assert 'aggregated requests: 2' in frame.explain()
+    assert list(frame.collect()['COUNT(*)']) == [18, 18]
+
+  def test_local (self, db):
+    '''
+    Test the projection and the conditions evaluated locally
+    '''
+    frame = (
+      db.lazy('myair')
+        .filter(email='=DE000001')
+        .filter(col('pm10') > col('pm25'))
+        .select('hour', 'pm25')
+        .sort('pm25', descending=True)
+        .limit(5)
+    )
+    plan = frame.explain()
+    assert 'select=hour,pm25,pm10 ' in plan and 'local: filter' in plan
+
+    rows = db.select('myair', columns=['hour', 'pm25', 'pm10'], where={'email': '=DE000001'}, limit=1_000)
+    expected = sorted((row['pm25'] for row in rows if row['pm10'] > row['pm25']), reverse=True)[:5]
+    rs = frame.collect()
+    assert rs.columns == ['hour', 'pm25']
+    assert list(rs['pm25']) == expected
+
+    with pytest.raises(ValueError):
+      db.select('myair', where=col('pm10') > col('pm25'))
+    with pytest.raises(ValueError):
+      db.lazy('myair').select('email', 'AVG(pm25)').collect()
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import json
+from trigger import TriggerDB
+from trigger import Metrics
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestMetrics:
+  '''
+  Test the timings of the exchanges with the server
+  '''
+
+  def test_events (self, tmp_path):
+    '''
+    Test the events of the login, of the queries and of the logout
+    '''
+    events = []
+    metrics = Metrics(callback=events.append)
+    cfg = {'email': 'DE000000', 'password': PASSWORD}
+
+    with MockServer(users=1, days=1, step=600) as server:
+      with TriggerDB(cfg=cfg, host=server.url, spinner=False, metrics=metrics) as db:
+        assert db.metrics is metrics
+        assert len(db.select('myair', limit=1_000)) == 144
+        assert sum(1 for _ in db.select('gps', limit=1_000, stream=True)) == 144
+
+    assert [ev['event'] for ev in events] == ['login', 'select', 'select', 'logout']
+    for ev in events[1:3]:
+      assert ev['status'] == 200 and ev['rows'] == 144 and ev['attempts'] == 1
+      assert ev['bytes'] > 0
+      assert 0 <= ev['ttfb'] <= ev['duration']
+      assert ev['decode'] >= 0 and ev['transfer'] >= 0
+    assert [ev['stream'] for ev in events[1:3]] == [False, True]
+
+    summary = metrics.summary()
+    assert summary[('select', 'myair')]['rows'] == 144
+    assert summary[('login', '')]['count'] == 1
+
+    text = metrics.to_prometheus()
+    assert 'trigger_rows_total{event="select",table="gps"} 144' in text
+    assert 'trigger_seconds_total{event="select",table="myair",phase="decode"}' in text
+
+    trace = tmp_path / 'trace.json'
+    metrics.write_trace(trace)
+    trace = json.loads(trace.read_text())['traceEvents']
+    assert [ev['name'] for ev in trace] == ['login', 'select myair', 'select gps', 'logout']
+    assert all(ev['ph'] == 'X' and ev['dur'] >= 0 for ev in trace)
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import pytest
+from trigger import TriggerDB
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+@pytest.fixture(scope='module')
+def db ():
+  '''
+  Database connected to the local mock of the server
+  '''
+  with MockServer(users=2, days=1, step=600) as server:
+    with TriggerDB(cfg={'email': 'DE000000', 'password': PASSWORD}, host=server.url, spinner=False) as db:
+      yield db
+
+def _count (store, email: str) -> int:
+  '''
+  Number of records of the account in the local copy
+  '''
+  with sqlite3.connect(str(store)) as conn:
+    return conn.execute('SELECT COUNT(*) FROM myair WHERE email = ?', (email, )).fetchone()[0]
+
+class TestMirror:
+  '''
+  Test the incremental local copy of the tables
+  '''
+
+  def test_sync (self, db, tmp_path):
+    '''
+    Test the first synchronization and the re-synchronization
+    of an unchanged table
+    '''
+    store = tmp_path / 'trigger.sqlite'
+    assert db.sync('myair', store=store, page_size=50) == {'DE000000': 144, 'DE000001': 144}
+    assert _count(store, 'DE000000') == 144
+
+    # nothing is newer than the watermark
+    assert db.sync('myair', store=store, page_size=50) == {'DE000000': 0, 'DE000001': 0}
+    assert _count(store, 'DE000000') == 144 and _count(store, 'DE000001') == 144
+
+  def test_incremental (self, db, tmp_path):
+    '''
+    Test only the records more recent than the watermark are
+    retrieved, without duplicates
+    '''
+    store = tmp_path / 'trigger.sqlite'
+    db.sync('myair', emails='DE000001', store=store, where={'hour': '<12'})
+    assert _count(store, 'DE000001') == 72
+
+    # the local copy misses the most recent records
+    with sqlite3.connect(str(store)) as conn:
+      conn.execute('DELETE FROM myair WHERE email = ? AND hour >= 6', ('DE000001', ))
+    assert db.sync('myair', emails='DE000001', store=store, page_size=10) == {'DE000001': 108}
+
+    with sqlite3.connect(str(store)) as conn:
+      rows = conn.execute('SELECT year, month, day, hour, minute, second FROM myair WHERE email = ?', ('DE000001', )).fetchall()
+    assert len(rows) == 144 and len(set(rows)) == 144
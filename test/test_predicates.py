@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+from trigger import col
+from trigger.predicates import where_alternatives
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestPredicates:
+  '''
+  Test the compilation of the predicates into
+  conditions of the queries
+  '''
+
+  def test_same_column (self):
+    '''
+    Test the conjunction of conditions on the same column
+    '''
+    pred = (col('hour') >= 8) & (col('hour') <= 18) & (col('email') == 'DE000086')
+    assert pred.compile() == [[('hour', '>=8'), ('hour', '<=18'), ('email', '=DE000086')]]
+    assert col('hour').between(8, 18).compile() == [[('hour', '>=8'), ('hour', '<=18')]]
+
+  def test_isin (self):
+    '''
+    Test the splitting of the IN conditions in sub-queries
+    '''
+    assert col('email').isin(['A', 'B', 'A']).compile() == [[('email', '=A')], [('email', '=B')]]
+    # consecutive integers are merged into ranges
+    assert col('hour').isin([9, 8, 10, 14]).compile() == [
+      [('hour', '>=8'), ('hour', '<=10')],
+      [('hour', '=14')],
+    ]
+    # the alternatives which can not match are discarded
+    pred = col('hour').isin([1, 7]) & (col('hour') > 5) & col('email').isin(['A', 'B'])
+    assert pred.compile() == [
+      [('hour', '=7'), ('hour', '>5'), ('email', '=A')],
+      [('hour', '=7'), ('hour', '>5'), ('email', '=B')],
+    ]
+
+  def test_immutable (self):
+    '''
+    Test the predicates are immutable and hashable
+    '''
+    pred = (col('hour') >= 8) & col('email').isin(['A'])
+    assert pred == (col('hour') >= 8) & col('email').isin(['A'])
+    assert len({pred, (col('hour') >= 8) & col('email').isin(['A'])}) == 1
+    assert pred.columns() == {'hour', 'email'}
+
+  def test_where_alternatives (self):
+    '''
+    Test the conversion of the legacy formats of the conditions
+    '''
+    assert where_alternatives(None) == [[]]
+    assert where_alternatives({'hour': '>=8'}) == [[('hour', '>=8')]]
+    assert where_alternatives([('hour', '>=8'), ('hour', '<9')]) == [[('hour', '>=8'), ('hour', '<9')]]
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import io
+import time
+import threading
+from trigger.progress import ProgressReporter
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class _Terminal (io.StringIO):
+  '''
+  In-memory stream which looks like a terminal
+  '''
+
+  def isatty (self):
+    return True
+
+class TestProgressReporter:
+  '''
+  Test the progress of the queries in flight
+  '''
+
+  def test_disabled (self):
+    '''
+    Test the progress is not displayed out of a terminal
+    '''
+    stream = io.StringIO()
+    progress = ProgressReporter(stream=stream)
+    assert not progress.enabled
+    assert not progress.begin()
+    progress.add(rows=10, nbytes=100)
+    assert progress.active == 0
+
+    progress = ProgressReporter(stream=_Terminal(), enabled=False)
+    assert not progress.begin()
+    assert stream.getvalue() == ''
+
+  def test_shared_thread (self):
+    '''
+    Test the concurrent queries share a single thread and
+    the line is erased when they are completed
+    '''
+    stream = _Terminal()
+    progress = ProgressReporter(interval=0.01, stream=stream)
+    threads = threading.active_count()
+
+    assert all(progress.begin() for _ in range(32))
+    assert progress.active == 32
+    assert threading.active_count() == threads + 1
+    progress.add(rows=1_000, nbytes=2 ** 20)
+    time.sleep(0.05)
+    for _ in range(32):
+      progress.end()
+
+    output = stream.getvalue()
+    assert '32 queries' in output and 'rows/s' in output and 'MiB/s' in output
+    assert output.endswith('\r\x1B[K')
+    assert progress.active == 0
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from datetime import timedelta
+from trigger import TriggerDB
+from trigger import col
+from trigger.resample import parse_rule
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+np = pytest.importorskip('numpy')
+
+@pytest.fixture(scope='module')
+def db ():
+  '''
+  Database connected to the local mock of the server
+  '''
+  with MockServer(users=3, days=1, step=300) as server:
+    with TriggerDB(cfg={'email': 'DE000000', 'password': PASSWORD}, host=server.url, spinner=False, metrics=True) as db:
+      yield db
+
+class TestResampler:
+  '''
+  Test the aggregation of the records in time buckets
+  '''
+
+  def test_rule (self):
+    '''
+    Test the parsing of the width of the buckets
+    '''
+    assert parse_rule('1h') == (timedelta(hours=1), 'hour')
+    assert parse_rule('15min') == (timedelta(minutes=15), 'minute')
+    assert parse_rule('d') == (timedelta(days=1), 'day')
+    for rule in ('0h', '1w', 'h1'):
+      with pytest.raises(ValueError):
+        parse_rule(rule)
+
+  def test_remote_local (self, db):
+    '''
+    Test the aggregated requests of the buckets give the same
+    result of the local aggregation, with less bytes
+    '''
+    query = db.from_('myair').where(col('email').isin(['DE000000', 'DE000002'])).between('2025-09-01', '2025-09-02')
+    results, transferred = [], []
+    for min_rows in (0, 10 ** 9):
+      db.metrics.reset()
+      results.append(query.resample('1h', by='email').agg('COUNT(*)', pm25='AVG', pm10=['MIN', 'MAX'], min_rows=min_rows))
+      transferred.append(sum(event['bytes'] or 0 for event in db.metrics.events))
+
+    remote, local = results
+    assert remote.columns == ['year', 'month', 'day', 'hour', 'email', 'COUNT(*)', 'AVG(pm25)', 'MIN(pm10)', 'MAX(pm10)']
+    assert len(remote) == 48 and list(remote['email'][:24]) == ['DE000000'] * 24
+    assert list(remote['hour'][:24]) == list(range(24))
+    assert list(remote['COUNT(*)']) == [12] * 48
+    assert local.columns == remote.columns and list(local['email']) == list(remote['email'])
+    for column in remote.columns[:4] + remote.columns[5:]:
+      assert np.allclose(remote.to_numpy(column), local.to_numpy(column))
+    assert transferred[0] < transferred[1]
+
+  def test_alternatives (self, db):
+    '''
+    Test the buckets are not split by alternative conditions
+    on a column which is not the grouping one
+    '''
+    rs = (
+      db.from_('myair')
+        .where(col('minute').isin([0, 5]), email='=DE000001')
+        .between('2025-09-01', '2025-09-02')
+        .resample('1h', by='email')
+        .agg('COUNT(*)', min_rows=0)
+    )
+    assert list(rs['hour']) == list(range(24)) and list(rs['COUNT(*)']) == [2] * 24
+
+  def test_unaligned (self, db):
+    '''
+    Test the buckets of a range not aligned to the rule
+    '''
+    rs = (
+      db.from_('myair')
+        .where(email='=DE000001')
+        .between('2025-09-01T00:30', '2025-09-01T05:30')
+        .resample('2h')
+        .agg('COUNT(*)', pm25='AVG')
+    )
+    expected = np.array(['2025-09-01T00:30', '2025-09-01T02:30', '2025-09-01T04:30'], dtype='datetime64[us]')
+    assert (rs.timestamps() == expected).all()
+    assert list(rs['COUNT(*)']) == [24, 24, 12]
+
+  def test_empty (self, db):
+    '''
+    Test the resampling of a range without records
+    '''
+    rs = db.from_('myair').where(email='=DE000001').between('2025-09-05', '2025-09-06').resample('1h').agg(pm25='AVG')
+    assert len(rs) == 0 and rs.columns == ['year', 'month', 'day', 'hour', 'AVG(pm25)']
+
+  def test_invalid (self, db):
+    '''
+    Test the invalid resampling
+    '''
+    with pytest.raises(ValueError):
+      db.from_('myair').resample('1h')
+    query = db.from_('myair').between('2025-09-01', '2025-09-02')
+    with pytest.raises(ValueError):
+      query.resample('1h', by='hour')
+    with pytest.raises(ValueError):
+      query.resample('1h').agg()
+    with pytest.raises(ValueError):
+      query.resample('1h').agg(pm25='MEDIAN')
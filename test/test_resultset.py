@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import math
+import pytest
+from trigger import ResultSet
+from trigger.resultset import column_dtype
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+ROWS = [
+  {'email': 'DE000086', 'hour': 8, 'pm25': 1.5},
+  {'email': 'DE000086', 'hour': 9, 'pm25': None},
+  {'email': 'DE000087', 'hour': 10, 'pm25': 3},
+]
+
+class TestResultSet:
+  '''
+  Test the columnar container of the query results
+  '''
+
+  def test_dtypes (self):
+    '''
+    Test the storage type inferred from the column names
+    '''
+    assert column_dtype('hour') == 'q'
+    assert column_dtype('userId') == 'q'
+    assert column_dtype('email') == 'str'
+    assert column_dtype('pm25') == 'd'
+    assert column_dtype('COUNT(email)') == 'q'
+    assert column_dtype('AVG(hour)') == 'd'
+
+  def test_rows_and_columns (self):
+    '''
+    Test the access to the records and to the columns
+    '''
+    rs = ResultSet.from_rows(iter(ROWS), columns=['email', 'hour', 'pm25'])
+
+    assert len(rs) == 3
+    assert list(rs['hour']) == [8, 9, 10]
+    assert math.isnan(rs['pm25'][1])
+    assert rs[-1] == {'email': 'DE000087', 'hour': 10, 'pm25': 3.}
+    assert rs[0]['email'] is rs[1]['email']
+    assert rs.nbytes() == 3 * 8 * 2
+
+    sub = rs[['hour']]
+    assert sub.columns == ['hour']
+    assert sub.to_list() == [{'hour': 8}, {'hour': 9}, {'hour': 10}]
+    assert len(rs[1:]) == 2
+
+    with pytest.raises(IndexError):
+      rs[3]
+
+  def test_missing_integers (self):
+    '''
+    Test the promotion of the integer columns with missing values
+    '''
+    rs = ResultSet.from_rows([{'hour': 1}, {'hour': None}])
+    assert rs['hour'].typecode == 'd'
+    assert rs['hour'][0] == 1.
+    assert math.isnan(rs['hour'][1])
+
+  def test_strings (self):
+    '''
+    Test the strings of the numerical columns are not parsed
+    '''
+    rs = ResultSet.from_rows([{'hour': 1}, {'hour': None}, {'hour': '7'}])
+    assert rs['hour'] == [1., None, '7']
+    rs.append({'hour': 8})
+    assert rs['hour'][-1] == 8
+
+  def test_to_numpy (self):
+    '''
+    Test the zero-copy conversion to NumPy arrays
+    '''
+    np = pytest.importorskip('numpy')
+    rs = ResultSet.from_rows(ROWS)
+    arr = rs.to_numpy('hour')
+    assert arr.dtype == np.int64
+    rs['hour'][0] = 7
+    assert arr[0] == 7
+
+    columns = rs.to_numpy()
+    rs.extend([{'email': 'DE000088', 'hour': 11, 'pm25': 4.5}, {'email': 'DE000088', 'hour': 2 ** 70, 'pm25': None}])
+    assert len(columns['hour']) == len(columns['pm25']) == 3
+    assert all(len(values) == len(rs) == 5 for values in rs.to_numpy().values())
+    assert rs['hour'][3] == 11 and rs['hour'][4] == 2. ** 70
+
+  def test_timestamps (self):
+    '''
+    Test the assembly of the timestamps from the calendar columns
+    '''
+    np = pytest.importorskip('numpy')
+    rs = ResultSet.from_rows([
+      {'year': 2025, 'month': 9, 'day': 10, 'hour': 8, 'minute': 30, 'second': 15},
+      {'year': 2025, 'month': 12, 'day': 31, 'hour': None, 'minute': 0, 'second': 0},
+    ])
+    ts = rs.timestamps()
+    assert ts.dtype == np.dtype('datetime64[us]')
+    assert ts[0] == np.datetime64('2025-09-10T08:30:15')
+    assert np.isnat(ts[1])
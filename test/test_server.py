@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from trigger import TriggerDB
+from trigger import col
+from trigger._timerange import SHARD_LEVELS
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+@pytest.fixture(scope='module')
+def server ():
+  '''
+  Local mock of the server
+  '''
+  with MockServer(users=2, days=1, step=600) as server:
+    yield server
+
+@pytest.fixture(scope='module')
+def db (server):
+  '''
+  Database connected to the local mock of the server
+  '''
+  with TriggerDB(cfg={'email': 'DE000000', 'password': PASSWORD}, host=server.url, spinner=False) as db:
+    yield db
+
+class TestMockServer:
+  '''
+  Test the queries against the local mock of the server
+  '''
+
+  def test_tables (self, db):
+    '''
+    Test the synthetic records of all the tables
+    '''
+    for table in db.tables():
+      if table == 'accounts':
+        assert len(db.accounts()) == 2
+        continue
+      rows = db.select(table, where={'email': '=DE000001'}, limit=1_000)
+      assert len(rows) == 144
+      assert set(rows[0]) == set(db.columns(table))
+
+  def test_session (self, server):
+    '''
+    Test the pooled connection is re-used among the requests
+    and released on exit
+    '''
+    for logout in (True, False):
+      with TriggerDB(cfg={'email': 'DE000001', 'password': PASSWORD}, host=server.url, spinner=False, logout=logout) as db:
+        session = db._session
+        for _ in range(3):
+          db.select('myair', limit=5)
+        assert db._session is session
+        manager = session.get_adapter(server.url).poolmanager
+        pool, = manager.pools._container.values()
+        # the login and the queries share a single connection
+        assert pool.num_connections == 1 and pool.num_requests == 4
+        token = db._token
+
+      assert len(manager.pools) == 0
+      assert (token in server.tokens) is not logout
+
+  def test_query (self, db):
+    '''
+    Test the conditions, the ordering, the pagination and
+    the aggregated functions
+    '''
+    rows = db.select('myair', columns=['hour', 'pm25'], where=[('hour', '>=8'), ('hour', '<10')], order_by='pm25')
+    assert len(rows) == 24
+    assert [row['pm25'] for row in rows] == sorted(row['pm25'] for row in rows)
+
+    rows = list(db.iter_select('ecg', columns=['email', 'ecg'], page_size=50))
+    assert len(rows) == 288
+    assert set(rows[0]) == {'email', 'ecg'}
+
+    res = db.select('gps', columns=['COUNT(*)', 'MAX(hour)'], where={'email': '=DE000000'})
+    assert res == [{'COUNT(*)': 144, 'MAX(hour)': 23}]
+
+  def test_keyset_pagination (self, db):
+    '''
+    Test the pages in both the orders, with a limit and from a
+    starting timestamp, with ties of the timestamps across the
+    boundaries of the pages
+    '''
+    keys = db._keyset_columns('myair')
+    columns = keys + ['email']
+    where = {'hour': '<4'}
+
+    def _key (row):
+      return tuple(row[k] for k in keys)
+
+    # each timestamp is shared by the two accounts, so the odd
+    # size of the pages splits the ties
+    expected = db.select('myair', columns=columns, where=where, order_by=','.join(columns), limit=1_000)
+    assert len(expected) == 48 and _key(expected[6]) == _key(expected[7])
+    for page_size in (3, 7):
+      assert list(db.iter_select('myair', columns=columns, where=where, page_size=page_size)) == expected
+
+    rows = list(db.iter_select('myair', columns=columns, where=where, order='DESC', page_size=7))
+    assert len({(_key(row), row['email']) for row in rows}) == len(rows) == 48
+    assert [_key(row) for row in rows] == [_key(row) for row in reversed(expected)]
+
+    rows = list(db.iter_select('myair', columns=columns, where=where, limit=20, page_size=7))
+    assert rows == expected[:20]
+
+    # the records of the starting timestamp are excluded
+    after = _key(expected[21])
+    rows = [row for page in db._iter_pages('myair', columns=columns, where=where, page_size=7, after=after) for row in page]
+    assert rows == expected[22:]
+    rows = [row for page in db._iter_pages('myair', columns=columns, where=where, order='DESC', page_size=7, after=after) for row in page]
+    assert [_key(row) for row in rows] == [_key(row) for row in reversed(expected[:20])]
+
+  def test_prepared_query (self, db):
+    '''
+    Test the re-execution of the prepared queries
+    '''
+    builder = db.from_('myair').select('hour', 'pm25').where(hour='<6').limit(10)
+    prepared = builder.compile()
+    assert prepared == builder.compile()
+    assert hash(prepared) == hash(builder.compile()) and len({prepared, builder.compile()}) == 1
+    assert prepared != db.from_('myair').select('hour', 'pm25').where(hour='<6').limit(20).compile()
+    with pytest.raises(AttributeError):
+      prepared.limit = 20
+
+    # the builder can change without affecting the prepared query
+    builder.limit(20)
+    assert prepared.limit == 10
+
+    params = prepared._bound_params({'email': '=DE000001'})
+    assert params == {'select': 'hour,pm25', 'where': 'hour<6,email=DE000001', 'limit': 10}
+    res = prepared.execute(email='=DE000001')
+    expected = db.select('myair', columns=['hour', 'pm25'], where=[('hour', '<6'), ('email', '=DE000001')], limit=10)
+    assert res == expected and len(res) == 10
+    with pytest.raises(ValueError):
+      prepared.execute(unknown='=1')
+
+    # the alternatives of the conditions require multiple requests
+    prepared = db.from_('myair').select('email', 'hour').where(col('email').isin(['DE000000', 'DE000001'])).limit(1_000).compile()
+    assert prepared._bound_params({'hour': '=0'}) is None
+    res = prepared.execute(hour='=0')
+    assert len(res) == 12 and {row['email'] for row in res} == {'DE000000', 'DE000001'}
+
+  def test_fetch_for_accounts (self, db):
+    '''
+    Test the concurrent query of multiple accounts and the merge
+    of the results, also for an account without records
+    '''
+    emails = ['DE000000', 'DE999999', 'DE000001']
+    query = db.from_('myair').select('hour', 'pm25').where(hour='<2').limit(100)
+    results = list(db.fetch_for_accounts(query, emails=emails, workers=2))
+    assert sorted(res.email for res in results) == sorted(emails)
+    assert all(res.error is None for res in results)
+    assert {res.email: len(res.rows) for res in results} == {'DE000000': 12, 'DE999999': 0, 'DE000001': 12}
+
+    merged, failures = db.fetch_for_accounts(query.compile(), emails=emails, merge=True)
+    assert not failures
+    assert merged.columns == ['email', 'hour', 'pm25']
+    assert list(merged['email']) == ['DE000000'] * 12 + ['DE000001'] * 12
+    assert len(merged) == sum(len(res.rows) for res in results)
+
+    # all the registered accounts
+    assert {res.email for res in db.fetch_for_accounts(query)} == {'DE000000', 'DE000001'}
+
+  def test_parallel_select (self, db, server):
+    '''
+    Test the splitting requests only the units of the stored
+    time window
+    '''
+    expected = db.select('myair', columns=['email', 'hour', 'minute'], where={'email': '=DE000001'}, limit=1_000)
+    for shard, units in (('year', 1), ('month', 1), ('day', 1), ('hour', 24)):
+      before = server.requests
+      rows = db.parallel_select('myair', columns=['email', 'hour', 'minute'], where={'email': '=DE000001'}, shard=shard, workers=4)
+      assert rows == expected
+      # the MIN/MAX requests of the window and a request for each unit
+      assert server.requests - before == SHARD_LEVELS.index(shard) + 1 + units
+
+    rows = db.parallel_select('myair', columns=['hour'], where={'hour': '>=22'}, order='DESC', shard='hour', limit=15)
+    assert [row['hour'] for row in rows] == [23] * 12 + [22] * 3
+
+    before = server.requests
+    assert db.parallel_select('myair', where={'email': '=DE999999'}, shard='hour') == []
+    assert server.requests - before == 1
@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import sys
+import subprocess
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# modules which must be loaded only by the queries
+HEAVY_MODULES = ('requests', 'urllib3', 'cryptography', 'sqlite3', 'asyncio', 'trigger.db')
+
+def _imported (*args: str) -> set:
+  '''
+  Get the modules imported by the python command
+  '''
+  res = subprocess.run(
+    [sys.executable, '-X', 'importtime', *args],
+    capture_output=True, text=True, check=True,
+  )
+  # each line of the log is 'import time: self | cumulative | module'
+  return {
+    line.rsplit('|', 1)[-1].strip()
+    for line in res.stderr.splitlines()
+    if line.startswith('import time:')
+  }
+
+class TestStartup:
+  '''
+  Test the lazy loading of the heavy modules
+  '''
+
+  def test_import (self):
+    '''
+    Test the import of the package
+    '''
+    modules = _imported('-c', 'import trigger; trigger.__version__')
+    assert 'trigger' in modules
+    assert not modules.intersection(HEAVY_MODULES)
+
+  def test_cli_fast_path (self):
+    '''
+    Test the --version and --help of the command line
+    '''
+    for flag in ('--version', '--help'):
+      modules = _imported('-m', 'trigger', flag)
+      assert 'trigger.writers' in modules
+      assert not modules.intersection(HEAVY_MODULES)
+
+  def test_lazy_attribute (self):
+    '''
+    Test the classes loaded on first access
+    '''
+    import trigger
+    assert trigger.ResultSet.__name__ == 'ResultSet'
+    assert 'TriggerDB' in dir(trigger)
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import traceback
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from trigger import TriggerDB
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+CFG = {'email': 'DE000000', 'password': PASSWORD}
+
+@pytest.fixture(scope='module')
+def server ():
+  '''
+  Local mock of the server
+  '''
+  with MockServer(users=2, days=1, step=600) as server:
+    yield server
+
+class TestSharedInstance:
+  '''
+  Test the instance shared by threads and processes
+  '''
+
+  def test_threads (self, server):
+    '''
+    Test each thread gets its own pool of connections, re-used
+    by all the queries of the thread
+    '''
+    workers = 4
+    barrier = threading.Barrier(workers)
+
+    def _job (idx: int) -> tuple:
+      # all the threads are alive at the same time
+      barrier.wait()
+      session = db._session
+      rows = db.select('myair', where={'email': f'=DE00000{idx % 2}'}, limit=10)
+      assert db._session is session
+      return id(session), threading.get_ident(), len(rows)
+
+    with TriggerDB(cfg=CFG, host=server.url, spinner=False, per_thread_session=True) as db:
+      main = db._session
+      with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_job, range(workers)))
+      assert db._session is main
+
+    sessions = {session for session, _, _ in results}
+    assert len(sessions) == len({ident for _, ident, _ in results}) == workers
+    assert id(main) not in sessions
+    assert all(size == 10 for _, _, size in results)
+
+  def test_shared (self, server):
+    '''
+    Test the process-wide instance is created once
+    '''
+    db = TriggerDB.shared(cfg=CFG, host=server.url, spinner=False)
+    try:
+      assert TriggerDB.shared() is db
+      with ThreadPoolExecutor(max_workers=4) as executor:
+        assert set(executor.map(lambda _: TriggerDB.shared(), range(8))) == {db}
+    finally:
+      db._logout()
+    assert not server.tokens
+
+  @pytest.mark.skipif(not hasattr(os, 'fork'), reason='os.fork is not available')
+  def test_fork (self, server):
+    '''
+    Test the connections are re-opened in the child process,
+    which never logs out the session token of the parent
+    '''
+    with TriggerDB(cfg=CFG, host=server.url, spinner=False) as db:
+      parent = db._session
+      pid = os.fork()
+      if pid == 0:
+        status = 1
+        try:
+          assert db._session is not parent and db._pid == os.getpid()
+          assert parent not in db._sessions
+          assert len(db.select('myair', limit=10)) == 10
+          db._logout()
+          status = 0
+        except BaseException:
+          traceback.print_exc()
+        finally:
+          os._exit(status)
+
+      _, status = os.waitpid(pid, 0)
+      assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+      # the session token of the parent is still valid
+      assert db._session is parent
+      assert len(db.select('myair', limit=10)) == 10
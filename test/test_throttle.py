@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+from trigger import AdaptiveLimiter
+from trigger.throttle import backoff_delay
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestThrottle:
+  '''
+  Test the adaptive limit of the concurrent requests
+  '''
+
+  def test_decrease_and_recover (self):
+    '''
+    Test the limit is cut on overload and it grows back
+    on the successful requests
+    '''
+    limiter = AdaptiveLimiter(initial=8, maximum=8, cooldown=0.)
+
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.stats()['limit'] == 4
+
+    for _ in range(100):
+      limiter.acquire()
+      limiter.release()
+    assert limiter.stats() == {'limit': 8, 'in_flight': 0}
+
+  def test_minimum (self):
+    '''
+    Test the limit never goes below the minimum
+    '''
+    limiter = AdaptiveLimiter(initial=2, minimum=1, cooldown=0.)
+    for _ in range(10):
+      limiter.acquire()
+      limiter.release(overloaded=True)
+    assert limiter.stats()['limit'] == 1
+
+  def test_backoff (self):
+    '''
+    Test the bounds of the backoff delay
+    '''
+    for attempt in range(10):
+      assert 0 <= backoff_delay(attempt, base=0.5, cap=4.) <= 4.
+    assert backoff_delay(0, retry_after='3') >= 3.
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from trigger._timerange import column_bounds
+from trigger._timerange import time_shards
+from trigger._timerange import range_conditions
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestTimeShards:
+  '''
+  Test the splitting of the query time range
+  in calendar units
+  '''
+
+  def test_column_bounds (self):
+    '''
+    Test the range of values admitted by the conditions
+    '''
+    conds = [('hour', '>=8'), ('hour', '<19'), ('day', '=10'), ('email', '=DE000086')]
+    assert column_bounds(conds, 'hour') == (8, 18)
+    assert column_bounds(conds, 'day') == (10, 10)
+    assert column_bounds(conds, 'email') == (None, None)
+
+  def test_day_shards (self):
+    '''
+    Test the day splitting skips the days which do not exist
+    '''
+    shards = time_shards([('year', '=2025'), ('month', '=2')], shard='day', years=(2024, 2025))
+    assert len(shards) == 28
+    assert shards[0] == {'year': 2025, 'month': 2, 'day': 1}
+
+  def test_hour_shards (self):
+    '''
+    Test the chronological order of the hour splitting
+    '''
+    shards = time_shards([('month', '=12'), ('day', '>=31')], shard='hour', years=(2024, 2025))
+    assert len(shards) == 48
+    assert shards[23] == {'year': 2024, 'month': 12, 'day': 31, 'hour': 23}
+    assert shards[24] == {'year': 2025, 'month': 12, 'day': 31, 'hour': 0}
+
+  def test_window_shards (self):
+    '''
+    Test the units out of the stored window are skipped
+    '''
+    window = ((2024, 12, 31, 22), (2025, 1, 1, 1))
+    shards = time_shards([], shard='hour', years=(2024, 2025), window=window)
+    assert [(s['day'], s['hour']) for s in shards] == [(31, 22), (31, 23), (1, 0), (1, 1)]
+    assert len(time_shards([], shard='day', years=(2024, 2025), window=window)) == 2
+    assert len(time_shards([], shard='month', years=(2025, 2025), window=((2025, 3), (2025, 5)))) == 3
+
+  def test_invalid_shard (self):
+    '''
+    Test the error on unknown calendar units
+    '''
+    with pytest.raises(ValueError):
+      time_shards([], shard='minute', years=(2025, 2025))
+
+class TestRangeConditions:
+  '''
+  Test the compilation of the time ranges into
+  conditions on the calendar columns
+  '''
+
+  LEVELS = ('year', 'month', 'day', 'hour')
+
+  def test_edges (self):
+    '''
+    Test the partial units at the edges of the range
+    '''
+    conds = range_conditions('2025-09-10T08:30', '2025-09-12T17:00', self.LEVELS)
+    prefix = [('year', '=2025'), ('month', '=9')]
+    assert conds == [
+      prefix + [('day', '=10'), ('hour', '>=8')],
+      prefix + [('day', '=11')],
+      prefix + [('day', '=12'), ('hour', '<=16')],
+    ]
+
+  def test_whole_units (self):
+    '''
+    Test the ranges aligned to the calendar units
+    '''
+    assert range_conditions('2025-01-01', '2026-01-01', self.LEVELS) == [[('year', '=2025')]]
+    assert range_conditions('2025-02-01', '2025-03-01', self.LEVELS) == [[('year', '=2025'), ('month', '=2')]]
+    assert range_conditions('2025-03-01', '2025-03-01', self.LEVELS) == []
+
+  def test_year_crossing (self):
+    '''
+    Test the ranges across consecutive years
+    '''
+    conds = range_conditions('2024-12-31T23:00', '2025-01-01T01:00', self.LEVELS)
+    assert conds == [
+      [('year', '=2024'), ('month', '=12'), ('day', '=31'), ('hour', '=23')],
+      [('year', '=2025'), ('month', '=1'), ('day', '=1'), ('hour', '=0')],
+    ]
+
+  def test_invalid_levels (self):
+    '''
+    Test the levels must start from the year
+    '''
+    with pytest.raises(ValueError):
+      range_conditions('2025-01-01', '2025-01-02', ('month', 'day'))
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from trigger import TriggerDB
+from trigger.transport import RECORDED_TOKEN
+from trigger.transport import CassetteAdapter
+from trigger.transport import FaultInjector
+from trigger.predicates import col
+from benchmarks.server import PASSWORD
+from benchmarks.server import MockServer
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+def _queries (db: TriggerDB) -> tuple:
+  '''
+  Run a plain, a paginated and a fan-out query
+  '''
+  return (
+    db.select('myair', columns=['email', 'hour', 'pm25'], where={'email': '=DE000001'}, limit=500),
+    list(db.iter_select('ecg', columns=['email', 'ecg'], page_size=100)),
+    db.select('gps', where=col('email').isin(['DE000000', 'DE000001']) & (col('hour') < 3), limit=1000),
+  )
+
+@pytest.fixture(scope='module')
+def cassette (tmp_path_factory):
+  '''
+  Cassette recorded against the local mock of the server
+  '''
+  path = tmp_path_factory.mktemp('cassettes') / 'queries.json.gz'
+  with MockServer(users=2, days=1, step=600) as server:
+    cfg = {'email': 'DE000000', 'password': PASSWORD}
+    with TriggerDB(cfg=cfg, host=server.url, spinner=False, transport='record', cassette=path) as db:
+      expected = _queries(db)
+  return path, expected
+
+class _Adapter (BaseAdapter):
+  '''
+  Adapter which answers with an empty result and keeps the
+  streaming flag of the requests
+  '''
+
+  def __init__ (self):
+    super().__init__()
+    self.stream = []
+
+  def send (self, request, stream=False, **kwargs):
+    self.stream.append(stream)
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = b'[]'
+    return resp
+
+  def close (self):
+    pass
+
+class TestTransport:
+  '''
+  Test the record/replay transport and the fault injection
+  '''
+
+  def test_replay (self, cassette):
+    '''
+    Test the replay of the recorded queries without server
+    '''
+    path, expected = cassette
+    with TriggerDB(spinner=False, transport='replay', cassette=path) as db:
+      assert _queries(db) == expected
+      with pytest.raises(ValueError, match='not found in the cassette'):
+        db.select('myair', limit=3)
+
+    with pytest.raises(ValueError, match='requires the path'):
+      TriggerDB(spinner=False, transport='replay')
+
+  def test_faults (self, cassette):
+    '''
+    Test the retries of the injected errors and the truncated responses
+    '''
+    path, expected = cassette
+    faults = {'error_rate': 0.3, 'seed': 42}
+    with TriggerDB(spinner=False, transport='replay', cassette=path, retries=10, throttle=False, faults=faults) as db:
+      assert _queries(db) == expected
+
+    with TriggerDB(spinner=False, transport='replay', cassette=path, faults={'truncate_rate': 1, 'seed': 42}) as db:
+      with pytest.raises(ValueError):
+        db.select('myair', columns=['email', 'hour', 'pm25'], where={'email': '=DE000001'}, limit=500)
+
+  def test_token (self, cassette):
+    '''
+    Test the session token is not stored in the cassette
+    '''
+    path, _ = cassette
+    with gzip.open(path, 'rt', encoding='utf-8') as fp:
+      responses = json.load(fp)['responses']
+    auth = [entry for key, entries in responses.items() if key.endswith('/auth') for entry in entries]
+    assert auth and all(entry['body'] == RECORDED_TOKEN for entry in auth)
+
+  def test_stream (self):
+    '''
+    Test the responses are streamed without cassette, also with
+    the faults, and buffered only for the faulty ones
+    '''
+    request = requests.Request('GET', 'http://localhost/myair/?limit=1').prepare()
+    inner = _Adapter()
+    resp = CassetteAdapter(inner, cassette=None).send(request, stream=True)
+    assert inner.stream == [True] and resp.json() == []
+
+    inner = _Adapter()
+    CassetteAdapter(inner, cassette=None, faults=FaultInjector(latency=0.001)).send(request, stream=True)
+    resp = CassetteAdapter(inner, cassette=None, faults=FaultInjector(error_rate=1)).send(request, stream=True)
+    assert inner.stream == [True, True] and resp.status_code == 503
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import json
+import pytest
+from trigger.utils import make_session
+from trigger.utils import iter_json_array
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestStreamDecoding:
+  '''
+  Test the incremental decoding of the JSON responses
+  '''
+
+  def test_chunked_array (self):
+    '''
+    Test the decoding is independent of the chunk size
+    '''
+    rows = [{'email': 'DE000086', 'pm25': i / 3, 'sound': None, 'note': 'èé'} for i in range(100)]
+    raw = json.dumps(rows).encode('utf-8')
+
+    for size in (1, 7, 1024, len(raw)):
+      chunks = (raw[i : i + size] for i in range(0, len(raw), size))
+      assert list(iter_json_array(chunks)) == rows
+
+  def test_empty_array (self):
+    '''
+    Test the decoding of an empty result
+    '''
+    assert list(iter_json_array([b' [', b'] '])) == []
+
+  def test_truncated_array (self):
+    '''
+    Test the error on truncated responses
+    '''
+    with pytest.raises(ValueError):
+      list(iter_json_array([b'[{"pm25": 1.5}, {"pm25"']))
+
+class TestSession:
+  '''
+  Test the pool of persistent connections
+  '''
+
+  def test_retries (self):
+    '''
+    Test only the connection errors are retried by the pool
+    '''
+    pytest.importorskip('requests')
+    session = make_session(pool_size=4, retries=2)
+    adapter = session.get_adapter('https://localhost')
+    retry = adapter.max_retries
+    assert (retry.total, retry.connect, retry.read, retry.status) == (2, 2, 0, 0)
+    assert not retry.raise_on_status
+    assert adapter._pool_maxsize == 4
+    assert session.headers['Connection'] == 'keep-alive'
+
+    session = make_session(keep_alive=False)
+    assert session.headers['Connection'] == 'close'
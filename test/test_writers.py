@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import io
+import csv
+import json
+import pytest
+from trigger.writers import infer_format
+from trigger.writers import write_csv
+from trigger.writers import write_json
+from trigger.writers import write_ndjson
+from trigger.writers import write_parquet
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+BATCHES = [
+  [{'email': 'DE000086', 'hour': 8, 'pm25': 1.5}, {'email': 'DE000086', 'hour': 9, 'pm25': None}],
+  [],
+  [{'email': 'DE000087', 'hour': 10, 'pm25': 2.25}],
+]
+
+class TestWriters:
+  '''
+  Test the batch writers of the command line
+  '''
+
+  def test_infer_format (self):
+    '''
+    Test the format given by the extension of the file
+    '''
+    assert infer_format(None) == 'json'
+    assert infer_format('out.CSV') == 'csv'
+    assert infer_format('out.jsonl') == 'ndjson'
+    assert infer_format('out.parquet') == 'parquet'
+    assert infer_format('out.txt') == 'json'
+
+  def test_text_formats (self):
+    '''
+    Test the records written by the text writers
+    '''
+    rows = [row for batch in BATCHES for row in batch]
+
+    buffer = io.StringIO()
+    assert write_json(BATCHES, buffer) == 3
+    assert json.loads(buffer.getvalue()) == rows
+
+    buffer = io.StringIO()
+    assert write_json([], buffer) == 0
+    assert json.loads(buffer.getvalue()) == []
+
+    buffer = io.StringIO()
+    assert write_ndjson(BATCHES, buffer) == 3
+    assert [json.loads(line) for line in buffer.getvalue().splitlines()] == rows
+
+    buffer = io.StringIO(newline='')
+    assert write_csv(BATCHES, buffer) == 3
+    buffer.seek(0)
+    records = list(csv.DictReader(buffer))
+    assert list(records[0].keys()) == ['email', 'hour', 'pm25']
+    assert [r['hour'] for r in records] == ['8', '9', '10']
+    assert records[1]['pm25'] == ''
+
+  def test_parquet (self, tmp_path):
+    '''
+    Test the row groups of the Parquet file
+    '''
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'out.parquet'
+    assert write_parquet(BATCHES, str(path)) == 3
+
+    pf = pq.ParquetFile(path)
+    assert pf.metadata.num_row_groups == 2
+    table = pf.read()
+    assert str(table.schema.field('hour').type) == 'int64'
+    assert table.column('pm25').to_pylist() == [1.5, None, 2.25]
+
+  def test_empty_parquet (self, tmp_path):
+    '''
+    Test the schema of the Parquet file without records
+    '''
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'out.parquet'
+    assert write_parquet([[]], str(path), columns=['email', 'hour', 'AVG(pm25)']) == 0
+
+    table = pq.read_table(path)
+    assert table.num_rows == 0
+    assert table.schema.names == ['email', 'hour', 'AVG(pm25)']
+    assert str(table.schema.field('hour').type) == 'int64'
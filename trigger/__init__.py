@@ -1,8 +1,9 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+from importlib import import_module
+
 from .__version__ import __version__
-from .db import TriggerDB
 
 __author__ = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
@@ -10,4 +11,37 @@ __email__ = ['nico.curti2@unibo.it']
 __all__ = [
 	'__version__',
   'TriggerDB',
+  'AsyncTriggerDB',
+  'QueryCache',
+  'AdaptiveLimiter',
+  'ResultSet',
+  'Metrics',
+  'LazyFrame',
+  'Resampler',
+  'col',
 ]
+
+# the submodules are imported on first access, so the
+# command line and the scripts load only what they use
+_LAZY = {
+  'TriggerDB': '.db',
+  'AsyncTriggerDB': '.asyncdb',
+  'QueryCache': '.cache',
+  'AdaptiveLimiter': '.throttle',
+  'ResultSet': '.resultset',
+  'Metrics': '.metrics',
+  'LazyFrame': '.lazy',
+  'Resampler': '.resample',
+  'col': '.predicates',
+}
+
+def __getattr__ (name: str):
+  if name not in _LAZY:
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+  value = getattr(import_module(_LAZY[name], __name__), name)
+  # cache the attribute for the next accesses
+  globals()[name] = value
+  return value
+
+def __dir__ ():
+  return sorted(set(globals()) | set(_LAZY))
@@ -5,9 +5,19 @@ import re
 import sys
 import json
 import argparse
+from pathlib import Path
+from itertools import islice
+from contextlib import redirect_stdout
 from time import time as now
-from trigger import TriggerDB
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
 from trigger import __version__
+from trigger._timerange import TIME_COLUMNS
+from trigger.predicates import Condition
+from trigger.writers import FORMATS
+from trigger.writers import infer_format
 from trigger.utils import RESET_COLOR_CODE
 from trigger.utils import ORANGE_COLOR_CODE
 from trigger.utils import GREEN_COLOR_CODE
@@ -17,6 +27,14 @@ from trigger.utils import RED_COLOR_CODE
 __author__ = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
 
+# the modules of the connection are imported only by the queries,
+# so --help and --version do not load them
+
+# math operators for the where condition
+_OPERATORS = re.compile(r"^([a-zA-Z_]\w*)(.*)$")
+# keys of the queries of the batch file
+_BATCH_KEYS = {'table', 'select', 'where', 'orderby', 'order', 'limit', 'output', 'format'}
+
 def parse_args():
   '''
   Parse command line arguments for the pyTrigger package.
@@ -51,7 +69,8 @@ def parse_args():
     dest='table',
     type=str,
     action='store',
-    required=True,
+    required=False,
+    default=None,
     help=(
       'Name of the table to use for the query'
     ),
@@ -65,7 +84,7 @@ def parse_args():
     nargs='+',
     action='store',
     required=False,
-    default='*',
+    default=None,
     help=(
       'List of column names to select in the query'
     ),
@@ -124,29 +143,398 @@ def parse_args():
     required=False,
     default=None,
     help=(
-      'Maximum number of records to retrieve from the request'
+      'Maximum number of records to retrieve from the request. '
+      'If not given, the default limit of the queries is used; '
+      'larger values than the maximum of a request are retrieved page by page'
     ),
   )
 
-  # trigger --version
+  # trigger --output <path>
   parser.add_argument(
-    '--version', '-v',
-    dest='version',
+    '--output', '-O',
+    dest='output',
+    type=str,
+    action='store',
+    required=False,
+    default=None,
+    help=(
+      'Path of the output file (or directory of the output files of --batch). '
+      'If not given, the records are written to the standard output'
+    ),
+  )
+
+  # trigger --format <json|ndjson|csv|parquet>
+  parser.add_argument(
+    '--format', '-f',
+    dest='format',
+    type=str,
+    action='store',
+    required=False,
+    default=None,
+    choices=list(FORMATS),
+    help=(
+      'Format of the output. '
+      'If not given, it is inferred from the extension of the output file (default to json)'
+    ),
+  )
+
+  # trigger --batch <queries.jsonl>
+  parser.add_argument(
+    '--batch',
+    dest='batch',
+    type=str,
+    action='store',
+    required=False,
+    default=None,
+    help=(
+      'JSON-lines file of queries to run concurrently, one object for each line with the keys '
+      'table, select, where, orderby, order, limit and optionally output and format. '
+      'The results are written in the --output directory'
+    ),
+  )
+
+  # trigger --jobs <n>
+  parser.add_argument(
+    '--jobs', '-j',
+    dest='jobs',
+    type=int,
+    action='store',
+    required=False,
+    default=4,
+    help=(
+      'Number of queries of the batch file to run concurrently'
+    ),
+  )
+
+  # trigger --profile [trace.json]
+  parser.add_argument(
+    '--profile',
+    dest='profile',
+    type=str,
+    nargs='?',
+    const='',
+    required=False,
+    default=None,
+    metavar='TRACE',
+    help=(
+      'Print the breakdown of the time spent in login, queries and logout '
+      '(time to first byte, transfer, decode). '
+      'If a file is given, the JSON trace of the requests is also written'
+    ),
+  )
+
+  # trigger --quiet
+  parser.add_argument(
+    '--quiet', '-q',
+    dest='quiet',
     required=False,
     action='store_true',
     default=False,
+    help='Disable the banner, the progress and the summary of the export (the messages of the library are still written to stderr)',
+  )
+
+  # trigger --no-banner
+  parser.add_argument(
+    '--no-banner',
+    dest='banner',
+    required=False,
+    action='store_false',
+    default=True,
+    help='Disable the banner',
+  )
+
+  # trigger --version
+  parser.add_argument(
+    '--version', '-v',
+    action='version',
+    version=__version__,
     help='Get the current version installed',
   )
 
   return parser
 
+def batches (rows, size: int):
+  '''
+  Group the records in lists of the given size while
+  they are received
+
+  Parameters
+  ----------
+  rows: Iterable[dict]
+    Records to group
+
+  size: int
+    Number of records of each batch
+
+  Returns
+  -------
+  batches: Iterator[list]
+    Generator of the batches of records
+  '''
+  rows = iter(rows)
+  while batch := list(islice(rows, size)):
+    yield batch
+
+def parse_where (where: Union[None, List[str], Dict[str, str]]) -> List[Condition]:
+  '''
+  Convert the conditions of the command line into predicates
+
+  Parameters
+  ----------
+  where: list or dict
+    Conditions as 'name<op>val' strings or
+    dictionary of {name: '<op>val'} expressions
+
+  Returns
+  -------
+  conditions: list
+    Conditions of the query
+  '''
+  if not where:
+    return []
+  if isinstance(where, dict):
+    return [Condition(column, expr) for column, expr in where.items()]
+  if isinstance(where, str):
+    where = [where]
+  # multiple conditions on the same column are combined
+  return [
+    Condition(match.group(1), match.group(2))
+    for cond in where
+    if (match := _OPERATORS.match(cond))
+  ]
+
+def open_output (path: str, fmt: str):
+  '''
+  Open the output file with the mode required by the format
+
+  Parameters
+  ----------
+  path: str
+    Path of the output file
+
+  fmt: str
+    Name of the output format
+
+  Returns
+  -------
+  file: file-like
+    Opened output stream
+  '''
+  if fmt == 'parquet':
+    return open(path, 'wb')
+  return open(path, 'w', newline='', encoding='utf-8')
+
+def export_query (db, spec: dict, out, fmt: str) -> int:
+  '''
+  Run the query and write the records while the pages
+  are received
+
+  Parameters
+  ----------
+  db: TriggerDB
+    Database instance to use for the requests
+
+  spec: dict
+    Parameters of the query (table, select, where,
+    orderby, order, limit)
+
+  out: file-like
+    Output stream
+
+  fmt: str
+    Name of the output format
+
+  Returns
+  -------
+  size: int
+    Number of records written
+  '''
+  from trigger.db import DEFAULT_LIMIT
+  from trigger.db import MAXIMUM_LIMIT
+
+  table = spec['table']
+  select = spec.get('select') or []
+  select = [select] if isinstance(select, str) else select
+  orderby = spec.get('orderby')
+  limit = spec.get('limit')
+  limit = limit if limit is not None else DEFAULT_LIMIT
+  page_size = min(limit, MAXIMUM_LIMIT)
+
+  query = (
+    db.from_(table)
+      .select(*select)
+      .where(*parse_where(spec.get('where')))
+      .order_by(orderby)
+      .order(spec.get('order') or 'ASC')
+      .limit(limit)
+  )
+  # the aggregated functions can not be paginated
+  columns = db._available_tables[table]
+  paginated = (
+    orderby is None and
+    any(col in columns for col in TIME_COLUMNS) and
+    all(col in columns for col in select)
+  )
+  # the records are written as the pages are received
+  rows = query.iter(page_size=page_size) if paginated else query.fetch(stream=True)
+  # the schema of the binary format is written also without records
+  kwargs = {'columns': select or list(columns)} if fmt == 'parquet' else {}
+  return FORMATS[fmt](batches(rows, page_size), out, **kwargs)
+
+def load_batch (path: str) -> List[dict]:
+  '''
+  Read the specifications of the queries from a
+  JSON-lines file
+
+  Parameters
+  ----------
+  path: str
+    Path of the file, with a JSON object for each line.
+    Empty lines are ignored
+
+  Returns
+  -------
+  specs: list
+    Parameters of the queries
+  '''
+  specs = []
+  with open(path, 'r', encoding='utf-8') as fp:
+    for lineno, line in enumerate(fp, start=1):
+      if not line.strip():
+        continue
+      try:
+        spec = json.loads(line)
+      except json.JSONDecodeError as e:
+        raise ValueError(f'Invalid query at line {lineno} of {path}: {e}')
+      if not isinstance(spec, dict) or 'table' not in spec:
+        raise ValueError(f'Invalid query at line {lineno} of {path}: the table is required')
+      unknown = set(spec) - _BATCH_KEYS
+      if unknown:
+        raise ValueError(f'Invalid query at line {lineno} of {path}: unknown keys {sorted(unknown)}')
+      specs.append(spec)
+  return specs
+
+def run_batch (args: argparse.Namespace, log) -> int:
+  '''
+  Run concurrently the queries of the batch file over a
+  single authenticated session, writing each result to
+  its own output file
+
+  Parameters
+  ----------
+  args: argparse.Namespace
+    Arguments of the command line
+
+  log: file-like
+    Stream of the timings
+
+  Returns
+  -------
+  status: int
+    Exit code, 1 if any query failed
+  '''
+  try:
+    specs = load_batch(args.batch)
+  except (OSError, ValueError) as e:
+    print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} {e}', file=log, flush=True)
+    return 1
+
+  # the outputs are placed in the given directory
+  folder = Path(args.output) if args.output is not None else Path('.')
+  folder.mkdir(parents=True, exist_ok=True)
+  stem = Path(args.batch).stem
+
+  def _run (idx: int, spec: dict) -> Tuple[str, int, float]:
+    output = spec.get('output')
+    fmt = spec.get('format') or infer_format(output, default=args.format or 'json')
+    path = folder / (output or f'{stem}_{idx}.{fmt}')
+    tic = now()
+    try:
+      with open_output(path, fmt) as out:
+        size = export_query(db, spec, out, fmt)
+    except Exception:
+      # no partial results of the failed queries
+      path.unlink(missing_ok=True)
+      raise
+    return str(path), size, now() - tic
+
+  from concurrent.futures import ThreadPoolExecutor
+  from concurrent.futures import as_completed
+  from trigger import TriggerDB
+  from trigger import Metrics
+
+  tic = now()
+  total = failed = 0
+  metrics = Metrics() if args.profile is not None else None
+  with redirect_stdout(log), TriggerDB(pool_size=max(10, args.jobs), spinner=False, metrics=metrics) as db:
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+      futures = {executor.submit(_run, idx, spec): idx for idx, spec in enumerate(specs, start=1)}
+      for future in as_completed(futures):
+        idx = futures[future]
+        try:
+          path, size, elapsed = future.result()
+        except Exception as e:
+          failed += 1
+          print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Query {idx}: {e}', file=log, flush=True)
+          continue
+        total += size
+        if not args.quiet:
+          print(
+            f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Query {idx}: {size} records written to {path} in {elapsed:.2f} sec',
+            file=log, flush=True
+          )
+
+  elapsed = now() - tic
+  if not args.quiet:
+    print(
+      (
+        f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} {len(specs) - failed}/{len(specs)} queries completed: '
+        f'{total} records in {elapsed:.2f} sec ({total / max(elapsed, 1e-9):.0f} records/sec)'
+      ),
+      file=log, flush=True
+    )
+  if metrics is not None:
+    report_profile(metrics, args.profile, log)
+  return 1 if failed else 0
+
+def report_profile (metrics, trace: str, log):
+  '''
+  Print the breakdown of the timings and write the trace, if required
+
+  Parameters
+  ----------
+  metrics: Metrics
+    Timings of the requests
+
+  trace: str
+    Path of the JSON trace; if empty, the trace is not written
+
+  log: file-like
+    Stream of the breakdown
+  '''
+  metrics.report(file=log)
+  if trace:
+    metrics.write_trace(trace)
+    print(f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Trace written to {trace}', file=log, flush=True)
+
 def main ():
   # extract the arguments of the cmd
   parser = parse_args()
   args = parser.parse_args()
 
-  # source: https://patorjk.com/software/taag
-  print(fr'''{VIOLET_COLOR_CODE}
+  # the standard output is reserved to the records
+  log = sys.stderr
+  fmt = args.format or infer_format(args.output)
+  if args.table is None and args.batch is None:
+    parser.error('one of the arguments --table/-t --batch is required')
+  if args.jobs < 1:
+    parser.error('the number of jobs must be positive')
+  if fmt == 'parquet' and args.output is None and args.batch is None:
+    parser.error('the parquet format requires an output file (--output)')
+
+  if args.banner and not args.quiet:
+    # source: https://patorjk.com/software/taag
+    print(fr'''{VIOLET_COLOR_CODE}
            _______   _
           |__   __| (_)
   _ __  _   _| |_ __ _  __ _  __ _  ___ _ __
@@ -156,58 +544,58 @@ def main ():
  | |     __/ |          __/ | __/ |
  |_|    |___/          |___/ |___/
     {RESET_COLOR_CODE}''',
-    file=sys.stdout, flush=True
-  )
+      file=log, flush=True
+    )
 
   # start the timer
   tic = now()
 
-  if args.version:
-    print(__version__, file=sys.stdout, flush=True)
-    exit(0)
-
-  # math operators for the where condition
-  operators = re.compile(r"^([a-zA-Z_]\w*)(.*)$")
-
-  # get the parameters of the desired query
-  table = args.table
-  select = args.select
-  where = {
-    match.group(1): match.group(2)
-    for cond in args.where
-    if (match := operators.match(cond))
-  } if args.where else None
-  orderby = args.orderby
-  order = args.order
-  limit = args.limit
-
-  # run the query on the database instance
-  with TriggerDB() as db:
-    res = (
-      db.from_(table)
-        .select(*select)
-        .where(**where)
-        .order_by(orderby)
-        .order(order)
-        .limit(limit)
-        .fetch()
+  if args.batch is not None:
+    status = run_batch(args, log)
+    sys.exit(status)
+
+  spec = {
+    'table': args.table,
+    'select': args.select,
+    'where': args.where,
+    'orderby': args.orderby,
+    'order': args.order,
+    'limit': args.limit,
+  }
+
+  from trigger import TriggerDB
+  from trigger import Metrics
+
+  metrics = Metrics() if args.profile is not None else None
+  out = sys.stdout if args.output is None else open_output(args.output, fmt)
+
+  try:
+    # the messages of the library do not mix with the records
+    with redirect_stdout(log), TriggerDB(spinner=not args.quiet, metrics=metrics) as db:
+      size = export_query(db, spec, out, fmt)
+  except BaseException:
+    if out is not sys.stdout:
+      out.close()
+      # no partial results of the failed or interrupted query
+      Path(args.output).unlink(missing_ok=True)
+    raise
+  finally:
+    if out is not sys.stdout:
+      out.close()
+
+  # log the time taken to compute the statistics
+  toc = now()
+  if not args.quiet:
+    print(
+      f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} {size} records written to {args.output or "stdout"} ({fmt})',
+      file=log, flush=True
     )
     print(
-      json.dumps(
-        res, 
-        indent=2, 
-        sort_keys=True,
-      ),
-      file=sys.stdout,
-      flush=True,
+      f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Elapsed time: {toc - tic:.2f} sec',
+      file=log, flush=True
     )
-  
-  # log the time taken to compute the statistics
-  toc = now()
-  print(
-    f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Elapsed time: {toc - tic:.2f} sec',
-    file=sys.stdout, flush=True
-  )
+  if metrics is not None:
+    report_profile(metrics, args.profile, log)
 
 
 if __name__ == '__main__':
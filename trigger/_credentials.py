@@ -1,11 +1,18 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import os
 import json
+import time
 import getpass
 from pathlib import Path
-from cryptography.fernet import Fernet
-from cryptography.fernet import InvalidToken
+from contextlib import contextmanager
+
+try:
+  import fcntl
+except ImportError: # Windows
+  fcntl = None
+  import msvcrt
 
 from .utils import RESET_COLOR_CODE
 from .utils import ORANGE_COLOR_CODE
@@ -24,6 +31,7 @@ APP_NAME = 'pytrigger'
 CONFIG_DIR = Path.home() / '.config' / APP_NAME
 CONFIG_FILE = CONFIG_DIR / 'credentials.json'
 KEY_FILE = CONFIG_DIR / 'secret.key'
+TOKEN_FILE = CONFIG_DIR / 'token.json'
 
 # internal cache to avoid re-readings
 _credentials_cache = None
@@ -43,6 +51,20 @@ def _ensure_config_dir ():
     except Exception:
       pass
 
+def _fernet ():
+  '''
+  Get the Fernet encrypter class.
+  The cryptography package is imported only when the credentials
+  are encrypted or decrypted, since its import is slow
+
+  Returns
+  -------
+    fernet: type
+      Fernet class of the cryptography package
+  '''
+  from cryptography.fernet import Fernet
+  return Fernet
+
 def _generate_key () -> bytes:
   '''
   Create or read the encription keys
@@ -57,7 +79,7 @@ def _generate_key () -> bytes:
   # if there are no files
   if not KEY_FILE.exists():
     # create the private key
-    key = Fernet.generate_key()
+    key = _fernet().generate_key()
     KEY_FILE.write_bytes(key)
     # set the privileges
     try:
@@ -83,7 +105,7 @@ def _store_credentials (email: str, password: str):
   # (eventually) generate the key
   key = _generate_key()
   # encripter
-  f = Fernet(key)
+  f = _fernet()(key)
   token = f.encrypt(password.encode('utf-8'))
   # encript the password
   data = {
@@ -128,7 +150,7 @@ def _load_credentials () -> dict:
     # generate the key
     key = _generate_key()
     # decrypter
-    f = Fernet(key)
+    f = _fernet()(key)
     password = f.decrypt(
       data['password_token'].encode('utf-8')
     ).decode('utf-8')
@@ -140,7 +162,7 @@ def _load_credentials () -> dict:
       'password': password
     }
   # if something goes wrong...
-  except (InvalidToken, Exception):
+  except Exception:
     print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Failed to load credentials')
     return None
 
@@ -207,4 +229,138 @@ def reset_credentials ():
     CONFIG_FILE.unlink()
   if KEY_FILE.exists():
     KEY_FILE.unlink()
+  if TOKEN_FILE.exists():
+    TOKEN_FILE.unlink()
   print(f'{ORANGE_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Credentials deleted successfully')
+
+def _stored_email () -> str:
+  '''
+  Get the account of the stored credentials without
+  decrypting the password
+
+  Returns
+  -------
+    email: str
+      Username of the stored account or None if
+      the credentials are not stored
+  '''
+  try:
+    return json.loads(CONFIG_FILE.read_text(encoding='utf-8'))['email']
+  except Exception:
+    return None
+
+def _read_tokens () -> dict:
+  '''
+  Read the cache of the session tokens
+
+  Returns
+  -------
+    tokens: dict
+      Encrypted tokens and expiration time for each account
+  '''
+  try:
+    return json.loads(TOKEN_FILE.read_text(encoding='utf-8'))
+  except Exception:
+    return {}
+
+def _write_tokens (tokens: dict):
+  '''
+  Write the cache of the session tokens
+
+  Parameters
+  ----------
+    tokens: dict
+      Encrypted tokens and expiration time for each account
+  '''
+  _ensure_config_dir()
+  tmp = TOKEN_FILE.with_suffix(f'.{os.getpid()}.tmp')
+  tmp.write_text(json.dumps(tokens, indent=2), encoding='utf-8')
+  # set the privileges
+  try:
+    tmp.chmod(0o600)
+  except Exception:
+    pass
+  tmp.replace(TOKEN_FILE)
+
+@contextmanager
+def _tokens_lock ():
+  '''
+  Lock the cache of the session tokens, so the updates of
+  concurrent processes are not lost
+  '''
+  _ensure_config_dir()
+  with open(TOKEN_FILE.with_suffix('.lock'), 'a+b') as fp:
+    if fcntl is not None:
+      fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+    else:
+      fp.seek(0)
+      msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+      yield
+    finally:
+      if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+      else:
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _store_token (email: str, token: str, ttl: float):
+  '''
+  Save the session token of the account in the cache
+
+  Parameters
+  ----------
+    email: str
+      Username of the account as email address
+
+    token: str
+      Session token given by the login
+
+    ttl: float
+      Time-to-live of the token in seconds
+  '''
+  with _tokens_lock():
+    f = _fernet()(_generate_key())
+    tokens = _read_tokens()
+    tokens[email] = {
+      'token': f.encrypt(token.encode('utf-8')).decode('utf-8'),
+      'expires': time.time() + ttl,
+    }
+    _write_tokens(tokens)
+
+def _load_token (email: str) -> str:
+  '''
+  Load the session token of the account from the cache
+
+  Parameters
+  ----------
+    email: str
+      Username of the account as email address
+
+  Returns
+  -------
+    token: str
+      Session token or None if it is not stored or expired
+  '''
+  entry = _read_tokens().get(email)
+  if entry is None or entry['expires'] < time.time() or not KEY_FILE.exists():
+    return None
+  try:
+    f = _fernet()(KEY_FILE.read_bytes())
+    return f.decrypt(entry['token'].encode('utf-8')).decode('utf-8')
+  except Exception:
+    return None
+
+def _clear_token (email: str):
+  '''
+  Remove the session token of the account from the cache
+
+  Parameters
+  ----------
+    email: str
+      Username of the account as email address
+  '''
+  with _tokens_lock():
+    tokens = _read_tokens()
+    if tokens.pop(email, None) is not None:
+      _write_tokens(tokens)
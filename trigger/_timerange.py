@@ -0,0 +1,361 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import re
+import calendar
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from itertools import product
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Optional
+from typing import Sequence
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'TIME_COLUMNS',
+  'SHARD_LEVELS',
+  'NATURAL_BOUNDS',
+  'column_bounds',
+  'clip_bounds',
+  'time_shards',
+  'to_datetime',
+  'range_conditions',
+]
+
+# timestamp columns of the tables from the coarsest to the finest
+TIME_COLUMNS = ('year', 'month', 'day', 'hour', 'minute', 'second', 'microsecond')
+
+# calendar columns available for the splitting of the queries
+SHARD_LEVELS = ('year', 'month', 'day', 'hour')
+
+# natural range of the calendar columns
+NATURAL_BOUNDS = {
+  'month': (1, 12),
+  'day': (1, 31),
+  'hour': (0, 23),
+  'minute': (0, 59),
+  'second': (0, 59),
+  'microsecond': (0, 999_999),
+}
+
+# numerical condition as 'OPvalue'
+_CONDITION = re.compile(r'^\s*(>=|<=|=|>|<)\s*(-?\d+)\s*$')
+
+def column_bounds (conditions: List[Tuple[str, str]], column: str) -> Tuple[Optional[int], Optional[int]]:
+  '''
+  Get the closed range of integer values admitted by the
+  conditions on the given column
+
+  Parameters
+  ----------
+  conditions: list
+    List of (column, expression) pairs of the query
+
+  column: str
+    Name of the column to evaluate
+
+  Returns
+  -------
+  bounds: tuple
+    Lower and upper bound of the column values.
+    None is used for a missing bound
+  '''
+  lo, hi = None, None
+  for col, expr in conditions:
+    if col != column:
+      continue
+    match = _CONDITION.match(str(expr))
+    # conditions which are not numerical do not restrict the range
+    if not match:
+      continue
+    op, val = match.group(1), int(match.group(2))
+    if op in ('=', '>=', '>'):
+      val = val + 1 if op == '>' else val
+      lo = val if lo is None else max(lo, val)
+    if op in ('=', '<=', '<'):
+      val = val - 1 if op == '<' else val
+      hi = val if hi is None else min(hi, val)
+  return lo, hi
+
+def clip_bounds (bounds: Tuple[Optional[int], Optional[int]], natural: Tuple[int, int]) -> range:
+  '''
+  Intersect the bounds with the natural range of the column
+
+  Parameters
+  ----------
+  bounds: tuple
+    Lower and upper bound of the column values
+
+  natural: tuple
+    Natural lower and upper bound of the column
+
+  Returns
+  -------
+  values: range
+    Admitted values of the column
+  '''
+  lo = natural[0] if bounds[0] is None else max(bounds[0], natural[0])
+  hi = natural[1] if bounds[1] is None else min(bounds[1], natural[1])
+  return range(lo, hi + 1)
+
+def time_shards (
+  conditions: List[Tuple[str, str]],
+  shard: str,
+  years: Tuple[int, int],
+  window: Optional[Tuple[tuple, tuple]] = None,
+) -> List[Dict[str, int]]:
+  '''
+  Split the time range of a query into disjoint calendar
+  units, sorted in chronological order.
+
+  Parameters
+  ----------
+  conditions: list
+    List of (column, expression) pairs of the query
+
+  shard: str
+    Calendar unit of the splitting, one of SHARD_LEVELS
+
+  years: tuple
+    Minimum and maximum year stored in the table
+
+  window: tuple (default := None)
+    Values of the calendar columns (from the year) of the
+    first and of the last stored record.
+    The units out of the window are skipped
+
+  Returns
+  -------
+  shards: list
+    List of dictionaries with the value of each calendar
+    column from the year up to the shard level
+  '''
+  if shard not in SHARD_LEVELS:
+    raise ValueError(f"Invalid shard '{shard}'. Available values are: {list(SHARD_LEVELS)}")
+
+  levels = SHARD_LEVELS[:SHARD_LEVELS.index(shard) + 1]
+  first, last = window if window is not None else ((years[0], ), (years[1], ))
+  year_range = clip_bounds(column_bounds(conditions, 'year'), years)
+  month_range = clip_bounds(column_bounds(conditions, 'month'), NATURAL_BOUNDS['month'])
+  day_bounds = column_bounds(conditions, 'day')
+  hour_range = clip_bounds(column_bounds(conditions, 'hour'), NATURAL_BOUNDS['hour'])
+
+  def _inside (*values: int) -> bool:
+    # the prefix of the unit is compared with the prefixes of the window
+    return tuple(first[:len(values)]) <= values[:len(first)] and values[:len(last)] <= tuple(last[:len(values)])
+
+  shards = []
+  for year in year_range:
+    if not _inside(year):
+      continue
+    if len(levels) == 1:
+      shards.append({'year': year})
+      continue
+    for month in month_range:
+      if not _inside(year, month):
+        continue
+      if len(levels) == 2:
+        shards.append({'year': year, 'month': month})
+        continue
+      # skip the days which do not exist in the month
+      days = [day for day in clip_bounds(day_bounds, (1, calendar.monthrange(year, month)[1])) if _inside(year, month, day)]
+      if len(levels) == 3:
+        shards.extend({'year': year, 'month': month, 'day': day} for day in days)
+        continue
+      shards.extend(
+        {'year': year, 'month': month, 'day': day, 'hour': hour}
+        for day, hour in product(days, hour_range)
+        if _inside(year, month, day, hour)
+      )
+  return shards
+
+def to_datetime (value: Union[str, date, datetime]) -> datetime:
+  '''
+  Convert the given value to datetime
+
+  Parameters
+  ----------
+  value: str or date or datetime
+    Datetime object or ISO-8601 string (e.g. '2025-09-10T08:30')
+
+  Returns
+  -------
+  dt: datetime
+    Converted value
+  '''
+  if isinstance(value, datetime):
+    return value
+  if isinstance(value, date):
+    return datetime(value.year, value.month, value.day)
+  if isinstance(value, str):
+    return datetime.fromisoformat(value)
+  raise ValueError(f'Invalid datetime: {value!r}')
+
+def _natural_bounds (levels: Sequence[str], values: tuple, idx: int) -> Tuple[Optional[int], Optional[int]]:
+  '''
+  Get the natural range of the calendar column, given the
+  values of the coarser columns
+
+  Parameters
+  ----------
+  levels: list
+    Calendar columns from the coarsest to the finest one
+
+  values: tuple
+    Values of the calendar columns
+
+  idx: int
+    Index of the column to evaluate
+
+  Returns
+  -------
+  bounds: tuple
+    Minimum and maximum value of the column.
+    None is used for a missing bound
+  '''
+  col = levels[idx]
+  if col == 'day' and levels[:2] == ('year', 'month') and values is not None:
+    return 1, calendar.monthrange(values[0], values[1])[1]
+  return NATURAL_BOUNDS.get(col, (None, None))
+
+def _at_bound (levels: Sequence[str], values: tuple, idx: int, lower: bool) -> bool:
+  '''
+  Check if the columns from the given index onwards are all at
+  their natural minimum (or maximum)
+
+  Parameters
+  ----------
+  levels: list
+    Calendar columns from the coarsest to the finest one
+
+  values: tuple
+    Values of the calendar columns
+
+  idx: int
+    Index of the first column to evaluate
+
+  lower: bool
+    Check the minimum (True) or the maximum (False) value
+
+  Returns
+  -------
+  check: bool
+    True if all the columns are at the bound
+  '''
+  for i in range(idx, len(levels)):
+    bound = _natural_bounds(levels, values, i)[0 if lower else 1]
+    if bound is None or values[i] != bound:
+      return False
+  return True
+
+def _decompose (levels: Sequence[str], lo: Optional[tuple], hi: Optional[tuple], idx: int) -> List[List[Tuple[str, str]]]:
+  '''
+  Split the closed lexicographic range of the calendar values
+  into conjunctions of conditions
+
+  Parameters
+  ----------
+  levels: list
+    Calendar columns from the coarsest to the finest one
+
+  lo: tuple
+    Lower bound of the range (None if unbounded)
+
+  hi: tuple
+    Upper bound of the range (None if unbounded)
+
+  idx: int
+    Index of the current column
+
+  Returns
+  -------
+  conditions: list
+    List of (column, expression) lists in chronological order
+  '''
+  if idx == len(levels) or (lo is None and hi is None):
+    return [[]]
+
+  col = levels[idx]
+  if lo is not None and hi is not None and lo[idx] == hi[idx]:
+    return [[(col, f'={lo[idx]}')] + conds for conds in _decompose(levels, lo, hi, idx + 1)]
+
+  left, right = [], []
+  mid_lo = lo[idx] if lo is not None else None
+  mid_hi = hi[idx] if hi is not None else None
+  # partial units at the edges of the range
+  if lo is not None and not _at_bound(levels, lo, idx + 1, lower=True):
+    left = [[(col, f'={lo[idx]}')] + conds for conds in _decompose(levels, lo, None, idx + 1)]
+    mid_lo += 1
+  if hi is not None and not _at_bound(levels, hi, idx + 1, lower=False):
+    right = [[(col, f'={hi[idx]}')] + conds for conds in _decompose(levels, None, hi, idx + 1)]
+    mid_hi -= 1
+
+  # whole units in the middle, without the redundant bounds
+  natural = _natural_bounds(levels, lo if lo is not None else hi, idx)
+  first = mid_lo if mid_lo is not None else natural[0]
+  last = mid_hi if mid_hi is not None else natural[1]
+  if first is not None and last is not None and first > last:
+    return left + right
+  if first is not None and first == last:
+    middle = [(col, f'={first}')]
+  else:
+    middle = []
+    if mid_lo is not None and mid_lo != natural[0]:
+      middle.append((col, f'>={mid_lo}'))
+    if mid_hi is not None and mid_hi != natural[1]:
+      middle.append((col, f'<={mid_hi}'))
+  return left + [middle] + right
+
+def range_conditions (
+  start: Union[str, date, datetime],
+  end: Union[str, date, datetime],
+  levels: Sequence[str],
+) -> List[List[Tuple[str, str]]]:
+  '''
+  Compile the time range [start, end) into the smallest set of
+  conjunctions of conditions on the calendar columns.
+  The range is rounded to the finest given column, thus the
+  records at the edges must be trimmed locally.
+
+  Parameters
+  ----------
+  start: str or datetime
+    Beginning of the range (included)
+
+  end: str or datetime
+    End of the range (excluded)
+
+  levels: list
+    Calendar columns to use from the coarsest to the finest one,
+    i.e. a prefix of TIME_COLUMNS
+
+  Returns
+  -------
+  conditions: list
+    List of (column, expression) lists in chronological order.
+    Each list is a query and the queries cover disjoint ranges
+
+  Examples
+  --------
+  >>> range_conditions('2025-09-10T08:30', '2025-09-12T17:00', ('year', 'month', 'day', 'hour'))
+  [[('year', '=2025'), ('month', '=9'), ('day', '=10'), ('hour', '>=8')],
+   [('year', '=2025'), ('month', '=9'), ('day', '=11')],
+   [('year', '=2025'), ('month', '=9'), ('day', '=12'), ('hour', '<=16')]]
+  '''
+  levels = tuple(levels)
+  if levels != TIME_COLUMNS[:len(levels)]:
+    raise ValueError(f'The levels must be a prefix of {list(TIME_COLUMNS)}')
+  start, end = to_datetime(start), to_datetime(end)
+  if start >= end:
+    return []
+  # closed range of the units
+  last = end - timedelta(microseconds=1)
+  lo = tuple(getattr(start, col) for col in levels)
+  hi = tuple(getattr(last, col) for col in levels)
+  return _decompose(levels, lo, hi, 0)
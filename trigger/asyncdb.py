@@ -0,0 +1,697 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import asyncio
+from functools import partial
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Optional
+from typing import Iterator
+from typing import AsyncIterator
+from typing import Callable
+from typing import TYPE_CHECKING
+from datetime import datetime
+
+from .db import TriggerDB
+from .db import QueryBuilder
+from .db import PreparedQuery
+from .db import DEFAULT_LIMIT
+from .db import MAXIMUM_LIMIT
+from .cache import QueryCache
+from .resultset import ResultSet
+from .predicates import Predicate
+from .predicates import where_alternatives
+from .throttle import AdaptiveLimiter
+
+if TYPE_CHECKING:
+  from .metrics import Metrics
+  from .transport import FaultInjector
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'AsyncTriggerDB',
+  'AsyncQueryBuilder',
+  'AsyncPreparedQuery',
+]
+
+class AsyncTriggerDB (object):
+  '''
+  Asynchronous interface for Trigger Server APIs
+
+  The requests are sent over the pooled session of a
+  TriggerDB object by a dedicated pool of threads, so the
+  event loop is never blocked.
+  The number of requests in flight is bounded by a semaphore.
+
+  Parameters
+  ----------
+  cfg : dict (default := None)
+    Dictionary with user credentials in the form
+    {'email': 'username', 'password': 'secret_pwd'}
+
+  max_concurrency : int (default := 32)
+    Maximum number of requests in flight.
+    It sets also the size of the connection pool and the
+    number of threads of the pool, since each request in
+    flight blocks a thread: values of a few hundreds spawn
+    as many OS threads, thus a higher concurrency should be
+    reached with more processes
+
+  keep_alive : bool (default := True)
+    Re-use the connections among consecutive queries
+
+  retries : int (default := 3)
+    Number of retries of the queries on connection errors,
+    timeouts and overloaded server (429/5xx)
+
+  timeout : float or tuple (default := (10, 300))
+    Connect and read timeouts of the requests in seconds
+
+  throttle : bool or AdaptiveLimiter (default := True)
+    Adaptive limit of the concurrent queries, reduced when
+    the server is overloaded
+
+  cache : bool or QueryCache (default := None)
+    On-disk cache of the query results.
+    If True, a cache with the default settings is used
+
+  token_cache : bool (default := False)
+    Re-use the cached session token of a previous connection
+
+  token_ttl : float (default := 3600)
+    Time-to-live in seconds of the cached session token
+
+  logout : bool (default := None)
+    Perform the logout when the object is closed.
+    If None, the logout is performed only without the
+    token cache (see TriggerDB)
+
+  columnar : bool (default := False)
+    Return the results of the queries as ResultSet
+
+  host : str (default := None)
+    Base url of the server APIs.
+    If None, the Trigger server is used
+
+  transport : str (default := None)
+    'record' or 'replay' the exchanges with the server
+    (see TriggerDB)
+
+  cassette : str (default := None)
+    Path of the cassette file of the transport
+
+  faults : dict or FaultInjector (default := None)
+    Faults injected in the responses of the queries
+
+  metrics : bool, Metrics or callable (default := None)
+    Collector of the timings of the queries (see TriggerDB)
+
+  Examples
+  --------
+  Example of concurrent queries::
+
+    import asyncio
+    from trigger import AsyncTriggerDB
+
+    async def main (emails):
+      async with AsyncTriggerDB(max_concurrency=64) as db:
+        return await asyncio.gather(*(
+          db.from_('myair').where(email=f'={email}').fetch()
+          for email in emails
+        ))
+  '''
+
+  # the validation is shared with the synchronous interface
+  _available_tables = TriggerDB._available_tables
+  _valid_functions = TriggerDB._valid_functions
+  _valid_columns = TriggerDB._valid_columns
+  _check_table = TriggerDB._check_table
+  _check_column = TriggerDB._check_column
+  _is_valid_column_or_agg = TriggerDB._is_valid_column_or_agg
+  _keyset_columns = TriggerDB._keyset_columns
+  _build_params = TriggerDB._build_params
+
+  def __init__ (
+    self,
+    cfg : dict = None,
+    max_concurrency : int = 32,
+    keep_alive : bool = True,
+    retries : int = 3,
+    timeout : Union[float, Tuple[float, float]] = (10, 300),
+    throttle : Union[bool, AdaptiveLimiter] = True,
+    cache : Union[bool, QueryCache] = None,
+    token_cache : bool = False,
+    token_ttl : float = 3600,
+    logout : Optional[bool] = None,
+    columnar : bool = False,
+    host : str = None,
+    transport : str = None,
+    cassette : str = None,
+    faults : Union[dict, 'FaultInjector'] = None,
+    metrics : Union[bool, 'Metrics', Callable[[dict], None]] = None,
+  ):
+    if max_concurrency < 1:
+      raise ValueError('The maximum concurrency must be positive')
+
+    self._cfg = cfg
+    self._max_concurrency = max_concurrency
+    self._keep_alive = keep_alive
+    self._retries = retries
+    self._timeout = timeout
+    self._throttle = throttle
+    self._cache = cache
+    self._token_cache = token_cache
+    self._token_ttl = token_ttl
+    self._logout = logout
+    self._columnar = columnar
+    self._host = host
+    self._transport = transport
+    self._cassette = cassette
+    self._faults = faults
+    self._metrics = metrics
+    self._db: Optional[TriggerDB] = None
+    self._executor: Optional[ThreadPoolExecutor] = None
+    self._semaphore: Optional[asyncio.Semaphore] = None
+
+  @property
+  def _client (self) -> TriggerDB:
+    '''
+    Synchronous interface of the requests, available only
+    after the login
+    '''
+    if self._db is None:
+      raise RuntimeError('Login required before any query')
+    return self._db
+
+  async def _run (self, func, *args, **kwargs):
+    '''
+    Run the blocking function in the pool of threads
+
+    Parameters
+    ----------
+    func: callable
+      Blocking function to run
+
+    args: tuple
+      Positional arguments of the function
+
+    kwargs: dict
+      Keyword arguments of the function
+
+    Returns
+    -------
+    res: object
+      Result of the function
+    '''
+    if self._db is None:
+      raise RuntimeError('Login required before any query')
+    loop = asyncio.get_running_loop()
+    async with self._semaphore:
+      return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+  async def login (self):
+    '''
+    Open the pool of connections and perform the login
+    '''
+    if self._db is not None:
+      return self
+
+    self._executor = ThreadPoolExecutor(
+      max_workers=self._max_concurrency,
+      thread_name_prefix='trigger',
+    )
+    self._semaphore = asyncio.Semaphore(self._max_concurrency)
+    loop = asyncio.get_running_loop()
+    try:
+      self._db = await loop.run_in_executor(
+        self._executor,
+        partial(
+          TriggerDB,
+          cfg=self._cfg,
+          pool_size=self._max_concurrency,
+          keep_alive=self._keep_alive,
+          retries=self._retries,
+          timeout=self._timeout,
+          throttle=self._throttle,
+          spinner=False,
+          cache=self._cache,
+          token_cache=self._token_cache,
+          token_ttl=self._token_ttl,
+          logout=self._logout,
+          columnar=self._columnar,
+          host=self._host,
+          transport=self._transport,
+          cassette=self._cassette,
+          faults=self._faults,
+          metrics=self._metrics,
+        )
+      )
+    except Exception:
+      self._executor.shutdown(wait=False)
+      self._executor = None
+      raise
+    return self
+
+  async def aclose (self):
+    '''
+    Perform the logout and release the pool of connections
+    '''
+    if self._db is None:
+      return
+    try:
+      await self._run(self._db._logout)
+    finally:
+      self._db = None
+      self._executor.shutdown(wait=True)
+      self._executor = None
+
+  async def __aenter__ (self):
+    return await self.login()
+
+  async def __aexit__ (self, exc_type, exc_value, traceback):
+    await self.aclose()
+    return False  # suppress exception failed
+
+  def tables (self) -> list:
+    '''
+    Get the list of available tables
+
+    Returns
+    -------
+      tables: list
+        List of table names in the database
+    '''
+    return list(self._available_tables.keys())
+
+  def columns (self, table: str) -> list:
+    '''
+    Get the list of available columns in the current table
+
+    Parameters
+    ----------
+    table: str
+      Table name to evaluate
+
+    Returns
+    -------
+      columns: list
+        Available column names in the desired table
+    '''
+    self._check_table(table)
+    return self._available_tables[table]
+
+  async def accounts (self) -> list:
+    '''
+    Get the list of available accounts
+
+    Returns
+    -------
+    accounts: list
+      List of account names registered
+    '''
+    return await self._run(self._client.accounts)
+
+  async def num_elements (self, table: str) -> int:
+    '''
+    Get the number of elements in the given
+    table
+
+    Parameters
+    ----------
+    table: str
+      Table name to evaluate
+
+    Returns
+    -------
+    num: int
+      Number of elements in the table
+    '''
+    return await self._run(self._client.num_elements, table)
+
+  async def select (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order_by: str = None,
+    order: str = 'ASC',
+    limit: int = DEFAULT_LIMIT,
+    stream: bool = False,
+    columnar: Optional[bool] = None,
+  ) -> Union[list, ResultSet]:
+    '''
+    Select interface for the GET query of the available tables.
+    See TriggerDB.select for the description of the parameters.
+    The streaming of the records is provided by iter_select.
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting filtered dataset
+    '''
+    if stream:
+      raise ValueError('Streaming is not available in select: use iter_select instead')
+    # validate the query before occupying a slot of the pool
+    alternatives = where_alternatives(where)
+    if len(alternatives) != 1:
+      # the sub-queries are run by the pool of the synchronous interface
+      return await self._run(
+        self._client.select,
+        table=table,
+        columns=columns,
+        where=where,
+        order_by=order_by,
+        order=order,
+        limit=limit,
+        columnar=columnar,
+      )
+    params = self._build_params(
+      table=table,
+      columns=columns,
+      where=alternatives[0],
+      order_by=order_by,
+      order=order,
+      limit=limit,
+    )
+    if self._columnar if columnar is None else columnar:
+      return await self._run(self._client._collect, table=table, params=params)
+    return await self._run(self._client._request, table=table, params=params)
+
+  async def iter_select (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    page_size: int = MAXIMUM_LIMIT,
+  ) -> AsyncIterator[dict]:
+    '''
+    Iterate over the whole result set of a query, paging
+    through the records sorted by timestamp.
+    See TriggerDB.iter_select for the description of the parameters.
+
+    Returns
+    -------
+    rows: AsyncIterator[dict]
+      Asynchronous generator of the resulting records
+    '''
+    rows = self._client.iter_select(
+      table=table,
+      columns=columns,
+      where=where,
+      order=order,
+      limit=limit,
+      page_size=page_size,
+      prefetch=False,
+    )
+    async for row in self._iter_rows(rows, batch=page_size):
+      yield row
+
+  async def iter_range (
+    self,
+    table: str,
+    start: Union[str, datetime],
+    end: Union[str, datetime],
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    resolution: str = 'minute',
+    page_size: int = MAXIMUM_LIMIT,
+  ) -> AsyncIterator[dict]:
+    '''
+    Iterate over the records of the time range [start, end).
+    See TriggerDB.range_select for the description of the parameters.
+
+    Returns
+    -------
+    rows: AsyncIterator[dict]
+      Asynchronous generator of the resulting records
+    '''
+    rows = self._client.iter_range(
+      table=table,
+      start=start,
+      end=end,
+      columns=columns,
+      where=where,
+      order=order,
+      limit=limit,
+      resolution=resolution,
+      page_size=page_size,
+      prefetch=False,
+    )
+    async for row in self._iter_rows(rows, batch=page_size):
+      yield row
+
+  async def _iter_rows (self, rows: Iterator[dict], batch: int) -> AsyncIterator[dict]:
+    '''
+    Consume the blocking generator of records in the pool of threads
+
+    Parameters
+    ----------
+    rows: Iterator[dict]
+      Generator of the records
+
+    batch: int
+      Number of records to consume for each call
+
+    Returns
+    -------
+    rows: AsyncIterator[dict]
+      Asynchronous generator of the records
+    '''
+    if self._db is None:
+      raise RuntimeError('Login required before any query')
+    loop = asyncio.get_running_loop()
+    pending = None
+    try:
+      while True:
+        async with self._semaphore:
+          pending = loop.run_in_executor(self._executor, lambda: list(islice(rows, batch)))
+          # the call keeps running in its thread if the task is cancelled
+          page = await asyncio.shield(pending)
+        if not page:
+          break
+        for row in page:
+          yield row
+    finally:
+      # the generator can not be closed while it is running
+      if pending is not None and not pending.done():
+        await asyncio.wait([pending])
+      rows.close()
+
+  async def parallel_select (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    workers: int = 8,
+    shard: str = 'day',
+    page_size: int = MAXIMUM_LIMIT,
+    columnar: Optional[bool] = None,
+  ) -> Union[list, ResultSet]:
+    '''
+    Split the time range of the query into disjoint calendar
+    units and retrieve them concurrently.
+    See TriggerDB.parallel_select for the description of the parameters.
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records sorted by timestamp
+    '''
+    return await self._run(
+      self._client.parallel_select,
+      table=table,
+      columns=columns,
+      where=where,
+      order=order,
+      limit=limit,
+      workers=workers,
+      shard=shard,
+      page_size=page_size,
+      columnar=columnar,
+    )
+
+  async def range_select (
+    self,
+    table: str,
+    start: Union[str, datetime],
+    end: Union[str, datetime],
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    resolution: str = 'minute',
+    workers: int = 1,
+    page_size: int = MAXIMUM_LIMIT,
+    columnar: Optional[bool] = None,
+  ) -> Union[list, ResultSet]:
+    '''
+    Retrieve the records of the time range [start, end).
+    See TriggerDB.range_select for the description of the parameters.
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records sorted by timestamp
+    '''
+    return await self._run(
+      self._client.range_select,
+      table=table,
+      start=start,
+      end=end,
+      columns=columns,
+      where=where,
+      order=order,
+      limit=limit,
+      resolution=resolution,
+      workers=workers,
+      page_size=page_size,
+      columnar=columnar,
+    )
+
+  def from_ (self, table: str):
+    '''
+    Chaining interface for the query management
+
+    Parameters
+    ----------
+    table: str
+      Table name to use in the query
+
+    Returns
+    -------
+    builder: AsyncQueryBuilder
+      Builder of the query for the chaining interface
+    '''
+    return AsyncQueryBuilder(self, table)
+
+class AsyncQueryBuilder (QueryBuilder):
+  '''
+  Build the query in chaining mode for the asynchronous
+  interface: fetch must be awaited and iter returns an
+  asynchronous generator.
+
+  Parameters
+  ----------
+  db: AsyncTriggerDB
+    Database instance to use for the request
+
+  table: str
+    Table name to use in the query
+  '''
+
+  async def fetch (self, columnar: Optional[bool] = None) -> Union[list, ResultSet]:
+    '''
+    Extract the results calling the request
+
+    Parameters
+    ----------
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the database object is used
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting response of the given request
+    '''
+    return await super().fetch(columnar=columnar)
+
+  def compile (self):
+    '''
+    Validate the query once and freeze it into a reusable
+    prepared query, whose execution must be awaited
+
+    Returns
+    -------
+    prepared: AsyncPreparedQuery
+      Immutable and hashable query
+    '''
+    return AsyncPreparedQuery(self)
+
+  def iter (self, page_size: int = MAXIMUM_LIMIT) -> AsyncIterator[dict]:
+    '''
+    Iterate over the whole result set of the query, paging
+    through the records sorted by timestamp.
+
+    Parameters
+    ----------
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    Returns
+    -------
+    rows: AsyncIterator[dict]
+      Asynchronous generator of the resulting records
+    '''
+    if self._range is not None:
+      start, end, resolution = self._range
+      return self.db.iter_range(
+        table=self.table,
+        start=start,
+        end=end,
+        columns=self._columns,
+        where=self._where,
+        order=self._order,
+        limit=self._limit,
+        resolution=resolution,
+        page_size=page_size,
+      )
+
+    return self.db.iter_select(
+      table=self.table,
+      columns=self._columns,
+      where=self._where,
+      order=self._order,
+      limit=self._limit,
+      page_size=page_size,
+    )
+
+class AsyncPreparedQuery (PreparedQuery):
+  '''
+  Immutable query validated once at compile time, for
+  the asynchronous interface: execute must be awaited.
+
+  Parameters
+  ----------
+  builder: AsyncQueryBuilder
+    Builder of the query to compile
+  '''
+
+  __slots__ = ()
+
+  async def execute (self, columnar: Optional[bool] = None, **bindings: str) -> Union[list, ResultSet]:
+    '''
+    Run the query with the bound conditions
+
+    Parameters
+    ----------
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the database object is used
+
+    **bindings: str
+      Conditions to add to the query as 'name=val'
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records
+    '''
+    params = self._bound_params(bindings)
+    if params is None:
+      return await self._dispatch(self._bind(bindings), stream=False, columnar=columnar)
+    if self.db._columnar if columnar is None else columnar:
+      return await self.db._run(self.db._client._collect, table=self.table, params=params)
+    return await self.db._run(self.db._client._request, table=self.table, params=params)
@@ -0,0 +1,330 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import time
+import hashlib
+import calendar
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict
+from typing import Union
+from typing import Optional
+
+from ._credentials import CONFIG_DIR
+from ._timerange import column_bounds
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'QueryCache',
+]
+
+# default location of the cached results
+CACHE_DIR = CONFIG_DIR / 'cache'
+
+# condition as 'nameOPvalue'
+_CONDITION = re.compile(r"^([a-zA-Z_]\w*)(.*)$")
+
+class QueryCache (object):
+  '''
+  On-disk cache of the query results
+
+  Each result is stored in a separated file keyed by the
+  normalized parameters of the request and by the server and
+  account which sent it, since the visible records depend on
+  the logged user.
+  The queries restricted to past days never change, thus
+  they are kept until evicted, while the others expire after
+  the time-to-live of their table.
+  When the size of the cache exceeds the maximum, the least
+  recently used entries are removed.
+
+  Parameters
+  ----------
+  path : str (default := None)
+    Directory of the cache.
+    If None, $HOME/.config/pytrigger/cache is used
+
+  ttl : float (default := 300)
+    Time-to-live in seconds of the results which include
+    the current day
+
+  table_ttl : dict (default := None)
+    Time-to-live in seconds for specific tables,
+    overriding the default one
+
+  max_bytes : int (default := 256 MB)
+    Maximum size of the cache on disk
+
+  Examples
+  --------
+  Example of a cached connection::
+
+    from trigger import TriggerDB
+    from trigger import QueryCache
+
+    cache = QueryCache(ttl=60, table_ttl={'accounts': 3600})
+
+    with TriggerDB(cache=cache) as db:
+      res = db.select('myair', where={'year': '=2025', 'month': '=9', 'day': '=10'})
+
+    print(cache.stats())
+  '''
+
+  def __init__ (
+    self,
+    path : Union[str, Path] = None,
+    ttl : float = 300,
+    table_ttl : Dict[str, float] = None,
+    max_bytes : int = 256 * 1024 * 1024,
+  ):
+    self.path = Path(path) if path is not None else CACHE_DIR
+    self.ttl = ttl
+    self.table_ttl = dict(table_ttl or {})
+    self.max_bytes = max_bytes
+
+    self.hits = 0
+    self.misses = 0
+
+    self._lock = threading.Lock()
+    self.path.mkdir(parents=True, exist_ok=True)
+    # set the privileges
+    try:
+      self.path.chmod(0o700)
+    except Exception:
+      pass
+    self._size = sum(f.stat().st_size for f in self._entries())
+
+  def _entries (self) -> list:
+    '''
+    Get the list of files stored in the cache
+    '''
+    return list(self.path.glob('*.json'))
+
+  @staticmethod
+  def key (table: str, params: dict, scope: str = None) -> str:
+    '''
+    Get the identifier of the request
+
+    Parameters
+    ----------
+    table: str
+      Name of the table of the request
+
+    params: dict
+      Parameters of the request
+
+    scope: str (default := None)
+      Identity of the server and of the account of the request
+
+    Returns
+    -------
+    key: str
+      Hash of the normalized parameters
+    '''
+    normalized = dict(params, table=table, scope=scope)
+    # the order of the conditions does not change the results
+    if normalized.get('where'):
+      normalized['where'] = ','.join(sorted(normalized['where'].split(',')))
+    normalized = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+  def _expiration (self, table: str, params: dict) -> Optional[float]:
+    '''
+    Get the expiration time of the results of the request
+
+    Parameters
+    ----------
+    table: str
+      Name of the table of the request
+
+    params: dict
+      Parameters of the request
+
+    Returns
+    -------
+    expires: float
+      Timestamp of the expiration.
+      None if the results never expire
+    '''
+    conds = [
+      match.groups()
+      for cond in (params.get('where') or '').split(',')
+      if (match := _CONDITION.match(cond))
+    ]
+    year = column_bounds(conds, 'year')[1]
+    month = column_bounds(conds, 'month')[1]
+    day = column_bounds(conds, 'day')[1]
+
+    # last day covered by the request
+    last = None
+    try:
+      if year is not None and month is not None and day is not None:
+        last = date(year, month, day)
+      elif year is not None and month is not None:
+        last = date(year, month, calendar.monthrange(year, month)[1])
+      elif year is not None:
+        last = date(year, 12, 31)
+    except ValueError:
+      last = None
+
+    # past days never change
+    if last is not None and last < date.today():
+      return None
+    return time.time() + self.table_ttl.get(table, self.ttl)
+
+  def get (self, table: str, params: dict, scope: str = None) -> Optional[list]:
+    '''
+    Get the cached results of the request
+
+    Parameters
+    ----------
+    table: str
+      Name of the table of the request
+
+    params: dict
+      Parameters of the request
+
+    scope: str (default := None)
+      Identity of the server and of the account of the request
+
+    Returns
+    -------
+    res: list
+      Cached results or None if not available
+    '''
+    filename = self.path / f'{self.key(table, params, scope)}.json'
+    try:
+      entry = json.loads(filename.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+      with self._lock:
+        self.misses += 1
+      return None
+
+    if entry['expires'] is not None and entry['expires'] < time.time():
+      self._remove(filename)
+      with self._lock:
+        self.misses += 1
+      return None
+
+    # mark the entry as recently used
+    try:
+      os.utime(filename)
+    except OSError:
+      pass
+    with self._lock:
+      self.hits += 1
+    return entry['rows']
+
+  def put (self, table: str, params: dict, rows: list, scope: str = None):
+    '''
+    Store the results of the request
+
+    Parameters
+    ----------
+    table: str
+      Name of the table of the request
+
+    params: dict
+      Parameters of the request
+
+    rows: list
+      Results of the request
+
+    scope: str (default := None)
+      Identity of the server and of the account of the request
+    '''
+    entry = json.dumps(
+      {
+        'expires': self._expiration(table, params),
+        'rows': rows,
+      },
+      separators=(',', ':'),
+    ).encode('utf-8')
+    # too large to be stored
+    if len(entry) > self.max_bytes:
+      return
+
+    filename = self.path / f'{self.key(table, params, scope)}.json'
+    tmp = filename.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp.write_bytes(entry)
+    previous = filename.stat().st_size if filename.exists() else 0
+    os.replace(tmp, filename)
+
+    with self._lock:
+      self._size += len(entry) - previous
+      oversize = self._size > self.max_bytes
+    if oversize:
+      self._evict()
+
+  def _remove (self, filename: Path):
+    '''
+    Remove an entry of the cache
+
+    Parameters
+    ----------
+    filename: Path
+      File of the entry to remove
+    '''
+    try:
+      size = filename.stat().st_size
+      filename.unlink()
+    except OSError:
+      return
+    with self._lock:
+      self._size -= size
+
+  def _evict (self):
+    '''
+    Remove the least recently used entries until the
+    size of the cache is within the maximum
+    '''
+    entries = []
+    for filename in self._entries():
+      try:
+        stat = filename.stat()
+      except OSError:
+        continue
+      entries.append((stat.st_mtime, stat.st_size, filename))
+    entries.sort()
+
+    with self._lock:
+      # re-sync with the files written by other processes
+      self._size = sum(size for _, size, _ in entries)
+
+    for _, _, filename in entries:
+      if self._size <= self.max_bytes:
+        break
+      self._remove(filename)
+
+  def clear (self):
+    '''
+    Remove all the entries of the cache
+    '''
+    for filename in self._entries():
+      self._remove(filename)
+    with self._lock:
+      self.hits = 0
+      self.misses = 0
+
+  def stats (self) -> dict:
+    '''
+    Get the usage statistics of the cache
+
+    Returns
+    -------
+    stats: dict
+      Number of hits, misses, entries and bytes stored
+    '''
+    with self._lock:
+      return {
+        'hits': self.hits,
+        'misses': self.misses,
+        'entries': len(self._entries()),
+        'bytes': self._size,
+      }
@@ -1,20 +1,64 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import os
 import re
-import requests
+import time
+import heapq
+import atexit
+import weakref
+import threading
+from itertools import chain
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
 from typing import List
 from typing import Dict
+from typing import Tuple
 from typing import Union
+from typing import Iterator
+from typing import Callable
 from typing import Optional
+from typing import NamedTuple
+from typing import Sequence
+from typing import TYPE_CHECKING
+from datetime import datetime
 
 from .utils import RESET_COLOR_CODE
 from .utils import ORANGE_COLOR_CODE
 from .utils import GREEN_COLOR_CODE
 from .utils import RED_COLOR_CODE
 from .utils import buffered_request
-
+from .utils import make_session
+from .utils import iter_json_array
+
+from .cache import QueryCache
+from .metrics import Metrics
+from .progress import ProgressReporter
+from .progress import progress_reporter
+from .throttle import AdaptiveLimiter
+from .throttle import backoff_delay
+from .export import export_signal
+from .resultset import ResultSet
+from .lazy import LazyFrame
+from .resample import Resampler
+from .predicates import Predicate
+from .predicates import Condition
+from .predicates import where_alternatives
 from ._credentials import ensure_credentials_on_first_use
+from ._credentials import _stored_email
+from ._credentials import _store_token
+from ._credentials import _load_token
+from ._credentials import _clear_token
+from ._timerange import SHARD_LEVELS
+from ._timerange import TIME_COLUMNS
+from ._timerange import time_shards
+from ._timerange import to_datetime
+from ._timerange import range_conditions
+
+if TYPE_CHECKING:
+  from .transport import FaultInjector
 
 __author__  = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
@@ -27,6 +71,112 @@ __all__ = [
 SERVER_PORT=8083
 SERVER_HOST='https://trigger-io.difa.unibo.it/api'
 MAXIMUM_LIMIT=10_000
+DEFAULT_LIMIT=100
+STREAM_CHUNK_SIZE=64 * 1024
+# responses of an overloaded server
+RETRY_STATUS=(429, 500, 502, 503, 504)
+
+class AccountResult (NamedTuple):
+  '''
+  Result of the query for a single account
+
+  Parameters
+  ----------
+  email: str
+    Account of the query
+
+  rows: list
+    Resulting records (None if the query failed)
+
+  error: Exception
+    Error raised by the query (None if the query succeeded)
+  '''
+  email: str
+  rows: Optional[list]
+  error: Optional[Exception]
+
+class _Done (object):
+  '''
+  Already completed result with the Future interface
+  '''
+
+  def __init__ (self, value):
+    self._value = value
+
+  def result (self):
+    return self._value
+
+def _timed_chunks (chunks: Iterator[bytes], timing: dict) -> Iterator[bytes]:
+  '''
+  Count the bytes of the chunks of the response and the time
+  spent waiting them
+  '''
+  chunks = iter(chunks)
+  while True:
+    tic = time.perf_counter()
+    chunk = next(chunks, None)
+    timing['read'] += time.perf_counter() - tic
+    if chunk is None:
+      return
+    timing['bytes'] += len(chunk)
+    yield chunk
+
+def _timed_rows (rows: Iterator[dict], timing: dict) -> Iterator[dict]:
+  '''
+  Count the decoded records and the time spent to produce them,
+  excluding the time spent by the consumer
+  '''
+  tic = time.perf_counter()
+  for row in rows:
+    timing['rows'] += 1
+    timing['active'] += time.perf_counter() - tic
+    yield row
+    tic = time.perf_counter()
+  timing['active'] += time.perf_counter() - tic
+
+def _progress_chunks (chunks: Iterator[bytes], progress: ProgressReporter) -> Iterator[bytes]:
+  '''
+  Count the received bytes in the progress
+  '''
+  for chunk in chunks:
+    progress.add(nbytes=len(chunk))
+    yield chunk
+
+def _progress_rows (rows: Iterator[dict], progress: ProgressReporter, every: int = 1024) -> Iterator[dict]:
+  '''
+  Count the decoded records in the progress, a group at a time
+  '''
+  count = 0
+  for count, row in enumerate(rows, start=1):
+    if count % every == 0:
+      progress.add(rows=every)
+    yield row
+  progress.add(rows=count % every)
+
+def _column_sets (tables: Dict[str, List[str]], functions: set) -> Dict[str, frozenset]:
+  '''
+  Precompute the valid columns and aggregated functions
+  of each table
+
+  Parameters
+  ----------
+  tables: dict
+    Column names of each table
+
+  functions: set
+    Available aggregated functions
+
+  Returns
+  -------
+  columns: dict
+    Set of valid columns and aggregated functions of each table
+  '''
+  return {
+    table: frozenset(columns) | frozenset(
+      f'{func}({col})' for func in functions for col in columns
+    ) | {'COUNT(*)'}
+    for table, columns in tables.items()
+  }
 
 class TriggerDB (object):
   '''
@@ -38,6 +188,87 @@ class TriggerDB (object):
     Dictionary with user credentials in the form
     {'email': 'username', 'password': 'secret_pwd'}
 
+  pool_size : int (default := 10)
+    Maximum number of connections kept alive in the
+    session pool shared by all the queries
+
+  keep_alive : bool (default := True)
+    Re-use the connections among consecutive queries
+
+  retries : int (default := 3)
+    Number of retries of the queries on connection errors,
+    timeouts and overloaded server (429/5xx), with
+    exponential backoff and jitter
+
+  timeout : float or tuple (default := (10, 300))
+    Connect and read timeouts of the requests in seconds
+
+  throttle : bool or AdaptiveLimiter (default := True)
+    Adaptive limit of the concurrent queries, reduced when the
+    server is overloaded and increased back on success.
+    If True, the limit starts from the pool size (which also
+    bounds it, unless a pool is used for each thread).
+    If False, the queries are not throttled
+
+  spinner : bool (default := True)
+    Display the progress of the queries in flight (records/sec
+    and bytes/sec) on the standard error. The progress is shared
+    by all the queries of the process and it is displayed only
+    if the standard error is a terminal (see trigger.progress)
+
+  cache : bool or QueryCache (default := None)
+    On-disk cache of the query results.
+    If True, a cache with the default settings is used
+
+  token_cache : bool (default := False)
+    Store the session token (encrypted) in the configuration
+    directory and re-use it in the next connections until it
+    expires, skipping the login.
+    The token is not logged out on exit, unless required
+
+  token_ttl : float (default := 3600)
+    Time-to-live in seconds of the cached session token
+
+  logout : bool (default := None)
+    Perform the logout when the object is closed.
+    Disable it to keep the session token valid for the
+    next processes.
+    If None, the logout is performed only without the
+    token cache
+
+  per_thread_session : bool (default := False)
+    Use a separated pool of connections for each thread.
+    See TriggerDB.shared for the process-wide instance
+
+  columnar : bool (default := False)
+    Return the results of the queries as ResultSet, storing
+    each column in a typed array instead of a list of dictionaries
+
+  host : str (default := None)
+    Base url of the server APIs, e.g. a local server for the
+    tests and the benchmarks.
+    If None, the Trigger server is used
+
+  transport : str (default := None)
+    'record' to store the exchanges with the server into the
+    cassette, 'replay' to answer the requests from the cassette
+    without any connection (the credentials are not required).
+    If None, the requests are sent to the server
+
+  cassette : str (default := None)
+    Path of the cassette file of the transport
+
+  faults : dict or FaultInjector (default := None)
+    Faults injected in the responses of the queries, e.g.
+    {'latency': 0.01, 'error_rate': 0.1, 'truncate_rate': 0.05, 'seed': 42}.
+    See trigger.transport.FaultInjector for the available keys
+
+  metrics : bool, Metrics or callable (default := None)
+    Collector of the timings of the login, of the queries and
+    of the logout (time to first byte, transfer, decode, bytes
+    and records). A callable is called with each event.
+    If True, a new Metrics is used (see TriggerDB.metrics)
+
   Examples
   --------    
   Example of standard mode connection and query::
@@ -86,24 +317,296 @@ class TriggerDB (object):
   }
 
   _valid_functions = {'AVG', 'SUM', 'COUNT', 'MIN', 'MAX'}
+  _valid_columns = _column_sets(_available_tables, _valid_functions)
 
-  def __init__ (self, cfg : dict = None):
+  # process-wide instance
+  _shared_instance = None
+  _shared_lock = threading.Lock()
 
-    if cfg is None:
-      # Running these lines at the import the script will
-      # load or ask the credentials for the account
+  def __init__ (
+    self,
+    cfg : dict = None,
+    pool_size : int = 10,
+    keep_alive : bool = True,
+    retries : int = 3,
+    timeout : Union[float, Tuple[float, float]] = (10, 300),
+    throttle : Union[bool, AdaptiveLimiter] = True,
+    spinner : bool = True,
+    cache : Union[bool, QueryCache] = None,
+    token_cache : bool = False,
+    token_ttl : float = 3600,
+    logout : Optional[bool] = None,
+    per_thread_session : bool = False,
+    columnar : bool = False,
+    host : str = None,
+    transport : str = None,
+    cassette : str = None,
+    faults : Union[dict, 'FaultInjector'] = None,
+    metrics : Union[bool, Metrics, Callable[[dict], None]] = None,
+  ):
+
+    self._cfg = cfg
+    if metrics is True:
+      metrics = Metrics()
+    elif callable(metrics) and not isinstance(metrics, Metrics):
+      metrics = Metrics(callback=metrics)
+    self._metrics = metrics or None
+    self._host = (host or SERVER_HOST).rstrip('/')
+    self._columnar = columnar
+    self._spinner = spinner
+    self._progress = progress_reporter() if spinner else None
+    self._cache = QueryCache() if cache is True else (cache or None)
+    self._token_cache = token_cache
+    self._token_ttl = token_ttl
+    self._logout_on_exit = not token_cache if logout is None else logout
+    self._token = None
+    self._logged_out = True
+    self._retries = retries
+    self._timeout = timeout
+    if throttle is True:
+      # a single pool can not serve more requests than its size
+      throttle = AdaptiveLimiter(
+        initial=pool_size,
+        maximum=max(pool_size, 64) if per_thread_session else pool_size,
+      )
+    self._throttle = throttle or None
+
+    # the connections are opened by the process which uses them
+    self._owner_pid = os.getpid()
+    self._session_kwargs = {
+      'pool_size': pool_size,
+      'keep_alive': keep_alive,
+      'retries': retries,
+    }
+    self._cassette = None
+    if transport is not None or faults is not None:
+      self._session_kwargs['wrap_adapter'] = self._transport(transport, cassette, faults)
+    self._per_thread_session = per_thread_session
+    self._reset_connections()
+
+    # re-use the session token of a previous process
+    if token_cache:
+      self._email = cfg['email'] if cfg is not None else _stored_email()
+      self._token = _load_token(self._email) if self._email else None
+
+    if self._token is None:
       try:
-        credentials = ensure_credentials_on_first_use()
-      except Exception as e:
-        print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Invalid credentials found')
-        print(e)
-        raise ValueError('Missing credential infos')
+        self._login()
+      except Exception:
+        self._close_sessions()
+        raise
+
+    self._logged_out = False
+
+  @classmethod
+  def shared (cls, **kwargs):
+    '''
+    Get the process-wide instance shared by all the threads.
+
+    The first call creates the instance with the given parameters,
+    using a separated pool of connections for each thread.
+    The following calls return the same instance, until it is
+    closed. In the processes created by fork, the connections
+    are lazily re-opened re-using the session token of the parent,
+    which is the only process in charge of the logout.
+
+    Parameters
+    ----------
+    kwargs: dict
+      Parameters of the instance, see TriggerDB
+
+    Returns
+    -------
+    db: TriggerDB
+      Shared instance
+
+    Examples
+    --------
+    Example of a shared instance used by a pool of threads::
+
+      from concurrent.futures import ThreadPoolExecutor
+      from trigger import TriggerDB
+
+      def job (email):
+        db = TriggerDB.shared()
+        return db.select('myair', where={'email': f'={email}'})
+
+      with ThreadPoolExecutor(max_workers=16) as executor:
+        res = list(executor.map(job, emails))
+    '''
+    with cls._shared_lock:
+      db = cls._shared_instance
+      if db is None or db._logged_out:
+        kwargs.setdefault('per_thread_session', True)
+        db = cls(**kwargs)
+        cls._shared_instance = db
+        atexit.register(db._logout)
+      return db
+
+  def _reset_connections (self):
+    '''
+    Drop the connections (without closing the ones inherited
+    by the parent process) and the locks of the object
+    '''
+    self._pid = os.getpid()
+    self._lock = threading.RLock()
+    self._local = threading.local()
+    # the sessions opened by the threads
+    self._sessions = weakref.WeakSet()
+    self._main_session = None if self._per_thread_session else self._new_session()
+
+  def _check_fork (self):
+    '''
+    Re-open the connections if the process was forked,
+    since the sockets of the parent can not be shared
+    '''
+    if self._pid != os.getpid():
+      self._reset_connections()
+
+  def _new_session (self):
+    '''
+    Open a new pool of connections
+
+    Returns
+    -------
+    session: requests.Session
+      Session to use for the requests
+    '''
+    session = make_session(**self._session_kwargs)
+    self._sessions.add(session)
+    return session
+
+  @property
+  def _session (self):
+    '''
+    Get the pool of connections of the current process and thread
+
+    Returns
+    -------
+    session: requests.Session
+      Session to use for the requests
+    '''
+    self._check_fork()
+
+    if not self._per_thread_session:
+      return self._main_session
+
+    session = getattr(self._local, 'session', None)
+    if session is None:
+      with self._lock:
+        session = self._new_session()
+      self._local.session = session
+    return session
+
+  def _close_sessions (self):
+    '''
+    Release all the pools of connections opened by the current process
+    '''
+    self._check_fork()
+    with self._lock:
+      for session in list(self._sessions):
+        session.close()
+
+  def _transport (self, transport: Optional[str], cassette: Optional[str], faults):
+    '''
+    Build the custom transport of the sessions
+
+    Parameters
+    ----------
+    transport: str
+      'record', 'replay' or None
+
+    cassette: str
+      Path of the cassette file
+
+    faults: dict or FaultInjector
+      Faults injected in the responses
+
+    Returns
+    -------
+    wrap_adapter: callable
+      Function which wraps the adapter of the connections
+    '''
+    # the transport requires requests, so it is loaded only when used
+    from .transport import Cassette
+    from .transport import CassetteAdapter
+    from .transport import FaultInjector
+
+    if transport is not None:
+      if cassette is None:
+        raise ValueError(f"The '{transport}' transport requires the path of the cassette")
+      self._cassette = Cassette(cassette, mode=transport)
+    if isinstance(faults, dict):
+      faults = FaultInjector(**faults)
+    return lambda adapter: CassetteAdapter(adapter, cassette=self._cassette, faults=faults)
+
+  @property
+  def metrics (self) -> Optional[Metrics]:
+    '''
+    Get the collector of the timings, if any
+    '''
+    return self._metrics
+
+  @property
+  def _cache_scope (self) -> str:
+    '''
+    Get the identity of the cached results, since the records
+    visible to the account depend on the server and on the login
+    '''
+    return f'{self._host}|{self._email}'
+
+  def _emit (self, event: str, start: float, **fields):
+    '''
+    Record the event in the metrics, if any
+
+    Parameters
+    ----------
+    event: str
+      Name of the event
+
+    start: float
+      Beginning of the event as time.perf_counter() value
+
+    **fields: dict
+      Measures of the event
+    '''
+    if self._metrics is not None:
+      self._metrics.emit(event, start=start, duration=time.perf_counter() - start, **fields)
+
+  def _credentials (self) -> dict:
+    '''
+    Get the credentials of the account
+
+    Returns
+    -------
+    credentials: dict
+      Dictionary of email and password of the account
+    '''
     # read the credentials from the configuration file provided
-    else:
-      credentials = cfg
+    if self._cfg is not None:
+      return self._cfg
+
+    # the replayed login does not check the credentials
+    if self._cassette is not None and self._cassette.mode == 'replay':
+      return {'email': self._cassette.email, 'password': ''}
+
+    # Running these lines at the import the script will
+    # load or ask the credentials for the account
+    try:
+      return ensure_credentials_on_first_use()
+    except Exception as e:
+      print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Invalid credentials found')
+      print(e)
+      raise ValueError('Missing credential infos')
+
+  def _login (self):
+    '''
+    Perform the login and store the session token
+    '''
+    credentials = self._credentials()
 
     # set the url of the API
-    api_url = f'{SERVER_HOST}/auth'
+    api_url = f'{self._host}/auth'
     # set the user information for the login
     data = {
       'email' : credentials['email'],
@@ -111,7 +614,9 @@ class TriggerDB (object):
     }
 
     # send the login request
-    res = requests.post(api_url, data=data)
+    start = time.perf_counter()
+    res = self._session.post(api_url, data=data, timeout=self._timeout)
+    self._emit('login', start, status=res.status_code, bytes=len(res.content), ttfb=res.elapsed.total_seconds())
 
     # check the status of the response
     if res.status_code != 200:
@@ -120,28 +625,71 @@ class TriggerDB (object):
 
     # store the token
     self._token = res.text
-    self._logged_out = False
+    self._email = credentials['email']
+    if self._token_cache:
+      _store_token(self._email, self._token, ttl=self._token_ttl)
+
+  def _relogin (self, token: str):
+    '''
+    Renew the session token rejected by the server
+
+    Parameters
+    ----------
+    token: str
+      Session token rejected by the server
+    '''
+    with self._lock:
+      # the token was already renewed by another thread
+      if token != self._token:
+        return
+      print(f'{ORANGE_COLOR_CODE}[WARN]{RESET_COLOR_CODE} Session expired: login again')
+      if self._token_cache:
+        _clear_token(self._email)
+      self._login()
 
   def _logout (self):
     '''
-    Perform the safety logout when the object is destructed
+    Perform the safety logout when the object is destructed.
+    If the logout is disabled, only the pools of connections are
+    released and the session token remains valid.
+    The processes created by fork never log out the session
+    token of the parent.
     '''
     if self._logged_out:
       return  # already done
 
-    api_url = f'{SERVER_HOST}/logout'
-    res = requests.post(
-      api_url,
-      data={"token": self._token}
-    )
+    self._check_fork()
+    with self._lock:
+      if self._logged_out:
+        return  # already done by another thread
+
+      if not self._logout_on_exit or os.getpid() != self._owner_pid:
+        self._close_sessions()
+        self._logged_out = True
+        return
+
+      api_url = f'{self._host}/logout'
+      start = time.perf_counter()
+      try:
+        res = self._session.post(
+          api_url,
+          data={"token": self._token},
+          timeout=self._timeout,
+        )
+        self._emit('logout', start, status=res.status_code, bytes=len(res.content), ttfb=res.elapsed.total_seconds())
+      finally:
+        # release the pools of connections
+        self._close_sessions()
+        self._logged_out = True
+        # the token is not valid anymore
+        if self._token_cache:
+          _clear_token(self._email)
 
     if res.status_code != 200:
       print(f'{ORANGE_COLOR_CODE}[WARN]{RESET_COLOR_CODE} Logout failed: {res.status_code} {res.text}')
     else:
       print(f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} Logout success')
 
-    self._logged_out = True
-
   def __del__ (self):
     '''
     Object destructor leads to logout of the account
@@ -200,6 +748,10 @@ class TriggerDB (object):
     '''
     col = column.strip()
 
+    # precomputed columns and functions (upper case)
+    if col in self._valid_columns[table]:
+      return True
+
     # COUNT(*)
     if col.upper() == 'COUNT(*)':
       return True
@@ -283,6 +835,7 @@ class TriggerDB (object):
       order_by=None,
       order='ASC',
       limit=100000,
+      columnar=False,
     )
   
   def num_elements (self, table: str) -> int:
@@ -303,19 +856,21 @@ class TriggerDB (object):
     return int(self.select(
       table=table,
       columns=['COUNT(email)'],
+      columnar=False,
     )[0]['COUNT(email)'])
 
-  def select (
+  def _build_params (
     self,
     table: str,
     columns: Union[List[str], str] = '*',
-    where: Dict[str, Union[str, int, float]] = None,
+    where: Union[Dict[str, str], List[Tuple[str, str]]] = None,
     order_by: str = None,
     order: str = 'ASC',
-    limit: int = 100,
+    limit: int = DEFAULT_LIMIT,
   ) -> dict:
     '''
-    Select interface for the GET query of the available tables
+    Validate the query arguments and build the parameters
+    of the GET request
 
     Parameters
     ----------
@@ -325,8 +880,10 @@ class TriggerDB (object):
     columns: str
       Name of columns to select from the table
 
-    where: dict
-      Condition to apply on the columns
+    where: dict or list
+      Condition to apply on the columns given as dictionary
+      or as list of (column, expression) pairs.
+      The list form allows multiple conditions on the same column
 
     order_by: str
       Ordering column name
@@ -339,8 +896,8 @@ class TriggerDB (object):
 
     Returns
     -------
-    res: dict
-      Resulting filtered dataset
+    params: dict
+      Parameters of the request
     '''
     # check the table
     self._check_table(table)
@@ -370,7 +927,7 @@ class TriggerDB (object):
     # WHERE
     if where:
       conds = []
-      for col, expr in where.items():
+      for col, expr in (where.items() if isinstance(where, dict) else where):
         self._check_column(table=table, column=col)
         conds.append(f'{col}{expr}')
       params['where'] = ','.join(conds)
@@ -389,114 +946,1617 @@ class TriggerDB (object):
       limit = MAXIMUM_LIMIT
     params['limit'] = limit
 
-    url = f'{SERVER_HOST}/{table}/'
-    # send the buffered request
-    resp = buffered_request(
-      url=url,
-      params=params,
-      headers={'token': self._token}
-    )
+    return params
 
-    if resp.status_code != 200:
-      print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Query error')
-      raise Exception(f'Query Error: {resp.status_code} {resp.text}')
+  def _get (self, url: str, params: dict, token: str, stream: bool = False, timing: Optional[dict] = None):
+    '''
+    Send the GET request, retrying it with exponential backoff
+    and jitter on the connection errors and when the server is
+    overloaded (429/5xx).
+    The concurrency of the requests is adapted by the throttle.
 
-    return resp.json()
-  
-  def from_(self, table: str):
+    Parameters
+    ----------
+    url: str
+      Url of the request
+
+    params: dict
+      Parameters of the request
+
+    token: str
+      Session token to use
+
+    stream: bool (default := False)
+      Read the body of the response while it is consumed
+
+    timing: dict (default := None)
+      Filled with the number of attempts, the time to the first
+      byte and the transfer time of the last attempt
+
+    Returns
+    -------
+    resp: requests.Response
+      Response of the request
     '''
-    Chaining interface for the query management
+    # already loaded by the session of the connection
+    import requests
+
+    for attempt in range(self._retries + 1):
+      if self._throttle is not None:
+        self._throttle.acquire()
+      resp, error = None, None
+      tic = time.perf_counter()
+      try:
+        # send the buffered request
+        resp = buffered_request(
+          url=url,
+          session=self._session,
+          spinner=self._spinner,
+          stream=stream,
+          timeout=self._timeout,
+          params=params,
+          headers={'token': token}
+        )
+      except (requests.ConnectionError, requests.Timeout) as e:
+        error = e
+      except BaseException:
+        if self._throttle is not None:
+          self._throttle.release()
+        raise
+
+      if timing is not None:
+        timing['attempts'] = timing.get('attempts', 0) + 1
+        if resp is not None:
+          # the DNS lookup and the connection are part of the time to first byte
+          timing['ttfb'] = resp.elapsed.total_seconds()
+          timing['transfer'] = 0. if stream else max(time.perf_counter() - tic - timing['ttfb'], 0.)
+
+      overloaded = error is not None or resp.status_code in RETRY_STATUS
+      if self._throttle is not None:
+        self._throttle.release(overloaded=overloaded)
+
+      if not overloaded:
+        return resp
+      if attempt == self._retries:
+        break
+
+      retry_after = None
+      if resp is not None:
+        retry_after = resp.headers.get('Retry-After')
+        resp.close()
+      delay = backoff_delay(attempt, retry_after=retry_after)
+      reason = error if error is not None else resp.status_code
+      print(f'{ORANGE_COLOR_CODE}[WARN]{RESET_COLOR_CODE} Request failed ({reason}): retry in {delay:.1f} sec')
+      time.sleep(delay)
+
+    if error is not None:
+      raise error
+    return resp
+
+  def _request (self, table: str, params: dict, stream: bool = False) -> Union[list, Iterator[dict]]:
+    '''
+    Send the GET query with the given parameters
 
     Parameters
     ----------
     table: str
-      Table name to use in the query
+      Name of the table on which extract the data
+
+    params: dict
+      Parameters of the request as built by _build_params
+
+    stream: bool (default := False)
+      Decode the records while the response is received
 
     Returns
     -------
-    builder: QueryBuilder
-      Builder of the query for the chaining interface
+    res: list or Iterator[dict]
+      Resulting records of the query.
+      If stream is True, a generator of the records is returned
     '''
-    return QueryBuilder(self, table)
+    start = time.perf_counter()
+    if self._cache is not None:
+      res = self._cache.get(table=table, params=params, scope=self._cache_scope)
+      if res is not None:
+        self._emit('select', start, table=table, status=200, rows=len(res), cached=True, stream=stream)
+        return iter(res) if stream else res
+
+    url = f'{self._host}/{table}/'
+    token = self._token
+    timing = {} if self._metrics is not None else None
+    try:
+      resp = self._get(url=url, params=params, token=token, stream=stream, timing=timing)
 
-class QueryBuilder:
-  '''
-  Build the query in chaining mode to facilitate
-  the readability of the code
+      # the session token was rejected: login again only once
+      if resp.status_code in (401, 403):
+        resp.close()
+        self._relogin(token)
+        resp = self._get(url=url, params=params, token=self._token, stream=stream, timing=timing)
+    except Exception as e:
+      self._emit('select', start, table=table, status=None, error=repr(e), stream=stream, **(timing or {}))
+      raise
 
-  Parameters
-  ----------
-  db: TriggerDB
-    Database instance to use for the request
+    if resp.status_code != 200:
+      self._emit('select', start, table=table, status=resp.status_code, stream=stream, **(timing or {}))
+      print(f'{RED_COLOR_CODE}[ERROR]{RESET_COLOR_CODE} Query error')
+      raise Exception(f'Query Error: {resp.status_code} {resp.text}')
 
-  table: str
-    Table name to use in the query
-  '''
+    if stream:
+      return self._iter_response(table=table, params=params, resp=resp, start=start, timing=timing)
+
+    tic = time.perf_counter()
+    res = resp.json()
+    if self._progress is not None:
+      self._progress.add(rows=len(res))
+    if timing is not None:
+      self._emit(
+        'select', start, table=table, status=200, rows=len(res), bytes=len(resp.content),
+        decode=time.perf_counter() - tic, cached=False, stream=False, **timing
+      )
+    if self._cache is not None:
+      self._cache.put(table=table, params=params, rows=res, scope=self._cache_scope)
+    return res
 
-  def __init__ (self, db: TriggerDB, table: str):
-    # check the table
-    db._check_table(table)
+  def _iter_response (
+    self,
+    table: str,
+    params: dict,
+    resp,
+    start: Optional[float] = None,
+    timing: Optional[dict] = None,
+  ) -> Iterator[dict]:
+    '''
+    Decode the records of the response while they are received
 
-    self.db = db
-    self.table = table
-    self._columns: List[str] = '*'
-    self._where: Dict[str, str] = {}
-    self._order_by: Optional[str] = None
-    self._order: str = 'ASC'
-    self._limit: int = 100
+    Parameters
+    ----------
+    table: str
+      Name of the table of the request
 
-  def select (self, *columns: str):
+    params: dict
+      Parameters of the request
+
+    resp: requests.Response
+      Streamed response of the request
+
+    start: float (default := None)
+      Beginning of the query as time.perf_counter() value
+
+    timing: dict (default := None)
+      Timings of the request as filled by _get.
+      If None, the decoding is not timed
+
+    Returns
+    -------
+    rows: Iterator[dict]
+      Generator of the records
     '''
-    Set the list of columns to use
+    # the query is displayed in the progress while its records are decoded
+    tracked = self._progress is not None and self._progress.begin()
+
+    chunks = resp.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    if timing is not None:
+      timing.update(read=0., bytes=0, rows=0, active=0.)
+      chunks = _timed_chunks(chunks, timing)
+    if tracked:
+      chunks = _progress_chunks(chunks, self._progress)
+    rows = iter_json_array(chunks, encoding=resp.encoding or 'utf-8')
+    if timing is not None:
+      rows = _timed_rows(rows, timing)
+    if tracked:
+      rows = _progress_rows(rows, self._progress)
+
+    # the cache needs the whole result
+    cached = [] if self._cache is not None else None
+    try:
+      for row in rows:
+        if cached is not None:
+          cached.append(row)
+        yield row
+    except Exception as e:
+      if timing is not None:
+        timing.update(status=None, error=repr(e))
+      raise
+    finally:
+      resp.close()
+      if tracked:
+        self._progress.end()
+      if timing is not None:
+        # the time of the generator is spent reading or decoding the chunks
+        read, active = timing.pop('read'), timing.pop('active')
+        timing['transfer'] = timing.get('transfer', 0.) + read
+        timing['decode'] = max(active - read, 0.)
+        timing.setdefault('status', 200)
+        self._emit('select', start, table=table, cached=False, stream=True, **timing)
+
+    if cached is not None:
+      self._cache.put(table=table, params=params, rows=cached, scope=self._cache_scope)
+
+  def _collect (self, table: str, params: dict) -> ResultSet:
+    '''
+    Send the GET query and store the records in columnar form
+    while they are decoded
 
     Parameters
     ----------
-    columns: str
-      List of columns as string names
+    table: str
+      Name of the table on which extract the data
+
+    params: dict
+      Parameters of the request as built by _build_params
+
+    Returns
+    -------
+    res: ResultSet
+      Resulting records of the query
     '''
-    if columns:
-      for col in columns:
-        self.db._check_column(table=self.table, column=col)
-      self._columns = list(columns)
-    return self
+    return ResultSet.from_rows(
+      self._request(table=table, params=params, stream=True),
+      columns=params['select'].split(','),
+    )
 
-  def where (self, **conditions: str):
+  def _fan_out (
+    self,
+    table: str,
+    columns: Union[List[str], str],
+    alternatives: List[List[Tuple[str, str]]],
+    run,
+    sort_by: List[str],
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    workers: Optional[int] = None,
+    lazy: bool = False,
+  ) -> Union[list, Iterator[dict]]:
     '''
-    Set the conditions to apply in the filtering
+    Run a sub-query for each alternative set of conditions
+    and merge their (sorted) results
 
     Parameters
     ----------
-    **conditions: str
-      Condition to apply as 'name=val' in the query
+    table: str
+      Name of the table on which extract the data
+
+    columns: str
+      Name of columns to select from the table
+
+    alternatives: list
+      List of (column, expression) lists, one for each sub-query
+
+    run: callable
+      Function which runs the sub-query, given the columns
+      and the conditions
+
+    sort_by: list
+      Columns of the ordering of the results of the sub-queries.
+      If empty, the results are concatenated
+
+    order: str (default := 'ASC')
+      Ascending or descending order
+
+    limit: int (default := None)
+      Maximum number of records of the merged results
+
+    workers: int (default := None)
+      Number of concurrent sub-queries.
+      If None, the size of the pool of connections is used
+
+    lazy: bool (default := False)
+      The sub-queries return generators which are merged
+      while they are consumed
+
+    Returns
+    -------
+    res: list or Iterator[dict]
+      Merged records
     '''
-    for col, expr in conditions.items():
-      self.db._check_column(table=self.table, column=col)
-      self._where[col] = expr
-    return self
+    self._check_table(table)
+    selected = list(self._available_tables[table]) if columns == '*' else list(columns)
+    hidden = [c for c in sort_by if c not in selected]
+    requested = selected + hidden
 
-  def order_by (self, column: str):
+    if lazy:
+      results = [run(requested, conds) for conds in alternatives]
+    else:
+      workers = workers or self._session_kwargs['pool_size']
+      with ThreadPoolExecutor(max_workers=max(1, min(workers, len(alternatives)))) as executor:
+        results = list(executor.map(lambda conds: run(requested, conds), alternatives))
+
+    if sort_by:
+      # the missing values are sorted first
+      merged = heapq.merge(
+        *results,
+        key=lambda row: tuple((row[c] is not None, row[c]) for c in sort_by),
+        reverse=order.upper() == 'DESC',
+      )
+    else:
+      merged = chain.from_iterable(results)
+    if limit is not None:
+      merged = islice(merged, limit)
+    if hidden:
+      merged = ({k: v for k, v in row.items() if k not in hidden} for row in merged)
+    return merged if lazy else list(merged)
+
+  def _as_result (self, rows: list, table: str, columns: Union[List[str], str], columnar: Optional[bool]) -> Union[list, ResultSet]:
     '''
-    Set the name of the column to use for the ordering of
-    the results
+    Convert the records to the required format
 
     Parameters
     ----------
-    column: str
-      Column name to use for the ordering of the results
-    '''
-    self.db._check_column(table=self.table, column=column)
-    self._order_by = column
-    return self
+    rows: list
+      Resulting records
 
-  def asc (self):
-    '''
-    Set the ascending ordering of the results
-    '''
-    self._order = 'ASC'
-    return self
+    table: str
+      Name of the table of the records
 
-  def desc (self):
-    '''
+    columns: str
+      Name of the selected columns
+
+    columnar: bool
+      Return the records as ResultSet.
+      If None, the setting of the object is used
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records
+    '''
+    if self._columnar if columnar is None else columnar:
+      return ResultSet.from_rows(rows, columns=self._available_tables[table] if columns == '*' else columns)
+    return rows
+
+  def select (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order_by: str = None,
+    order: str = 'ASC',
+    limit: int = DEFAULT_LIMIT,
+    stream: bool = False,
+    columnar: Optional[bool] = None,
+  ) -> Union[list, ResultSet]:
+    '''
+    Select interface for the GET query of the available tables
+
+    Parameters
+    ----------
+    table: str
+      Name of the table on which extract the data
+
+    columns: str
+      Name of columns to select from the table
+
+    where: dict or Predicate
+      Condition to apply on the columns.
+      A predicate with IN conditions which can not be sent
+      as a single query is split into parallel sub-queries,
+      whose results are merged
+
+    order_by: str
+      Ordering column name
+
+    order: str
+      Ascending or descending order
+
+    limit: int
+      Maximum number of records to retrieve
+
+    stream: bool (default := False)
+      Decode the records while the response is received,
+      keeping in memory only the current one
+
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the object is used.
+      It is ignored when the records are streamed
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting filtered dataset.
+      If stream is True, a generator of the records is returned
+    '''
+    alternatives = where_alternatives(where)
+    if len(alternatives) != 1:
+      self._check_table(table)
+      if columns != '*' and any(c not in self._available_tables[table] for c in columns):
+        raise ValueError('Aggregated functions cannot be merged across the sub-queries')
+      res = self._fan_out(
+        table=table,
+        columns=columns,
+        alternatives=alternatives,
+        run=lambda cols, conds: self.select(
+          table=table,
+          columns=cols,
+          where=conds,
+          order_by=order_by,
+          order=order,
+          limit=limit,
+          stream=stream,
+          columnar=False,
+        ),
+        sort_by=order_by.split(',') if order_by else [],
+        order=order,
+        limit=min(limit, MAXIMUM_LIMIT),
+        lazy=stream,
+      )
+      return res if stream else self._as_result(res, table, columns, columnar)
+
+    params = self._build_params(
+      table=table,
+      columns=columns,
+      where=alternatives[0],
+      order_by=order_by,
+      order=order,
+      limit=limit,
+    )
+    if not stream and (self._columnar if columnar is None else columnar):
+      return self._collect(table=table, params=params)
+    return self._request(table=table, params=params, stream=stream)
+
+  def _keyset_columns (self, table: str) -> List[str]:
+    '''
+    Get the ordered list of timestamp columns of the table
+    used as cursor for the keyset pagination
+
+    Parameters
+    ----------
+    table: str
+      Name of the table to use
+
+    Returns
+    -------
+    keys: list
+      Timestamp columns from the coarsest to the finest one
+    '''
+    self._check_table(table)
+    keys = [col for col in TIME_COLUMNS if col in self._available_tables[table]]
+    if not keys:
+      raise ValueError(f"Table '{table}' has no timestamp columns to use for the pagination")
+    return keys
+
+  def _iter_pages (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], List[Tuple[str, str]]] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    page_size: int = MAXIMUM_LIMIT,
+    prefetch: bool = True,
+    after: Optional[tuple] = None,
+  ) -> Iterator[List[dict]]:
+    '''
+    Page through the whole result set of a query using the
+    timestamp columns as keyset cursor.
+
+    The server only accepts conjunctions of conditions, thus
+    the records following the cursor are walked level by level:
+    each page restricts the columns coarser than the current level
+    to the cursor values and moves the current one forward.
+    The records of the cursor already retrieved at the current level
+    are skipped, so ties on the timestamp are handled safely.
+
+    Parameters
+    ----------
+    table: str
+      Name of the table on which extract the data
+
+    columns: str
+      Name of columns to select from the table
+
+    where: dict or list
+      Condition to apply on the columns
+
+    order: str
+      Ascending or descending order of the timestamps
+
+    limit: int (default := None)
+      Maximum number of records to retrieve.
+      If None, the whole result set is retrieved
+
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    prefetch: bool (default := True)
+      Request the next page in background while the
+      current one is consumed
+
+    after: tuple (default := None)
+      Values of the timestamp columns from which start the
+      iteration (excluded)
+
+    Returns
+    -------
+    pages: Iterator[list]
+      Generator of the pages of records
+    '''
+    keys = self._keyset_columns(table)
+    order = order.upper()
+    if order not in ('ASC', 'DESC'):
+      raise ValueError('Invalid ordering')
+    if not 0 < page_size <= MAXIMUM_LIMIT:
+      raise ValueError(f'Page size must be in the range (0, {MAXIMUM_LIMIT}]')
+
+    # the cursor columns must be part of the results
+    selected = list(self._available_tables[table]) if columns == '*' else list(columns)
+    for col in selected:
+      if not self._is_valid_column_or_agg(table=table, column=col):
+        raise ValueError(f"Invalid column or aggregated function: '{col}' in table '{table}'")
+      if col not in self._available_tables[table]:
+        raise ValueError('Aggregated functions cannot be paginated')
+    hidden = [col for col in keys if col not in selected]
+    requested = selected + hidden
+
+    base = list(where.items()) if isinstance(where, dict) else list(where or [])
+    # email as last ordering key makes the ties order reproducible
+    tiebreak = ['email'] if 'email' in self._available_tables[table] else []
+    order_by = ','.join(keys + tiebreak)
+    forward, strict = ('>=', '>') if order == 'ASC' else ('<=', '<')
+
+    def _page (conds: list, skip: int) -> Tuple[list, int]:
+      num = min(page_size + skip, MAXIMUM_LIMIT)
+      params = self._build_params(
+        table=table,
+        columns=requested,
+        where=base + conds,
+        order_by=order_by,
+        order=order,
+        limit=num,
+      )
+      rows = list(self._request(table=table, params=params, stream=True))
+      return rows, num
+
+    def _next_query (cursor: tuple, counts: list, level: Optional[int], exhausted: bool):
+      # the current level is done: move strictly forward on the coarser one
+      if exhausted:
+        if level is None or level == 0:
+          return None
+        level -= 1
+        conds = [(k, f'={v}') for k, v in zip(keys[:level], cursor)]
+        conds.append((keys[level], f'{strict}{cursor[level]}'))
+        return conds, 0, level
+      # coarsest level which does not require to skip too many records
+      level = next(
+        (i for i, cnt in enumerate(counts) if cnt <= page_size // 2),
+        len(keys) - 1
+      )
+      skip = counts[level]
+      if skip >= MAXIMUM_LIMIT:
+        raise ValueError(f'Too many records sharing the same timestamp {cursor} for the pagination')
+      conds = [(k, f'={v}') for k, v in zip(keys[:level], cursor)]
+      conds.append((keys[level], f'{forward}{cursor[level]}'))
+      return conds, skip, level
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    submit = (
+      (lambda conds, skip: executor.submit(_page, conds, skip))
+      if prefetch else
+      (lambda conds, skip: _Done(_page(conds, skip)))
+    )
+
+    try:
+      cursor = None
+      counts = [0] * len(keys)
+      level = None
+      skip = 0
+      retrieved = 0
+
+      if after is None:
+        future = submit([], 0)
+      else:
+        if len(after) != len(keys):
+          raise ValueError(f'The starting timestamp must include the values of {keys}')
+        # the records before the cursor are unknown, so they
+        # can not be skipped: the shared prefixes are never re-used
+        cursor = tuple(after)
+        counts = [float('inf')] * len(keys)
+        conds, skip, level = _next_query(cursor, counts, len(keys), True)
+        future = submit(conds, skip)
+
+      while future is not None:
+        rows, num = future.result()
+        exhausted = len(rows) < num
+        page = rows[skip:]
+
+        if limit is not None:
+          page = page[:limit - retrieved]
+          retrieved += len(page)
+
+        # update the cursor and the number of records sharing its prefixes
+        for row in page:
+          key = tuple(row[k] for k in keys)
+          if cursor is None:
+            counts = [1] * len(keys)
+          else:
+            diff = next((i for i, (a, b) in enumerate(zip(key, cursor)) if a != b), len(keys))
+            counts = [cnt + 1 for cnt in counts[:diff]] + [1] * (len(keys) - diff)
+          cursor = key
+
+        # request the next page before yielding the current one
+        future = None
+        if (limit is None or retrieved < limit) and cursor is not None:
+          query = _next_query(cursor, counts, level, exhausted)
+          if query is not None:
+            conds, skip, level = query
+            future = submit(conds, skip)
+
+        if hidden:
+          page = [{k: v for k, v in row.items() if k not in hidden} for row in page]
+        if page:
+          yield page
+    finally:
+      if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+  def iter_select (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    page_size: int = MAXIMUM_LIMIT,
+    prefetch: bool = True,
+    after: Optional[tuple] = None,
+  ) -> Iterator[dict]:
+    '''
+    Iterate over the whole result set of a query, beyond the
+    maximum limit of records of a single request.
+
+    The records are sorted by timestamp and retrieved in pages,
+    using the timestamp columns as keyset cursor.
+    The next page is requested in background while the current
+    one is consumed.
+
+    Parameters
+    ----------
+    table: str
+      Name of the table on which extract the data
+
+    columns: str
+      Name of columns to select from the table
+
+    where: dict or Predicate
+      Condition to apply on the columns
+
+    order: str
+      Ascending or descending order of the timestamps
+
+    limit: int (default := None)
+      Maximum number of records to retrieve.
+      If None, the whole result set is retrieved
+
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    prefetch: bool (default := True)
+      Request the next page in background while the
+      current one is consumed
+
+    after: tuple (default := None)
+      Values of the timestamp columns from which start the
+      iteration (excluded), e.g. (2025, 9, 10, 0, 0, 0)
+
+    Returns
+    -------
+    rows: Iterator[dict]
+      Generator of the resulting records
+
+    Examples
+    --------
+    Example of a full-table iteration::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        for row in db.iter_select('myair', where={'email': '=DE000086'}):
+          print(row['pm25'])
+    '''
+    alternatives = where_alternatives(where)
+    if len(alternatives) != 1:
+      # the sub-iterations are merged by timestamp
+      yield from self._fan_out(
+        table=table,
+        columns=columns,
+        alternatives=alternatives,
+        run=lambda cols, conds: self.iter_select(
+          table=table,
+          columns=cols,
+          where=conds,
+          order=order,
+          limit=limit,
+          page_size=page_size,
+          prefetch=prefetch,
+          after=after,
+        ),
+        sort_by=self._keyset_columns(table),
+        order=order,
+        limit=limit,
+        lazy=True,
+      )
+      return
+
+    for page in self._iter_pages(
+      table=table,
+      columns=columns,
+      where=alternatives[0],
+      order=order,
+      limit=limit,
+      page_size=page_size,
+      prefetch=prefetch,
+      after=after,
+    ):
+      yield from page
+
+  def parallel_select (
+    self,
+    table: str,
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], List[Tuple[str, str]], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    workers: int = 8,
+    shard: str = 'day',
+    page_size: int = MAXIMUM_LIMIT,
+    columnar: Optional[bool] = None,
+  ) -> Union[list, ResultSet]:
+    '''
+    Split the time range of the query into disjoint calendar
+    units and retrieve them concurrently.
+
+    The range of each calendar column is given by the
+    conditions of the query and by the first and the last
+    stored records, so only the units of the stored window are
+    requested, and each unit is paged through independently.
+    The results are merged in chronological order.
+
+    Parameters
+    ----------
+    table: str
+      Name of the table on which extract the data
+
+    columns: str
+      Name of columns to select from the table
+
+    where: dict or list or Predicate
+      Condition to apply on the columns
+
+    order: str
+      Ascending or descending order of the timestamps
+
+    limit: int (default := None)
+      Maximum number of records to retrieve.
+      If None, the whole result set is retrieved
+
+    workers: int (default := 8)
+      Number of concurrent requests.
+      The pool_size of the object should be at least equal
+      to this value to re-use all the connections
+
+    shard: str (default := 'day')
+      Calendar unit of the splitting, one of 'year', 'month', 'day', 'hour'
+
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the object is used
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records sorted by timestamp
+
+    Examples
+    --------
+    Example of a one-month query split by day::
+
+      from trigger import TriggerDB
+
+      with TriggerDB(pool_size=8) as db:
+        res = db.parallel_select(
+          table='ecg',
+          where={'year': '=2025', 'month': '=9', 'email': '=DE000086'},
+          workers=8,
+          shard='day',
+        )
+    '''
+    keys = self._keyset_columns(table)
+    order = order.upper()
+    if order not in ('ASC', 'DESC'):
+      raise ValueError('Invalid ordering')
+    alternatives = where_alternatives(where)
+    if len(alternatives) != 1:
+      # each sub-query is already split in concurrent requests
+      res = self._fan_out(
+        table=table,
+        columns=columns,
+        alternatives=alternatives,
+        run=lambda cols, conds: self.parallel_select(
+          table=table,
+          columns=cols,
+          where=conds,
+          order=order,
+          limit=limit,
+          workers=workers,
+          shard=shard,
+          page_size=page_size,
+          columnar=False,
+        ),
+        sort_by=keys,
+        order=order,
+        limit=limit,
+        workers=1,
+      )
+      return self._as_result(res, table, columns, columnar)
+
+    base = alternatives[0]
+    columnar = self._columnar if columnar is None else columnar
+    if columnar:
+      res = ResultSet(self._available_tables[table] if columns == '*' else columns)
+    else:
+      res = []
+
+    # time window actually stored for the query
+    window = self._time_window(table, base, SHARD_LEVELS[:SHARD_LEVELS.index(shard) + 1])
+    if window is None:
+      return res
+    years = (window[0][0], window[1][0])
+
+    shards = time_shards(conditions=base, shard=shard, years=years, window=window)
+    if order == 'DESC':
+      shards = shards[::-1]
+
+    def _fetch (units: dict) -> list:
+      res = []
+      for page in self._iter_pages(
+        table=table,
+        columns=columns,
+        where=base + [(col, f'={val}') for col, val in units.items()],
+        order=order,
+        limit=limit,
+        page_size=page_size,
+        prefetch=False,
+      ):
+        res.extend(page)
+      return res
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+      # the map preserves the chronological order of the shards
+      for rows in executor.map(_fetch, shards):
+        if limit is not None:
+          rows = rows[:limit - len(res)]
+        res.extend(rows)
+        if limit is not None and len(res) >= limit:
+          executor.shutdown(wait=False, cancel_futures=True)
+          break
+
+    return res
+
+  def _time_window (self, table: str, where: List[Tuple[str, str]], levels: Sequence[str]) -> Optional[Tuple[tuple, tuple]]:
+    '''
+    Get the values of the calendar columns of the first and of
+    the last record of the query, with a MIN/MAX request for
+    each column (a single one while they share the prefix)
+
+    Parameters
+    ----------
+    table: str
+      Name of the table to use
+
+    where: list
+      List of (column, expression) pairs of the query
+
+    levels: list
+      Calendar columns from the year
+
+    Returns
+    -------
+    window: tuple
+      Values of the calendar columns of the first and of the
+      last record, or None if the query has no records
+    '''
+    def _bound (func: str, col: str, prefix: tuple, other: Optional[str] = None) -> Optional[dict]:
+      columns = [f'{func}({col})'] + ([f'{other}({col})'] if other is not None else [])
+      rows = self._request(
+        table=table,
+        params=self._build_params(
+          table=table,
+          columns=columns,
+          where=where + [(key, f'={val}') for key, val in zip(levels, prefix)],
+        ),
+      )
+      return rows[0] if rows and rows[0].get(columns[0]) is not None else None
+
+    first, last = (), ()
+    for col in levels:
+      if first == last:
+        row = _bound('MIN', col, first, other='MAX')
+        if row is None:
+          return None
+        lo, hi = row[f'MIN({col})'], row[f'MAX({col})']
+      else:
+        lo, hi = _bound('MIN', col, first), _bound('MAX', col, last)
+        if lo is None or hi is None:
+          return None
+        lo, hi = lo[f'MIN({col})'], hi[f'MAX({col})']
+      first, last = first + (int(lo), ), last + (int(hi), )
+    return first, last
+
+  def _iter_range_pages (
+    self,
+    table: str,
+    start: Union[str, datetime],
+    end: Union[str, datetime],
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], List[Tuple[str, str]]] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    resolution: str = 'minute',
+    workers: int = 1,
+    page_size: int = MAXIMUM_LIMIT,
+    prefetch: bool = True,
+  ) -> Iterator[List[dict]]:
+    '''
+    Page through the records of the time range [start, end).
+
+    The range is compiled into the smallest set of queries on
+    the calendar columns down to the given resolution, and the
+    records of the edge units are trimmed locally.
+
+    Parameters
+    ----------
+    See TriggerDB.range_select. The conditions must be a
+    single conjunction
+
+    Returns
+    -------
+    pages: Iterator[list]
+      Generator of the pages of records in chronological order
+    '''
+    keys = self._keyset_columns(table)
+    if resolution not in keys:
+      raise ValueError(f"Invalid resolution '{resolution}'. Available values are: {keys}")
+    order = order.upper()
+    if order not in ('ASC', 'DESC'):
+      raise ValueError('Invalid ordering')
+    if workers < 1:
+      raise ValueError('The number of workers must be positive')
+
+    start, end = to_datetime(start), to_datetime(end)
+    boxes = range_conditions(start, end, keys[:keys.index(resolution) + 1])
+    if not boxes:
+      return
+    if order == 'DESC':
+      boxes = boxes[::-1]
+
+    # the timestamp columns are needed to trim the edges
+    selected = list(self._available_tables[table]) if columns == '*' else list(columns)
+    hidden = [col for col in keys if col not in selected]
+    start_key = tuple(getattr(start, col) for col in keys)
+    end_key = tuple(getattr(end, col) for col in keys)
+    base = list(where.items()) if isinstance(where, dict) else list(where or [])
+    # only the first and last units can be partially out of the range
+    edges = {0, len(boxes) - 1}
+
+    def _pages (idx: int, fetch_ahead: bool) -> Iterator[List[dict]]:
+      for page in self._iter_pages(
+        table=table,
+        columns=selected + hidden,
+        where=base + boxes[idx],
+        order=order,
+        # the trimmed records must not count in the limit
+        limit=None if idx in edges else limit,
+        page_size=page_size,
+        prefetch=fetch_ahead,
+      ):
+        if idx in edges:
+          page = [
+            row for row in page
+            if start_key <= tuple(row[k] for k in keys) < end_key
+          ]
+        if hidden:
+          page = [{k: v for k, v in row.items() if k not in hidden} for row in page]
+        if page:
+          yield page
+
+    if workers == 1 or len(boxes) == 1:
+      results = (_pages(idx, prefetch) for idx in range(len(boxes)))
+      executor = None
+    else:
+      executor = ThreadPoolExecutor(max_workers=workers)
+      # the map preserves the chronological order of the queries
+      results = executor.map(lambda idx: list(_pages(idx, False)), range(len(boxes)))
+
+    try:
+      retrieved = 0
+      for pages in results:
+        for page in pages:
+          if limit is not None:
+            page = page[:limit - retrieved]
+            retrieved += len(page)
+          if page:
+            yield page
+          if limit is not None and retrieved >= limit:
+            return
+    finally:
+      if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+  def range_select (
+    self,
+    table: str,
+    start: Union[str, datetime],
+    end: Union[str, datetime],
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], List[Tuple[str, str]], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    resolution: str = 'minute',
+    workers: int = 1,
+    page_size: int = MAXIMUM_LIMIT,
+    columnar: Optional[bool] = None,
+  ) -> Union[list, ResultSet]:
+    '''
+    Retrieve the records of the time range [start, end).
+
+    The range is compiled into the smallest set of conditions
+    on the calendar columns (down to the given resolution),
+    thus only the units overlapping the range are transferred.
+    The records of the edge units are trimmed locally.
+
+    Parameters
+    ----------
+    table: str
+      Name of the table on which extract the data
+
+    start: str or datetime
+      Beginning of the range (included), as datetime or
+      ISO-8601 string
+
+    end: str or datetime
+      End of the range (excluded), as datetime or
+      ISO-8601 string
+
+    columns: str
+      Name of columns to select from the table
+
+    where: dict or list or Predicate
+      Additional conditions to apply on the columns
+
+    order: str
+      Ascending or descending order of the timestamps
+
+    limit: int (default := None)
+      Maximum number of records to retrieve.
+      If None, the whole range is retrieved
+
+    resolution: str (default := 'minute')
+      Finest calendar column used in the conditions
+
+    workers: int (default := 1)
+      Number of queries of the range run concurrently
+
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the object is used
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records sorted by timestamp
+
+    Examples
+    --------
+    Example of a time-window query::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        res = db.range_select(
+          table='myair',
+          start='2025-09-10T08:30',
+          end='2025-09-10T18:00',
+          where={'email': '=DE000086'},
+        )
+    '''
+    alternatives = where_alternatives(where)
+    if len(alternatives) != 1:
+      res = self._fan_out(
+        table=table,
+        columns=columns,
+        alternatives=alternatives,
+        run=lambda cols, conds: self.range_select(
+          table=table,
+          start=start,
+          end=end,
+          columns=cols,
+          where=conds,
+          order=order,
+          limit=limit,
+          resolution=resolution,
+          workers=workers,
+          page_size=page_size,
+          columnar=False,
+        ),
+        sort_by=self._keyset_columns(table),
+        order=order,
+        limit=limit,
+      )
+      return self._as_result(res, table, columns, columnar)
+
+    if self._columnar if columnar is None else columnar:
+      self._check_table(table)
+      res = ResultSet(self._available_tables[table] if columns == '*' else columns)
+    else:
+      res = []
+    for page in self._iter_range_pages(
+      table=table,
+      start=start,
+      end=end,
+      columns=columns,
+      where=alternatives[0],
+      order=order,
+      limit=limit,
+      resolution=resolution,
+      workers=workers,
+      page_size=page_size,
+    ):
+      res.extend(page)
+    return res
+
+  def iter_range (
+    self,
+    table: str,
+    start: Union[str, datetime],
+    end: Union[str, datetime],
+    columns: Union[List[str], str] = '*',
+    where: Union[Dict[str, str], List[Tuple[str, str]], Predicate] = None,
+    order: str = 'ASC',
+    limit: Optional[int] = None,
+    resolution: str = 'minute',
+    page_size: int = MAXIMUM_LIMIT,
+    prefetch: bool = True,
+  ) -> Iterator[dict]:
+    '''
+    Iterate over the records of the time range [start, end).
+    See TriggerDB.range_select for the description of the parameters.
+
+    Returns
+    -------
+    rows: Iterator[dict]
+      Generator of the resulting records sorted by timestamp
+    '''
+    alternatives = where_alternatives(where)
+    if len(alternatives) != 1:
+      yield from self._fan_out(
+        table=table,
+        columns=columns,
+        alternatives=alternatives,
+        run=lambda cols, conds: self.iter_range(
+          table=table,
+          start=start,
+          end=end,
+          columns=cols,
+          where=conds,
+          order=order,
+          limit=limit,
+          resolution=resolution,
+          page_size=page_size,
+          prefetch=prefetch,
+        ),
+        sort_by=self._keyset_columns(table),
+        order=order,
+        limit=limit,
+        lazy=True,
+      )
+      return
+
+    for page in self._iter_range_pages(
+      table=table,
+      start=start,
+      end=end,
+      columns=columns,
+      where=alternatives[0],
+      order=order,
+      limit=limit,
+      resolution=resolution,
+      page_size=page_size,
+      prefetch=prefetch,
+    ):
+      yield from page
+
+  def fetch_for_accounts (
+    self,
+    query: Union['QueryBuilder', 'PreparedQuery'],
+    emails: Optional[List[str]] = None,
+    workers: int = 8,
+    merge: bool = False,
+  ) -> Union[Iterator[AccountResult], Tuple[ResultSet, Dict[str, Exception]]]:
+    '''
+    Run the same query for each account concurrently.
+
+    The query is compiled once and executed with the email
+    condition of each account over the shared pool of connections.
+    The failure of an account does not abort the others.
+
+    Parameters
+    ----------
+    query: QueryBuilder or PreparedQuery
+      Query to run, without the email condition
+
+    emails: list (default := None)
+      Accounts to query.
+      If None, all the registered accounts are used
+
+    workers: int (default := 8)
+      Number of concurrent queries.
+      The pool_size of the object should be at least equal
+      to this value to re-use all the connections
+
+    merge: bool (default := False)
+      Merge the results into a single ResultSet (with the
+      email column) instead of streaming them
+
+    Returns
+    -------
+    res: Iterator[AccountResult] or tuple
+      Generator of the (email, rows, error) results in order of
+      completion or, if merge is True, the merged ResultSet in
+      order of accounts and the dictionary of the failures
+
+    Examples
+    --------
+    Example of a cohort-wide query::
+
+      from trigger import TriggerDB
+
+      with TriggerDB(pool_size=16) as db:
+        query = db.from_('myair').where(year='=2025', month='=9').limit(10_000)
+        for email, rows, error in db.fetch_for_accounts(query, workers=16):
+          if error is None:
+            print(email, len(rows))
+    '''
+    if workers < 1:
+      raise ValueError('The number of workers must be positive')
+    if not isinstance(query, PreparedQuery):
+      query = query.compile()
+    if emails is None:
+      emails = [acc['email'] for acc in self.accounts()]
+    elif isinstance(emails, str):
+      emails = [emails]
+
+    results = self._iter_accounts(query, list(emails), workers)
+    if not merge:
+      return results
+
+    columns = list(self._available_tables[query.table]) if query.columns == '*' else list(query.columns)
+    if 'email' not in columns:
+      columns.insert(0, 'email')
+    rows, failures = {}, {}
+    for email, res, error in results:
+      if error is not None:
+        failures[email] = error
+      else:
+        rows[email] = res
+    merged = ResultSet(columns)
+    for email in emails:
+      if email in rows:
+        merged.extend(rows.pop(email), constants={'email': email})
+    return merged, failures
+
+  def _iter_accounts (self, query: 'PreparedQuery', emails: List[str], workers: int) -> Iterator[AccountResult]:
+    '''
+    Run the query for each account, keeping a bounded
+    number of queries in flight
+
+    Parameters
+    ----------
+    query: PreparedQuery
+      Query to run
+
+    emails: list
+      Accounts to query
+
+    workers: int
+      Number of concurrent queries
+
+    Returns
+    -------
+    results: Iterator[AccountResult]
+      Generator of the results in order of completion
+    '''
+    def _run (email: str) -> AccountResult:
+      try:
+        return AccountResult(email, query.execute(columnar=False, email=f'={email}'), None)
+      except Exception as e:
+        print(f'{ORANGE_COLOR_CODE}[WARN]{RESET_COLOR_CODE} Query failed for {email}: {e}')
+        return AccountResult(email, None, e)
+
+    pending = iter(emails)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+      # the results are not accumulated if the consumer is slow
+      running = {executor.submit(_run, email) for email in islice(pending, 2 * workers)}
+      while running:
+        done, running = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+          yield future.result()
+          email = next(pending, None)
+          if email is not None:
+            running.add(executor.submit(_run, email))
+    finally:
+      executor.shutdown(wait=True, cancel_futures=True)
+
+  def sync (
+    self,
+    table: str,
+    emails: Union[List[str], str] = None,
+    store: str = 'trigger.sqlite',
+    where: Dict[str, str] = None,
+    page_size: int = MAXIMUM_LIMIT,
+  ) -> Dict[str, int]:
+    '''
+    Keep an incremental local copy of the table in a SQLite file.
+    For each account only the records more recent than the
+    latest timestamp already stored are retrieved.
+
+    Parameters
+    ----------
+    table: str
+      Name of the table to synchronize
+
+    emails: list (default := None)
+      Accounts to synchronize.
+      If None, all the registered accounts are used
+
+    store: str (default := 'trigger.sqlite')
+      Path of the SQLite file of the local copy
+
+    where: dict (default := None)
+      Additional conditions to apply on the records
+
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    Returns
+    -------
+    synced: dict
+      Number of new records stored for each account
+
+    Examples
+    --------
+    Example of a nightly synchronization::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        db.sync('myair', emails=['DE000086'], store='trigger.sqlite')
+    '''
+    # sqlite3 is loaded only by the mirror
+    from .mirror import sync_table
+
+    return sync_table(
+      db=self,
+      table=table,
+      emails=emails,
+      store=store,
+      where=where,
+      page_size=page_size,
+    )
+
+  def export_signal (
+    self,
+    table: str,
+    email: str,
+    start: Optional[Union[str, datetime]] = None,
+    end: Optional[Union[str, datetime]] = None,
+    path: str = None,
+    column: Optional[str] = None,
+    page_size: int = MAXIMUM_LIMIT,
+  ):
+    '''
+    Export the samples of a signal (e.g. ECG or PPG) of an account
+    into a .npy file, written page by page while the records are
+    retrieved, and map it in memory for out-of-core analyses.
+    NumPy is required.
+
+    Parameters
+    ----------
+    table: str
+      Name of the table of the signal (e.g. 'ecg' or 'ppg')
+
+    email: str
+      Account of the signal
+
+    start: str or datetime (default := None)
+      Beginning of the range (included).
+      If None, the whole recording is exported
+
+    end: str or datetime (default := None)
+      End of the range (excluded)
+
+    path: str (default := None)
+      Path of the .npy file.
+      If None, the file '<table>_<email>.npy' is used
+
+    column: str (default := None)
+      Column of the signal values.
+      If None, the column with the name of the table is used
+
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    Returns
+    -------
+    signal: numpy.memmap
+      Read-only structured array with fields 'timestamp'
+      (int64 microseconds since the epoch) and the name of
+      the signal column
+
+    Examples
+    --------
+    Example of a multi-day ECG export::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        ecg = db.export_signal('ecg', 'DE000086', '2025-09-01', '2025-09-08', path='ecg.npy')
+
+      timestamps = ecg['timestamp'].view('datetime64[us]')
+    '''
+    return export_signal(
+      db=self,
+      table=table,
+      email=email,
+      path=path if path is not None else f'{table}_{email}.npy',
+      start=start,
+      end=end,
+      column=column,
+      page_size=page_size,
+    )
+
+  def from_(self, table: str):
+    '''
+    Chaining interface for the query management
+
+    Parameters
+    ----------
+    table: str
+      Table name to use in the query
+
+    Returns
+    -------
+    builder: QueryBuilder
+      Builder of the query for the chaining interface
+    '''
+    return QueryBuilder(self, table)
+
+  def lazy (self, table: str) -> LazyFrame:
+    '''
+    Lazy interface for the query management, which sends to
+    the server only the columns, the conditions and the
+    aggregated functions that it can evaluate and applies the
+    remaining operations locally (NumPy is required)
+
+    Parameters
+    ----------
+    table: str
+      Table name to use in the query
+
+    Returns
+    -------
+    frame: LazyFrame
+      Lazy query on the table
+
+    Examples
+    --------
+    Example of an aggregated query::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        rs = db.lazy('myair').filter(email='=DE000086', day='=10').groupby('hour').agg(pm25='AVG').collect()
+    '''
+    return LazyFrame(self, table)
+
+class QueryBuilder:
+  '''
+  Build the query in chaining mode to facilitate
+  the readability of the code
+
+  Parameters
+  ----------
+  db: TriggerDB
+    Database instance to use for the request
+
+  table: str
+    Table name to use in the query
+  '''
+
+  def __init__ (self, db: TriggerDB, table: str):
+    # check the table
+    db._check_table(table)
+
+    self.db = db
+    self.table = table
+    self._columns: List[str] = '*'
+    self._where: Optional[Predicate] = None
+    self._order_by: Optional[str] = None
+    self._order: str = 'ASC'
+    self._limit: Optional[int] = None
+    self._workers: Optional[int] = None
+    self._shard: str = 'day'
+    self._range: Optional[tuple] = None
+
+  def select (self, *columns: str):
+    '''
+    Set the list of columns to use
+
+    Parameters
+    ----------
+    columns: str
+      List of columns as string names
+    '''
+    if columns:
+      for col in columns:
+        self.db._check_column(table=self.table, column=col)
+      self._columns = list(columns)
+    return self
+
+  def where (self, *predicates: Predicate, **conditions: str):
+    '''
+    Add the conditions to apply in the filtering.
+    All the conditions are combined in conjunction, also when
+    they refer to the same column
+
+    Parameters
+    ----------
+    *predicates: Predicate
+      Conditions as predicates, e.g. col('hour') >= 8
+
+    **conditions: str
+      Condition to apply as 'name=val' in the query
+    '''
+    predicates = list(predicates) + [Condition(col, expr) for col, expr in conditions.items()]
+    for predicate in predicates:
+      if not isinstance(predicate, Predicate):
+        raise ValueError(f'Invalid condition: {predicate!r}')
+      for col in predicate.columns():
+        self.db._check_column(table=self.table, column=col)
+      self._where = predicate if self._where is None else self._where & predicate
+    return self
+
+  def order_by (self, column: str):
+    '''
+    Set the name of the column to use for the ordering of
+    the results
+
+    Parameters
+    ----------
+    column: str
+      Column name to use for the ordering of the results.
+      If None, the ordering is removed
+    '''
+    if column is not None:
+      self.db._check_column(table=self.table, column=column)
+    self._order_by = column
+    return self
+
+  def asc (self):
+    '''
+    Set the ascending ordering of the results
+    '''
+    self._order = 'ASC'
+    return self
+
+  def desc (self):
+    '''
     Set the descending ordering of the results
     '''
     self._order = 'DESC'
@@ -513,25 +2573,452 @@ class QueryBuilder:
   
   def limit (self, val: int):
     '''
-    Set the maximum number of records to retrieve
+    Set the maximum number of records to retrieve.
+    If None, the default limit is used by fetch and the
+    whole result set is retrieved by iter
     '''
     self._limit = val
     return self
 
-  def fetch (self) -> dict:
+  def parallel (self, workers: int = 8, shard: str = 'day'):
+    '''
+    Split the time range of the query into disjoint calendar
+    units retrieved concurrently by fetch.
+    In this mode the limit is applied to the merged results and
+    the whole result set is retrieved if no limit is set.
+
+    Parameters
+    ----------
+    workers: int (default := 8)
+      Number of concurrent requests
+
+    shard: str (default := 'day')
+      Calendar unit of the splitting, one of 'year', 'month', 'day', 'hour'
+    '''
+    if shard not in SHARD_LEVELS:
+      raise ValueError(f"Invalid shard '{shard}'. Available values are: {list(SHARD_LEVELS)}")
+    if workers < 1:
+      raise ValueError('The number of workers must be positive')
+    self._workers = workers
+    self._shard = shard
+    return self
+
+  def between (self, start: Union[str, datetime], end: Union[str, datetime], resolution: str = 'minute'):
+    '''
+    Restrict the query to the time range [start, end).
+    The range is compiled into the smallest set of conditions
+    on the calendar columns and the edges are trimmed locally.
+    In this mode the whole range is retrieved if no limit is set,
+    and the workers set by parallel run the queries of the range
+    concurrently.
+
+    Parameters
+    ----------
+    start: str or datetime
+      Beginning of the range (included), as datetime or
+      ISO-8601 string
+
+    end: str or datetime
+      End of the range (excluded), as datetime or
+      ISO-8601 string
+
+    resolution: str (default := 'minute')
+      Finest calendar column used in the conditions
+    '''
+    keys = self.db._keyset_columns(self.table)
+    if resolution not in keys:
+      raise ValueError(f"Invalid resolution '{resolution}'. Available values are: {keys}")
+    self._range = (to_datetime(start), to_datetime(end), resolution)
+    return self
+
+  def resample (self, rule: str, by: Optional[str] = None) -> Resampler:
+    '''
+    Split the time range of the query into buckets of the
+    given width, to compute the aggregated functions of each
+    bucket with agg.
+    The time range must be set by between
+
+    Parameters
+    ----------
+    rule: str
+      Width of the buckets as number and unit ('s', 'min', 'h'
+      or 'd'), e.g. '15min' or '1h'
+
+    by: str (default := None)
+      Column of the grouping of the buckets, e.g. 'email'
+
+    Returns
+    -------
+    resampler: Resampler
+      Time buckets of the query
+
+    Examples
+    --------
+    Example of the hourly means of an account::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        rs = (
+          db.from_('myair')
+            .where(email='=DE000086')
+            .between('2025-09-01', '2025-09-08')
+            .resample('1h')
+            .agg(pm25='AVG', pm10='MAX')
+        )
+    '''
+    return Resampler(self, rule=rule, by=by)
+
+  def fetch (self, stream: bool = False, columnar: Optional[bool] = None) -> Union[list, ResultSet]:
     '''
     Extract the results calling the request
 
+    Parameters
+    ----------
+    stream: bool (default := False)
+      Decode the records while the response is received.
+      It is not available in parallel mode
+
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the database object is used
+
     Returns
     -------
-    res: dict
-      Resulting response of the given request
+    res: list or ResultSet
+      Resulting response of the given request.
+      If stream is True, a generator of the records is returned
     '''
+    if self._range is not None:
+      if stream:
+        return self.iter()
+      start, end, resolution = self._range
+      return self.db.range_select(
+        table=self.table,
+        start=start,
+        end=end,
+        columns=self._columns,
+        where=self._where,
+        order=self._order,
+        limit=self._limit,
+        resolution=resolution,
+        workers=self._workers or 1,
+        columnar=columnar,
+      )
+
+    if self._workers is not None:
+      if stream:
+        raise ValueError('Streaming is not available in parallel mode')
+      return self.db.parallel_select(
+        table=self.table,
+        columns=self._columns,
+        where=self._where,
+        order=self._order,
+        limit=self._limit,
+        workers=self._workers,
+        shard=self._shard,
+        columnar=columnar,
+      )
+
     return self.db.select(
       table=self.table,
       columns=self._columns,
-      where=self._where if self._where else None,
+      where=self._where,
       order_by=self._order_by,
       order=self._order,
+      limit=self._limit if self._limit is not None else DEFAULT_LIMIT,
+      stream=stream,
+      columnar=columnar,
+    )
+
+  def compile (self):
+    '''
+    Validate the query once and freeze it into a reusable
+    prepared query, whose conditions can be completed at
+    each execution
+
+    Returns
+    -------
+    prepared: PreparedQuery
+      Immutable and hashable query
+
+    Examples
+    --------
+    Example of a query re-used for several accounts::
+
+      from trigger import TriggerDB
+
+      with TriggerDB() as db:
+        prepared = db.from_('myair').select('hour', 'pm25').where(year='=2025').limit(1000).compile()
+        res = {
+          email: prepared.execute(email=f'={email}')
+          for email in ('DE000086', 'DE000087')
+        }
+    '''
+    return PreparedQuery(self)
+
+  def iter (self, page_size: int = MAXIMUM_LIMIT, prefetch: bool = True) -> Iterator[dict]:
+    '''
+    Iterate over the whole result set of the query, paging
+    through the records sorted by timestamp.
+
+    Parameters
+    ----------
+    page_size: int (default := MAXIMUM_LIMIT)
+      Number of records to retrieve for each request
+
+    prefetch: bool (default := True)
+      Request the next page in background while the
+      current one is consumed
+
+    Returns
+    -------
+    rows: Iterator[dict]
+      Generator of the resulting records
+    '''
+    if self._range is not None:
+      start, end, resolution = self._range
+      return self.db.iter_range(
+        table=self.table,
+        start=start,
+        end=end,
+        columns=self._columns,
+        where=self._where,
+        order=self._order,
+        limit=self._limit,
+        resolution=resolution,
+        page_size=page_size,
+        prefetch=prefetch,
+      )
+
+    return self.db.iter_select(
+      table=self.table,
+      columns=self._columns,
+      where=self._where,
+      order=self._order,
       limit=self._limit,
-    )
\ No newline at end of file
+      page_size=page_size,
+      prefetch=prefetch,
+    )
+
+class PreparedQuery (object):
+  '''
+  Immutable query validated once at compile time.
+
+  The parameters of the request are precomputed, thus the
+  execution only appends the bound conditions.
+  Two prepared queries are equal (and they have the same hash)
+  if they describe the same query, so they can be used as keys
+  of dictionaries and caches.
+
+  Parameters
+  ----------
+  builder: QueryBuilder
+    Builder of the query to compile
+  '''
+
+  __slots__ = (
+    'db', 'table', 'columns', 'where', 'order_by', 'order',
+    'limit', 'workers', 'shard', 'range', '_params', '_conditions',
+  )
+
+  def __init__ (self, builder: QueryBuilder):
+    db = builder.db
+    _set = lambda name, value: object.__setattr__(self, name, value)
+    _set('db', db)
+    _set('table', builder.table)
+    _set('columns', '*' if builder._columns == '*' else tuple(builder._columns))
+    _set('where', builder._where)
+    _set('order_by', builder._order_by)
+    _set('order', builder._order)
+    _set('limit', builder._limit)
+    _set('workers', builder._workers)
+    _set('shard', builder._shard)
+    _set('range', builder._range)
+
+    # the simple queries are sent as a single precomputed request
+    alternatives = where_alternatives(builder._where)
+    if builder._range is None and builder._workers is None and len(alternatives) == 1:
+      _set('_params', db._build_params(
+        table=self.table,
+        columns=builder._columns,
+        where=alternatives[0],
+        order_by=self.order_by,
+        order=self.order,
+        limit=self.limit if self.limit is not None else DEFAULT_LIMIT,
+      ))
+      _set('_conditions', tuple(f'{col}{expr}' for col, expr in alternatives[0]))
+    else:
+      _set('_params', None)
+      _set('_conditions', None)
+
+  def __setattr__ (self, name, value):
+    raise AttributeError('Prepared queries are immutable')
+
+  def _key (self) -> tuple:
+    return (
+      self.table, self.columns, self.where, self.order_by, self.order,
+      self.limit, self.workers, self.shard, self.range,
+    )
+
+  def __eq__ (self, other) -> bool:
+    return isinstance(other, PreparedQuery) and self._key() == other._key()
+
+  def __hash__ (self) -> int:
+    return hash(self._key())
+
+  def __repr__ (self) -> str:
+    return (
+      f'PreparedQuery(table={self.table!r}, columns={self.columns!r}, '
+      f'where={self.where!r}, limit={self.limit!r})'
+    )
+
+  def _bind (self, bindings: Dict[str, str]) -> Optional[Predicate]:
+    '''
+    Combine the conditions of the query with the bound ones
+
+    Parameters
+    ----------
+    bindings: dict
+      Conditions to add as 'name=val'
+
+    Returns
+    -------
+    where: Predicate
+      Conditions of the execution
+    '''
+    where = self.where
+    for col, expr in bindings.items():
+      cond = Condition(col, expr)
+      where = cond if where is None else where & cond
+    return where
+
+  def _bound_params (self, bindings: Dict[str, str]) -> Optional[dict]:
+    '''
+    Get the parameters of the single request of the execution
+
+    Parameters
+    ----------
+    bindings: dict
+      Conditions to add as 'name=val'
+
+    Returns
+    -------
+    params: dict
+      Parameters of the request or None if the query
+      requires multiple requests
+    '''
+    if self._params is None:
+      return None
+    valid = self.db._valid_columns[self.table]
+    conds = list(self._conditions)
+    for col, expr in bindings.items():
+      if col not in valid:
+        self.db._check_column(table=self.table, column=col)
+      conds.append(f'{col}{expr}')
+    params = dict(self._params)
+    if conds:
+      params['where'] = ','.join(conds)
+    return params
+
+  def execute (self, stream: bool = False, columnar: Optional[bool] = None, **bindings: str) -> Union[list, ResultSet]:
+    '''
+    Run the query with the bound conditions
+
+    Parameters
+    ----------
+    stream: bool (default := False)
+      Decode the records while the response is received.
+      It is not available in parallel mode
+
+    columnar: bool (default := None)
+      Return the records as ResultSet.
+      If None, the setting of the database object is used
+
+    **bindings: str
+      Conditions to add to the query as 'name=val'
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records.
+      If stream is True, a generator of the records is returned
+    '''
+    params = self._bound_params(bindings)
+    if params is not None:
+      if not stream and (self.db._columnar if columnar is None else columnar):
+        return self.db._collect(table=self.table, params=params)
+      return self.db._request(table=self.table, params=params, stream=stream)
+    return self._dispatch(self._bind(bindings), stream=stream, columnar=columnar)
+
+  def _dispatch (self, where: Optional[Predicate], stream: bool, columnar: Optional[bool]):
+    '''
+    Run the query which requires multiple requests
+
+    Parameters
+    ----------
+    where: Predicate
+      Conditions of the execution
+
+    stream: bool
+      Decode the records while the response is received
+
+    columnar: bool
+      Return the records as ResultSet
+
+    Returns
+    -------
+    res: list or ResultSet
+      Resulting records
+    '''
+    columns = list(self.columns) if self.columns != '*' else '*'
+    if self.range is not None:
+      start, end, resolution = self.range
+      if stream:
+        return self.db.iter_range(
+          table=self.table,
+          start=start,
+          end=end,
+          columns=columns,
+          where=where,
+          order=self.order,
+          limit=self.limit,
+          resolution=resolution,
+        )
+      return self.db.range_select(
+        table=self.table,
+        start=start,
+        end=end,
+        columns=columns,
+        where=where,
+        order=self.order,
+        limit=self.limit,
+        resolution=resolution,
+        workers=self.workers or 1,
+        columnar=columnar,
+      )
+
+    if self.workers is not None:
+      if stream:
+        raise ValueError('Streaming is not available in parallel mode')
+      return self.db.parallel_select(
+        table=self.table,
+        columns=columns,
+        where=where,
+        order=self.order,
+        limit=self.limit,
+        workers=self.workers,
+        shard=self.shard,
+        columnar=columnar,
+      )
+
+    return self.db.select(
+      table=self.table,
+      columns=columns,
+      where=where,
+      order_by=self.order_by,
+      order=self.order,
+      limit=self.limit if self.limit is not None else DEFAULT_LIMIT,
+      stream=stream,
+      columnar=columnar,
+    )
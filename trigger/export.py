@@ -0,0 +1,164 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import struct
+from pathlib import Path
+from datetime import datetime
+from typing import List
+from typing import Union
+from typing import Optional
+
+from .utils import RESET_COLOR_CODE
+from .utils import GREEN_COLOR_CODE
+from .resultset import ResultSet
+from .resultset import assemble_timestamps
+from .resultset import column_dtype
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'export_signal',
+]
+
+# magic string of the .npy format (version 1.0)
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+# alignment of the data required by the .npy format
+_NPY_ALIGN = 64
+# largest number of samples of the header placeholder
+_MAX_SAMPLES = 2 ** 63 - 1
+
+def _npy_header (descr: list, size: int, length: int = None) -> bytes:
+  '''
+  Build the header of the .npy file with the given
+  number of records
+
+  Parameters
+  ----------
+  descr: list
+    Description of the dtype of the records
+
+  size: int
+    Number of records
+
+  length: int (default := None)
+    Total length of the header.
+    If None, the length is large enough to store any number
+    of records, so the header can be re-written in place
+
+  Returns
+  -------
+  header: bytes
+    Header of the file
+  '''
+  if length is None:
+    length = len(_npy_header(descr, _MAX_SAMPLES, length=0))
+    length = -(-length // _NPY_ALIGN) * _NPY_ALIGN
+  text = repr({'descr': descr, 'fortran_order': False, 'shape': (size, )})
+  # magic, header length, dictionary padded with spaces, newline
+  padding = max(length - len(_NPY_MAGIC) - 2 - len(text) - 1, 0)
+  text = (text + ' ' * padding + '\n').encode('latin1')
+  return _NPY_MAGIC + struct.pack('<H', len(text)) + text
+
+def export_signal (
+  db,
+  table: str,
+  email: str,
+  path: Union[str, Path],
+  start: Optional[Union[str, datetime]] = None,
+  end: Optional[Union[str, datetime]] = None,
+  column: Optional[str] = None,
+  page_size: int = 10_000,
+):
+  '''
+  Write the samples of the signal of an account into a .npy file
+  while they are retrieved, and map the file in memory.
+
+  The file stores a structured array with the timestamps of the
+  samples (int64 microseconds since the epoch) and their values
+  (float64). Only a page of records is kept in memory, since the
+  header of the file is written in place at the end.
+
+  Parameters
+  ----------
+  db: TriggerDB
+    Database instance to use for the requests
+
+  table: str
+    Name of the table of the signal (e.g. 'ecg' or 'ppg')
+
+  email: str
+    Account of the signal
+
+  path: str
+    Path of the .npy file
+
+  start: str or datetime (default := None)
+    Beginning of the range (included).
+    If None, the whole recording is exported
+
+  end: str or datetime (default := None)
+    End of the range (excluded)
+
+  column: str (default := None)
+    Column of the signal values.
+    If None, the column with the name of the table is used
+
+  page_size: int (default := 10000)
+    Number of records to retrieve for each request
+
+  Returns
+  -------
+  signal: numpy.memmap
+    Read-only structured array with fields 'timestamp' and
+    the name of the signal column
+  '''
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError('NumPy is required for the export of the signals: pip install numpy')
+
+  keys = db._keyset_columns(table)
+  column = table if column is None else column
+  # the signal must be a numerical column
+  if column not in db.columns(table) or column_dtype(column) != 'd':
+    raise ValueError(f"Invalid signal column '{column}' for the table '{table}'")
+  if (start is None) != (end is None):
+    raise ValueError('Both the beginning and the end of the range must be given')
+
+  dtype = np.dtype([('timestamp', '<i8'), (column, '<f8')])
+  descr = np.lib.format.dtype_to_descr(dtype)
+  header = _npy_header(descr, 0)
+  columns: List[str] = keys + [column]
+  where = [('email', f'={email}')]
+
+  if start is None:
+    pages = db._iter_pages(table=table, columns=columns, where=where, page_size=page_size)
+  else:
+    pages = db._iter_range_pages(
+      table=table,
+      start=start,
+      end=end,
+      columns=columns,
+      where=where,
+      page_size=page_size,
+    )
+
+  size = 0
+  with open(path, 'wb') as fp:
+    fp.write(header)
+    try:
+      for page in pages:
+        rs = ResultSet.from_rows(page, columns=columns)
+        samples = np.empty(len(rs), dtype=dtype)
+        samples['timestamp'] = assemble_timestamps(rs).view(np.int64)
+        samples[column] = rs.to_numpy(column)
+        fp.write(samples.tobytes())
+        size += len(samples)
+    finally:
+      # the file is consistent also if the export is interrupted
+      fp.seek(0)
+      fp.write(_npy_header(descr, size, length=len(header)))
+
+  print(f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} {table}: {size} samples of {email} exported to {path}')
+  return np.load(path, mmap_mode='r')
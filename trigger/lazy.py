@@ -0,0 +1,643 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import copy
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Optional
+from typing import NamedTuple
+from collections.abc import Mapping
+
+from .resultset import ResultSet
+from .resultset import column_dtype
+from .resultset import parse_aggregate
+from .predicates import And
+from .predicates import Condition
+from .predicates import Predicate
+from .predicates import where_alternatives
+from ._timerange import TIME_COLUMNS
+from ._timerange import NATURAL_BOUNDS
+from ._timerange import clip_bounds
+from ._timerange import column_bounds
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'LazyFrame',
+  'aggregate',
+  'column_domain',
+  'separated_by',
+]
+
+# maximum number of aggregated requests sent for a grouped query
+MAX_GROUP_REQUESTS = 64
+
+def _numpy ():
+  '''
+  Import NumPy for the local kernels
+  '''
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError('NumPy is required for the lazy queries: pip install numpy')
+  return np
+
+def aggregate (data: Mapping, keys: List[str], aggregates: List[str]) -> Dict[str, Any]:
+  '''
+  Group the records by the key columns and compute the
+  aggregated functions of each group, with vectorized
+  operations.
+  The missing values (NaN) are ignored, as the server does
+
+  Parameters
+  ----------
+  data: Mapping
+    Columns of the records as mapping of arrays
+
+  keys: list
+    Columns of the grouping. If empty, a single group of
+    all the records is used
+
+  aggregates: list
+    Aggregated columns, e.g. ['AVG(pm25)', 'COUNT(*)']
+
+  Returns
+  -------
+  columns: dict
+    Arrays of the keys and of the aggregated values for each
+    group, sorted by keys
+
+  Examples
+  --------
+  >>> aggregate({'hour': [1, 0, 1], 'pm25': [2., 4., 6.]}, keys=['hour'], aggregates=['AVG(pm25)'])
+  {'hour': array([0, 1]), 'AVG(pm25)': array([4., 4.])}
+  '''
+  np = _numpy()
+  size = len(next(iter(data.values()))) if len(data) else 0
+
+  res = {}
+  if keys:
+    codes, uniques = [], []
+    for key in keys:
+      uniq, inverse = np.unique(np.asarray(data[key]), return_inverse=True)
+      uniques.append(uniq)
+      codes.append(inverse.reshape(-1))
+    shape = [max(len(uniq), 1) for uniq in uniques]
+    groups, ids = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+    ids = ids.reshape(-1)
+    for key, uniq, pos in zip(keys, uniques, np.unravel_index(groups, shape)):
+      res[key] = uniq[pos]
+    ngroups = len(groups)
+  else:
+    ids = np.zeros(size, dtype=np.int64)
+    ngroups = 1
+
+  # the records sorted by group, for the reductions
+  order = np.argsort(ids, kind='stable')
+  starts = np.searchsorted(ids[order], np.arange(ngroups))
+
+  for name in aggregates:
+    func, column = parse_aggregate(name)
+    if column == '*':
+      res[name] = np.bincount(ids, minlength=ngroups)
+      continue
+    values = np.asarray(data[column], dtype=np.float64)
+    valid = ~np.isnan(values)
+    count = np.bincount(ids[valid], minlength=ngroups)
+    if func == 'COUNT':
+      res[name] = count
+    elif func in ('SUM', 'AVG'):
+      total = np.bincount(ids[valid], weights=values[valid], minlength=ngroups)
+      with np.errstate(invalid='ignore', divide='ignore'):
+        res[name] = np.where(count > 0, total if func == 'SUM' else total / count, np.nan)
+    elif func in ('MIN', 'MAX'):
+      reduce = np.fmin if func == 'MIN' else np.fmax
+      out = np.full(ngroups, np.nan)
+      if size:
+        nonempty = starts < size
+        out[nonempty] = reduce.reduceat(values[order], starts[nonempty])
+      res[name] = np.where(count > 0, out, np.nan)
+    else:
+      raise ValueError(f'Invalid aggregated function: {name}')
+  return res
+
+def column_domain (conditions: List[Tuple[str, str]], column: str) -> Optional[list]:
+  '''
+  Get the values of the column admitted by the conditions,
+  if they are a finite set
+
+  Parameters
+  ----------
+  conditions: list
+    List of (column, expression) pairs of the query
+
+  column: str
+    Name of the column
+
+  Returns
+  -------
+  values: list
+    Admitted values, or None if they are not known
+  '''
+  equal = {expr[1:].strip() for col, expr in conditions if col == column and expr.startswith('=')}
+  dtype = column_dtype(column)
+  if equal:
+    cast = int if dtype == 'q' else float if dtype == 'd' else str
+    try:
+      values = sorted({cast(val) for val in equal})
+    except ValueError:
+      return None
+    # contradicting equalities admit no value
+    return values if len(values) == 1 else []
+
+  if column not in TIME_COLUMNS:
+    return None
+  bounds = column_bounds(conditions, column)
+  natural = NATURAL_BOUNDS.get(column)
+  if natural is not None:
+    return list(clip_bounds(bounds, natural))
+  if bounds[0] is None or bounds[1] is None:
+    return None
+  return list(range(bounds[0], bounds[1] + 1))
+
+def separated_by (alternatives: List[List[Tuple[str, str]]], keys: List[str]) -> bool:
+  '''
+  Check if the alternative conjunctions of conditions differ
+  only in the key columns, so each group belongs to a single
+  alternative and the partial aggregates need no merging
+
+  Parameters
+  ----------
+  alternatives: list
+    Alternative conjunctions of conditions of the query
+
+  keys: list
+    Columns of the grouping
+
+  Returns
+  -------
+  separated: bool
+    True if the groups of the alternatives are disjoint
+  '''
+  if len(alternatives) <= 1:
+    return True
+  common = set.intersection(*(set(conds) for conds in alternatives))
+  separating = {col for conds in alternatives for col, expr in conds if (col, expr) not in common}
+  return separating <= set(keys)
+
+class _Plan (NamedTuple):
+  '''
+  Physical plan of the lazy query
+  '''
+  # conditions sent to the server
+  remote: Optional[Predicate]
+  # conditions evaluated on the received records
+  local: Tuple[Predicate, ...]
+  # columns of the result
+  output: List[str]
+  # aggregated columns of the result
+  aggregates: List[str]
+  # columns of the grouping
+  keys: List[str]
+  # columns requested to the server for the local evaluation
+  fetch: List[str]
+  # values of the keys and conditions of each aggregated request,
+  # or None if the aggregation is local
+  groups: Optional[List[Tuple[tuple, List[Tuple[str, str]]]]]
+  # ordering and limit sent to the server
+  pushed_limit: bool
+
+class LazyFrame (object):
+  '''
+  Lazy query on a table, evaluated only by collect.
+
+  Each method returns a new frame, so a frame can be re-used
+  as base of several queries.
+  When the frame is collected, the selected columns, the
+  conditions and the aggregated functions which the server
+  can evaluate are sent in the requests, so only the needed
+  values are transferred; the remaining operations
+  (comparisons between columns, aggregations of groups with
+  unknown values, ordering of the whole result) are applied
+  to the received records with vectorized operations
+  (NumPy is required).
+
+  Parameters
+  ----------
+  db: TriggerDB
+    Database instance to use for the requests
+
+  table: str
+    Table name to use in the query
+
+  Examples
+  --------
+  Example of hourly statistics of two accounts::
+
+    from trigger import TriggerDB
+    from trigger import col
+
+    with TriggerDB() as db:
+      rs = (
+        db.lazy('myair')
+          .filter(col('email').isin(['DE000086', 'DE000087']), year='=2025', month='=9')
+          .filter(col('pm10') > col('pm25'))
+          .groupby('email', 'hour')
+          .agg(pm25='AVG', pm10=['MIN', 'MAX'])
+          .collect()
+      )
+      print(db.lazy('myair').select('hour', 'pm25').filter(hour='>=8').explain())
+  '''
+
+  def __init__ (self, db, table: str):
+    db._check_table(table)
+    self.db = db
+    self.table = table
+    self._filters: Tuple[Predicate, ...] = ()
+    self._columns: Tuple[str, ...] = ()
+    self._keys: Tuple[str, ...] = ()
+    self._sort: Optional[Tuple[str, bool]] = None
+    self._limit: Optional[int] = None
+
+  def _with (self, **changes) -> 'LazyFrame':
+    '''
+    Get a copy of the frame with the given changes
+    '''
+    frame = copy.copy(self)
+    for name, value in changes.items():
+      setattr(frame, f'_{name}', value)
+    return frame
+
+  def __repr__ (self) -> str:
+    return f'LazyFrame(table={self.table!r}, columns={list(self._columns)!r}, keys={list(self._keys)!r})'
+
+  def filter (self, *predicates: Predicate, **conditions: str) -> 'LazyFrame':
+    '''
+    Add the conditions on the records, in conjunction
+
+    Parameters
+    ----------
+    *predicates: Predicate
+      Conditions as predicates, e.g. col('hour') >= 8 or
+      col('pm10') > col('pm25')
+
+    **conditions: str
+      Condition to apply as 'name=val'
+
+    Returns
+    -------
+    frame: LazyFrame
+      Filtered frame
+    '''
+    terms = list(self._filters)
+    for predicate in list(predicates) + [Condition(col, expr) for col, expr in conditions.items()]:
+      if not isinstance(predicate, Predicate):
+        raise ValueError(f'Invalid condition: {predicate!r}')
+      for col in predicate.columns():
+        self.db._check_column(table=self.table, column=col)
+      terms.extend(predicate.terms if isinstance(predicate, And) else (predicate, ))
+    return self._with(filters=tuple(terms))
+
+  def select (self, *columns: str) -> 'LazyFrame':
+    '''
+    Set the columns of the result, also as aggregated
+    functions (e.g. 'AVG(pm25)')
+
+    Parameters
+    ----------
+    columns: str
+      List of columns as string names
+
+    Returns
+    -------
+    frame: LazyFrame
+      Projected frame
+    '''
+    for col in columns:
+      self.db._check_column(table=self.table, column=col)
+    return self._with(columns=tuple(columns))
+
+  def agg (self, *aggregates: str, **functions: Union[str, List[str]]) -> 'LazyFrame':
+    '''
+    Add aggregated columns to the result
+
+    Parameters
+    ----------
+    *aggregates: str
+      Aggregated columns, e.g. 'COUNT(*)'
+
+    **functions: str or list
+      Aggregated functions of each column, e.g. pm25='AVG'
+      or pm10=['MIN', 'MAX']
+
+    Returns
+    -------
+    frame: LazyFrame
+      Aggregated frame
+    '''
+    columns = list(aggregates)
+    for col, funcs in functions.items():
+      for func in [funcs] if isinstance(funcs, str) else funcs:
+        if func.upper() not in self.db._valid_functions:
+          raise ValueError(f"Invalid function '{func}'. Available values are: {sorted(self.db._valid_functions)}")
+        columns.append(f'{func.upper()}({col})')
+    return self.select(*self._columns, *columns)
+
+  def groupby (self, *keys: str) -> 'LazyFrame':
+    '''
+    Set the columns of the grouping of the aggregated functions
+
+    Parameters
+    ----------
+    keys: str
+      Names of the columns
+
+    Returns
+    -------
+    frame: LazyFrame
+      Grouped frame
+    '''
+    for key in keys:
+      if parse_aggregate(key) is not None or key not in self.db._available_tables[self.table]:
+        raise ValueError(f"Invalid grouping column '{key}' for the table '{self.table}'")
+    return self._with(keys=tuple(keys))
+
+  def sort (self, column: str, descending: bool = False) -> 'LazyFrame':
+    '''
+    Set the ordering of the result
+
+    Parameters
+    ----------
+    column: str
+      Column of the ordering
+
+    descending: bool (default := False)
+      Descending order
+
+    Returns
+    -------
+    frame: LazyFrame
+      Sorted frame
+    '''
+    self.db._check_column(table=self.table, column=column)
+    return self._with(sort=(column, descending))
+
+  def limit (self, n: int) -> 'LazyFrame':
+    '''
+    Set the maximum number of records of the result
+
+    Parameters
+    ----------
+    n: int
+      Maximum number of records
+
+    Returns
+    -------
+    frame: LazyFrame
+      Truncated frame
+    '''
+    if n is not None and n < 0:
+      raise ValueError('The limit must be non-negative')
+    return self._with(limit=n)
+
+  def _plan (self, max_requests: int = MAX_GROUP_REQUESTS) -> _Plan:
+    '''
+    Split the query into the requests to the server and the
+    local operations
+
+    Parameters
+    ----------
+    max_requests: int (default := MAX_GROUP_REQUESTS)
+      Maximum number of aggregated requests of a grouped query
+
+    Returns
+    -------
+    plan: _Plan
+      Physical plan of the query
+    '''
+    remote_terms = [term for term in self._filters if term.remote]
+    local = tuple(term for term in self._filters if not term.remote)
+    remote = None
+    if remote_terms:
+      remote = remote_terms[0] if len(remote_terms) == 1 else And(*remote_terms)
+
+    columns = list(self._columns) or list(self.db._available_tables[self.table])
+    aggregates = [col for col in columns if parse_aggregate(col) is not None]
+    keys = list(self._keys)
+
+    if keys and not aggregates:
+      raise ValueError('The grouping requires at least one aggregated column')
+    if aggregates:
+      plain = [col for col in columns if col not in aggregates]
+      if any(col not in keys for col in plain):
+        raise ValueError(f'The columns {[c for c in plain if c not in keys]} must be aggregated or used in groupby')
+      output = keys + aggregates
+    else:
+      output = columns
+    if self._sort is not None and self._sort[0] not in output:
+      raise ValueError(f"The ordering column '{self._sort[0]}' is not in the result")
+
+    # the aggregated functions are computed by the server if the groups are known
+    groups = None
+    if aggregates and not local:
+      groups = self._groups(where_alternatives(remote), keys, max_requests)
+
+    needed = set(output)
+    if aggregates:
+      needed = set(keys) | {parse_aggregate(col)[1] for col in aggregates} - {'*'}
+    for term in local:
+      needed |= term.columns()
+    fetch = [col for col in self.db._available_tables[self.table] if col in needed]
+    if not fetch:
+      # COUNT(*) alone still requires the records
+      fetch = [self.db._keyset_columns(self.table)[0]]
+
+    pushed_limit = self._limit is not None and not aggregates and not local
+    return _Plan(remote, local, output, aggregates, keys, fetch, groups, pushed_limit)
+
+  @staticmethod
+  def _groups (
+    alternatives: List[List[Tuple[str, str]]],
+    keys: List[str],
+    max_requests: int,
+  ) -> Optional[List[Tuple[tuple, List[Tuple[str, str]]]]]:
+    '''
+    Get the conditions of the aggregated request of each group
+
+    Parameters
+    ----------
+    alternatives: list
+      Alternative conjunctions of conditions of the query
+
+    keys: list
+      Columns of the grouping
+
+    max_requests: int
+      Maximum number of requests
+
+    Returns
+    -------
+    groups: list
+      Values of the keys and conditions of each group, or None
+      if the values of the keys are not known or too many
+    '''
+    if not separated_by(alternatives, keys):
+      return None
+    groups = []
+    seen = set()
+    for conds in alternatives:
+      domains = [column_domain(conds, key) for key in keys]
+      if any(domain is None for domain in domains):
+        return None
+      for values in product(*domains):
+        # a group admitted by overlapping alternatives would be split
+        if values in seen:
+          return None
+        seen.add(values)
+        extra = [(key, f'={val}') for key, val in zip(keys, values) if (key, f'={val}') not in conds]
+        groups.append((values, conds + extra))
+        if len(groups) > max_requests:
+          return None
+    return groups
+
+  def explain (self, max_requests: int = MAX_GROUP_REQUESTS) -> str:
+    '''
+    Describe the requests sent to the server and the local
+    operations of the query
+
+    Parameters
+    ----------
+    max_requests: int (default := MAX_GROUP_REQUESTS)
+      Maximum number of aggregated requests of a grouped query
+
+    Returns
+    -------
+    plan: str
+      Description of the plan
+    '''
+    plan = self._plan(max_requests=max_requests)
+    alternatives = where_alternatives(plan.remote)
+    where = ' | '.join(','.join(f'{c}{e}' for c, e in conds) for conds in alternatives) or '-'
+    lines = [f'LazyFrame {self.table}']
+    if plan.groups is not None:
+      select = ','.join(plan.aggregates)
+      lines.append(f'  server: select={select} where={where} (aggregated requests: {len(plan.groups)})')
+    else:
+      limit = f' orderBy={self._sort[0] if self._sort else "-"} limit={self._limit}' if plan.pushed_limit else ''
+      lines.append(f'  server: select={",".join(plan.fetch)} where={where}{limit} (requests: {len(alternatives)})')
+      for term in plan.local:
+        lines.append(f'  local: filter {term!r}')
+      if plan.aggregates:
+        lines.append(f'  local: groupby {plan.keys or "-"} aggregate {plan.aggregates}')
+    if not plan.pushed_limit:
+      if self._sort is not None:
+        lines.append(f'  local: sort {self._sort[0]} {"DESC" if self._sort[1] else "ASC"}')
+      if self._limit is not None:
+        lines.append(f'  local: limit {self._limit}')
+    lines.append(f'  output: {plan.output}')
+    return '\n'.join(lines)
+
+  def _fetch (self, plan: _Plan) -> Dict[str, Any]:
+    '''
+    Retrieve the columns of the records needed by the local
+    operations
+    '''
+    db = self.db
+    if plan.pushed_limit:
+      rs = db.select(
+        table=self.table,
+        columns=plan.fetch,
+        where=plan.remote,
+        order_by=self._sort[0] if self._sort else None,
+        order='DESC' if self._sort and self._sort[1] else 'ASC',
+        limit=self._limit,
+        columnar=True,
+      )
+    elif any(col in TIME_COLUMNS for col in db._available_tables[self.table]):
+      rs = ResultSet.from_rows(db.iter_select(table=self.table, columns=plan.fetch, where=plan.remote), columns=plan.fetch)
+    else:
+      from .db import MAXIMUM_LIMIT
+      rs = db.select(table=self.table, columns=plan.fetch, where=plan.remote, limit=MAXIMUM_LIMIT, columnar=True)
+    return rs.to_numpy()
+
+  def _aggregate_remote (self, plan: _Plan, workers: Optional[int]) -> Dict[str, Any]:
+    '''
+    Send an aggregated request for each group, concurrently
+    '''
+    np = _numpy()
+    columns = list(dict.fromkeys(plan.aggregates + (['COUNT(*)'] if plan.keys else [])))
+
+    def _run (conds: List[Tuple[str, str]]) -> dict:
+      rows = self.db.select(table=self.table, columns=columns, where=conds, columnar=False)
+      return rows[0] if rows else {}
+
+    workers = workers or self.db._session_kwargs['pool_size']
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(plan.groups)))) as executor:
+      results = list(executor.map(_run, [conds for _, conds in plan.groups]))
+
+    # the groups without records are discarded
+    found = [
+      (values, row) for (values, _), row in zip(plan.groups, results)
+      if not plan.keys or row.get('COUNT(*)')
+    ]
+    res = {}
+    for idx, key in enumerate(plan.keys):
+      res[key] = np.array([values[idx] for values, _ in found], dtype=object if column_dtype(key) == 'str' else None)
+    for col in plan.aggregates:
+      dtype = np.int64 if parse_aggregate(col)[0] == 'COUNT' else np.float64
+      res[col] = np.array([np.nan if row.get(col) is None else row[col] for _, row in found], dtype=dtype)
+    if plan.keys and found:
+      order = np.lexsort([res[key] for key in reversed(plan.keys)])
+      res = {col: values[order] for col, values in res.items()}
+    return res
+
+  def collect (self, max_requests: int = MAX_GROUP_REQUESTS, workers: Optional[int] = None) -> ResultSet:
+    '''
+    Run the query
+
+    Parameters
+    ----------
+    max_requests: int (default := MAX_GROUP_REQUESTS)
+      Maximum number of aggregated requests of a grouped query.
+      With more groups the records are aggregated locally
+
+    workers: int (default := None)
+      Number of concurrent aggregated requests.
+      If None, the size of the pool of connections is used
+
+    Returns
+    -------
+    rs: ResultSet
+      Resulting records
+    '''
+    np = _numpy()
+    plan = self._plan(max_requests=max_requests)
+
+    if plan.groups is not None:
+      data = self._aggregate_remote(plan, workers=workers)
+    else:
+      data = self._fetch(plan)
+      if plan.local:
+        mask = np.ones(len(next(iter(data.values()))), dtype=bool)
+        for term in plan.local:
+          mask &= term.evaluate(data)
+        data = {col: values[mask] for col, values in data.items()}
+      if plan.aggregates:
+        data = aggregate(data, keys=plan.keys, aggregates=plan.aggregates)
+    data = {col: data[col] for col in plan.output}
+
+    if not plan.pushed_limit:
+      if self._sort is not None:
+        column, descending = self._sort
+        order = np.argsort(data[column], kind='stable')
+        order = order[::-1] if descending else order
+        data = {col: values[order] for col, values in data.items()}
+      if self._limit is not None:
+        data = {col: values[:self._limit] for col, values in data.items()}
+    return ResultSet.from_columns(data)
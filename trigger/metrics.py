@@ -0,0 +1,231 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Union
+from typing import Callable
+from typing import Optional
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'Metrics',
+]
+
+# timing phases of the events, in seconds
+PHASES = ('duration', 'ttfb', 'transfer', 'decode')
+
+class Metrics (object):
+  '''
+  Collector of the timings of the exchanges with the server.
+
+  An event is recorded for the login, for each query (select)
+  and for the logout, with the total duration and, when
+  available, the time to the first byte of the response (which
+  includes the DNS lookup and the connection of new sockets),
+  the transfer time of the body, the decode time of the records,
+  the size of the response, the number of records and the number
+  of attempts.
+  The events can be forwarded to a callback, aggregated into
+  Prometheus-style counters or exported as JSON trace.
+
+  Parameters
+  ----------
+  callback : callable (default := None)
+    Function called with the dictionary of each event
+
+  max_events : int (default := 100000)
+    Maximum number of events kept for the trace; the oldest
+    ones are discarded first. The counters include all of them
+
+  Examples
+  --------
+  Example of the breakdown of the time of the queries::
+
+    from trigger import TriggerDB
+    from trigger import Metrics
+
+    metrics = Metrics()
+    with TriggerDB(metrics=metrics) as db:
+      res = db.select('myair', limit=10_000)
+
+    metrics.report()
+    metrics.write_trace('trace.json')
+    print(metrics.to_prometheus())
+  '''
+
+  def __init__ (self, callback: Optional[Callable[[dict], None]] = None, max_events: int = 100_000):
+    self._callback = callback
+    self._events = deque(maxlen=max_events)
+    self._totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    self._lock = threading.Lock()
+    # the events are timed with the monotonic clock
+    self._origin = time.time() - time.perf_counter()
+
+  def emit (self, event: str, start: float, duration: float, **fields):
+    '''
+    Record an event
+
+    Parameters
+    ----------
+    event: str
+      Name of the event, e.g. 'login', 'select' or 'logout'
+
+    start: float
+      Beginning of the event as time.perf_counter() value
+
+    duration: float
+      Duration of the event in seconds
+
+    **fields: dict
+      Measures of the event (table, status, ttfb, transfer,
+      decode, bytes, rows, attempts, cached, stream)
+    '''
+    record = {
+      'event': event,
+      'timestamp': self._origin + start,
+      'duration': duration,
+      'thread': threading.get_ident(),
+      **fields,
+    }
+    key = (event, fields.get('table') or '')
+
+    with self._lock:
+      self._events.append(record)
+      totals = self._totals.setdefault(key, dict.fromkeys(
+        ('count', 'errors', 'retries', 'bytes', 'rows') + PHASES, 0
+      ))
+      totals['count'] += 1
+      totals['errors'] += fields.get('status', 200) != 200
+      totals['retries'] += max(fields.get('attempts', 1) - 1, 0)
+      for name in ('bytes', 'rows') + PHASES:
+        totals[name] += record.get(name) or 0
+
+    if self._callback is not None:
+      self._callback(record)
+
+  @property
+  def events (self) -> List[dict]:
+    '''
+    Get the recorded events, from the oldest one
+    '''
+    with self._lock:
+      return list(self._events)
+
+  def reset (self):
+    '''
+    Discard the recorded events and counters
+    '''
+    with self._lock:
+      self._events.clear()
+      self._totals.clear()
+
+  def summary (self) -> Dict[Tuple[str, str], Dict[str, float]]:
+    '''
+    Get the totals of the events grouped by name and table
+
+    Returns
+    -------
+    totals: dict
+      Number of events, errors, retries, bytes, records and
+      seconds spent in each phase for each (event, table) pair
+    '''
+    with self._lock:
+      return {key: dict(totals) for key, totals in self._totals.items()}
+
+  def report (self, file=sys.stderr):
+    '''
+    Print the breakdown of the time spent for each event and table
+
+    Parameters
+    ----------
+    file: file-like (default := sys.stderr)
+      Output stream
+    '''
+    header = (
+      f'{"event":<8} {"table":<15} {"count":>6} {"total(s)":>9} {"ttfb(s)":>8} '
+      f'{"transfer(s)":>11} {"decode(s)":>9} {"MiB":>8} {"rows":>9} {"rows/s":>10} {"retries":>7}'
+    )
+    print(header, file=file)
+    print('-' * len(header), file=file)
+    for (event, table), tot in sorted(self.summary().items()):
+      rate = tot['rows'] / tot['duration'] if tot['duration'] > 0 else 0.
+      print(
+        f'{event:<8} {table or "-":<15} {tot["count"]:>6} {tot["duration"]:>9.3f} {tot["ttfb"]:>8.3f} '
+        f'{tot["transfer"]:>11.3f} {tot["decode"]:>9.3f} {tot["bytes"] / 2 ** 20:>8.2f} '
+        f'{tot["rows"]:>9} {rate:>10.0f} {tot["retries"]:>7}',
+        file=file
+      )
+    file.flush()
+
+  def to_prometheus (self, prefix: str = 'trigger') -> str:
+    '''
+    Export the counters in the Prometheus text format
+
+    Parameters
+    ----------
+    prefix: str (default := 'trigger')
+      Prefix of the names of the metrics
+
+    Returns
+    -------
+    text: str
+      Counters of the events
+    '''
+    summary = self.summary()
+    counters = (
+      ('events_total', 'count', 'Number of events'),
+      ('errors_total', 'errors', 'Number of events with an error response'),
+      ('retries_total', 'retries', 'Number of retried requests'),
+      ('response_bytes_total', 'bytes', 'Size of the responses in bytes'),
+      ('rows_total', 'rows', 'Number of decoded records'),
+    )
+    lines = []
+    for name, field, doc in counters:
+      lines.append(f'# HELP {prefix}_{name} {doc}')
+      lines.append(f'# TYPE {prefix}_{name} counter')
+      for (event, table), tot in sorted(summary.items()):
+        lines.append(f'{prefix}_{name}{{event="{event}",table="{table}"}} {tot[field]:g}')
+
+    lines.append(f'# HELP {prefix}_seconds_total Time spent in each phase of the events')
+    lines.append(f'# TYPE {prefix}_seconds_total counter')
+    for (event, table), tot in sorted(summary.items()):
+      for phase in PHASES:
+        lines.append(f'{prefix}_seconds_total{{event="{event}",table="{table}",phase="{phase}"}} {tot[phase]:.6f}')
+    return '\n'.join(lines) + '\n'
+
+  def write_trace (self, path: Union[str, Path]):
+    '''
+    Write the events as JSON trace, readable by the trace
+    viewers (e.g. chrome://tracing or Perfetto)
+
+    Parameters
+    ----------
+    path: str
+      Path of the trace file
+    '''
+    pid = os.getpid()
+    trace = [
+      {
+        'name': f'{ev["event"]} {ev.get("table") or ""}'.strip(),
+        'cat': ev['event'],
+        'ph': 'X',
+        'ts': ev['timestamp'] * 1e6,
+        'dur': ev['duration'] * 1e6,
+        'pid': pid,
+        'tid': ev['thread'],
+        'args': {k: v for k, v in ev.items() if k not in ('event', 'timestamp', 'duration', 'thread')},
+      }
+      for ev in self.events
+    ]
+    Path(path).write_text(json.dumps({'traceEvents': trace}, default=str))
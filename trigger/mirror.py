@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import sqlite3
+from pathlib import Path
+from typing import List
+from typing import Dict
+from typing import Union
+from typing import Optional
+
+from .utils import RESET_COLOR_CODE
+from .utils import GREEN_COLOR_CODE
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'sync_table',
+]
+
+def _quote (name: str) -> str:
+  '''
+  Quote the identifier for the SQL statements
+
+  Parameters
+  ----------
+  name: str
+    Name of the table or column
+
+  Returns
+  -------
+  quoted: str
+    Identifier safe for the SQL statements
+  '''
+  return '"{}"'.format(name.replace('"', '""'))
+
+def _create_table (conn: sqlite3.Connection, table: str, columns: List[str], keys: List[str]):
+  '''
+  Create the local table (if it does not exist) with the
+  index for the retrieval of the high-watermark
+
+  Parameters
+  ----------
+  conn: sqlite3.Connection
+    Connection to the local store
+
+  table: str
+    Name of the table
+
+  columns: list
+    Column names of the table
+
+  keys: list
+    Timestamp columns of the table
+  '''
+  conn.execute(
+    f'CREATE TABLE IF NOT EXISTS {_quote(table)} ({", ".join(map(_quote, columns))})'
+  )
+  conn.execute(
+    f'CREATE INDEX IF NOT EXISTS {_quote(f"idx_{table}_email_time")} '
+    f'ON {_quote(table)} ({", ".join(map(_quote, ["email"] + keys))})'
+  )
+
+def _watermark (conn: sqlite3.Connection, table: str, email: str, keys: List[str]) -> Optional[tuple]:
+  '''
+  Get the most recent timestamp stored for the account
+
+  Parameters
+  ----------
+  conn: sqlite3.Connection
+    Connection to the local store
+
+  table: str
+    Name of the table
+
+  email: str
+    Account to evaluate
+
+  keys: list
+    Timestamp columns of the table
+
+  Returns
+  -------
+  watermark: tuple
+    Values of the timestamp columns of the most recent
+    record or None if no record is stored
+  '''
+  order = ', '.join(f'{_quote(k)} DESC' for k in keys)
+  row = conn.execute(
+    f'SELECT {", ".join(map(_quote, keys))} FROM {_quote(table)} '
+    f'WHERE {_quote("email")} = ? ORDER BY {order} LIMIT 1',
+    (email, )
+  ).fetchone()
+  return tuple(row) if row is not None else None
+
+def sync_table (
+  db,
+  table: str,
+  emails: Union[List[str], str] = None,
+  store: Union[str, Path] = 'trigger.sqlite',
+  where: Dict[str, str] = None,
+  page_size: int = 10_000,
+) -> Dict[str, int]:
+  '''
+  Update the local copy of the table with the records more recent
+  than the ones already stored for each account
+
+  Parameters
+  ----------
+  db: TriggerDB
+    Database instance to use for the requests
+
+  table: str
+    Name of the table to synchronize
+
+  emails: list (default := None)
+    Accounts to synchronize.
+    If None, all the registered accounts are used
+
+  store: str (default := 'trigger.sqlite')
+    Path of the SQLite file of the local copy
+
+  where: dict (default := None)
+    Additional conditions to apply on the records
+
+  page_size: int (default := 10000)
+    Number of records to retrieve for each request
+
+  Returns
+  -------
+  synced: dict
+    Number of new records stored for each account
+  '''
+  keys = db._keyset_columns(table)
+  columns = db.columns(table)
+  if 'email' not in columns:
+    raise ValueError(f"Table '{table}' has no accounts to synchronize")
+
+  if emails is None:
+    emails = [acc['email'] for acc in db.accounts()]
+  elif isinstance(emails, str):
+    emails = [emails]
+
+  base = dict(where or {})
+  base.pop('email', None)
+
+  insert = (
+    f'INSERT INTO {_quote(table)} ({", ".join(map(_quote, columns))}) '
+    f'VALUES ({", ".join("?" * len(columns))})'
+  )
+
+  synced = {}
+  conn = sqlite3.connect(str(store))
+  try:
+    _create_table(conn, table, columns, keys)
+    conn.commit()
+
+    for email in emails:
+      watermark = _watermark(conn, table, email, keys)
+      synced[email] = 0
+
+      for page in db._iter_pages(
+        table=table,
+        columns='*',
+        where=dict(base, email=f'={email}'),
+        order='ASC',
+        page_size=page_size,
+        after=watermark,
+      ):
+        conn.executemany(
+          insert,
+          (tuple(row.get(col) for col in columns) for row in page)
+        )
+        # the pages are sorted, thus the watermark is consistent
+        # also if the synchronization is interrupted
+        conn.commit()
+        synced[email] += len(page)
+
+      print(f'{GREEN_COLOR_CODE}[INFO]{RESET_COLOR_CODE} {table}: {synced[email]} new records for {email}')
+  finally:
+    conn.close()
+
+  return synced
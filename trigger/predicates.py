@@ -0,0 +1,520 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import re
+import operator
+from itertools import product
+from collections.abc import Mapping
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Iterable
+
+from ._timerange import column_bounds
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'col',
+  'Predicate',
+  'Compare',
+  'where_alternatives',
+]
+
+def _format (value: Any) -> str:
+  '''
+  Format the value for the conditions of the query
+
+  Parameters
+  ----------
+  value: Any
+    Value to compare
+
+  Returns
+  -------
+  val: str
+    Value as string
+  '''
+  if isinstance(value, bool):
+    return str(int(value))
+  return str(value)
+
+# expression of the condition as operator and value
+_EXPRESSION = re.compile(r'^\s*(>=|<=|!=|=|>|<)(.*)$')
+
+_OPERATORS = {
+  '=': operator.eq,
+  '!=': operator.ne,
+  '>': operator.gt,
+  '<': operator.lt,
+  '>=': operator.ge,
+  '<=': operator.le,
+}
+
+def _numpy ():
+  '''
+  Import NumPy for the local evaluation of the predicates
+  '''
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError('NumPy is required for the local evaluation: pip install numpy')
+  return np
+
+def _compare (values, op: str, value: Any):
+  '''
+  Compare the array of the column with the value, converted
+  to the type of the array
+  '''
+  np = _numpy()
+  values = np.asarray(values)
+  if values.dtype.kind in 'iufb' and isinstance(value, str):
+    value = float(value)
+  elif values.dtype.kind not in 'iufb':
+    value = str(value)
+  return np.asarray(_OPERATORS[op](values, value), dtype=bool)
+
+class Predicate (object):
+  '''
+  Base class of the conditions of the queries.
+
+  The predicates are immutable and they can be combined with
+  the & operator. Each predicate is compiled into a list of
+  alternative conjunctions of (column, expression) conditions:
+  a single alternative is sent as a single query, while
+  multiple alternatives (e.g. IN over text values) are sent as
+  parallel sub-queries whose results are merged.
+  '''
+
+  __slots__ = ()
+
+  # the predicate can be sent to the server
+  remote = True
+
+  def _key (self) -> tuple:
+    raise NotImplementedError
+
+  def columns (self) -> set:
+    '''
+    Get the columns used by the predicate
+
+    Returns
+    -------
+    columns: set
+      Names of the columns
+    '''
+    raise NotImplementedError
+
+  def alternatives (self) -> List[List[Tuple[str, str]]]:
+    '''
+    Get the alternative conjunctions of conditions
+    equivalent to the predicate
+
+    Returns
+    -------
+    alternatives: list
+      List of (column, expression) lists
+    '''
+    raise NotImplementedError
+
+  def evaluate (self, data: Mapping):
+    '''
+    Evaluate the predicate on the columns of the records,
+    with vectorized operations (NumPy is required)
+
+    Parameters
+    ----------
+    data: Mapping
+      Columns of the records as mapping of arrays, e.g. a
+      ResultSet or the dictionary of ResultSet.to_numpy
+
+    Returns
+    -------
+    mask: numpy.ndarray
+      Boolean mask of the records which match the predicate
+    '''
+    raise NotImplementedError
+
+  def compile (self) -> List[List[Tuple[str, str]]]:
+    '''
+    Compile the predicate into the minimum number of queries,
+    discarding the alternatives which can not match any record
+
+    Returns
+    -------
+    alternatives: list
+      List of (column, expression) lists, one for each query
+    '''
+    compiled = []
+    for conds in self.alternatives():
+      columns = {c for c, _ in conds}
+      if any(
+        lo is not None and hi is not None and lo > hi
+        for lo, hi in (column_bounds(conds, c) for c in columns)
+      ):
+        continue
+      if conds not in compiled:
+        compiled.append(conds)
+    return compiled
+
+  def __and__ (self, other: 'Predicate') -> 'Predicate':
+    if not isinstance(other, Predicate):
+      return NotImplemented
+    return And(self, other)
+
+  def __eq__ (self, other) -> bool:
+    return type(self) is type(other) and self._key() == other._key()
+
+  def __hash__ (self) -> int:
+    return hash((type(self).__name__, self._key()))
+
+class Condition (Predicate):
+  '''
+  Raw condition given as expression string, e.g. ('hour', '>=8')
+
+  Parameters
+  ----------
+  column: str
+    Name of the column
+
+  expr: str
+    Expression as operator followed by the value
+  '''
+
+  __slots__ = ('column', 'expr')
+
+  def __init__ (self, column: str, expr: str):
+    object.__setattr__(self, 'column', column)
+    object.__setattr__(self, 'expr', str(expr))
+
+  def __setattr__ (self, name, value):
+    raise AttributeError('Predicates are immutable')
+
+  def _key (self) -> tuple:
+    return (self.column, self.expr)
+
+  def columns (self) -> set:
+    return {self.column}
+
+  def alternatives (self) -> List[List[Tuple[str, str]]]:
+    return [[(self.column, self.expr)]]
+
+  def evaluate (self, data: Mapping):
+    match = _EXPRESSION.match(self.expr)
+    if not match:
+      raise ValueError(f'Invalid condition: {self.column}{self.expr}')
+    return _compare(data[self.column], match.group(1), match.group(2).strip())
+
+  def __repr__ (self) -> str:
+    return f'Condition({self.column!r}, {self.expr!r})'
+
+class Between (Predicate):
+  '''
+  Closed range of values of the column
+
+  Parameters
+  ----------
+  column: str
+    Name of the column
+
+  low: Any
+    Minimum value (included)
+
+  high: Any
+    Maximum value (included)
+  '''
+
+  __slots__ = ('column', 'low', 'high')
+
+  def __init__ (self, column: str, low: Any, high: Any):
+    object.__setattr__(self, 'column', column)
+    object.__setattr__(self, 'low', low)
+    object.__setattr__(self, 'high', high)
+
+  def __setattr__ (self, name, value):
+    raise AttributeError('Predicates are immutable')
+
+  def _key (self) -> tuple:
+    return (self.column, self.low, self.high)
+
+  def columns (self) -> set:
+    return {self.column}
+
+  def alternatives (self) -> List[List[Tuple[str, str]]]:
+    return [[(self.column, f'>={_format(self.low)}'), (self.column, f'<={_format(self.high)}')]]
+
+  def evaluate (self, data: Mapping):
+    return _compare(data[self.column], '>=', self.low) & _compare(data[self.column], '<=', self.high)
+
+  def __repr__ (self) -> str:
+    return f'col({self.column!r}).between({self.low!r}, {self.high!r})'
+
+class In (Predicate):
+  '''
+  Set of admitted values of the column.
+
+  Consecutive integer values are merged into ranges, thus
+  they are sent as a single query; the other values require
+  a sub-query each.
+
+  Parameters
+  ----------
+  column: str
+    Name of the column
+
+  values: Iterable
+    Admitted values
+  '''
+
+  __slots__ = ('column', 'values')
+
+  def __init__ (self, column: str, values: Iterable[Any]):
+    object.__setattr__(self, 'column', column)
+    object.__setattr__(self, 'values', tuple(dict.fromkeys(values)))
+
+  def __setattr__ (self, name, value):
+    raise AttributeError('Predicates are immutable')
+
+  def _key (self) -> tuple:
+    return (self.column, self.values)
+
+  def columns (self) -> set:
+    return {self.column}
+
+  def alternatives (self) -> List[List[Tuple[str, str]]]:
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in self.values):
+      return [[(self.column, f'={_format(v)}')] for v in self.values]
+
+    # runs of consecutive integers
+    alternatives = []
+    values = sorted(self.values)
+    start = 0
+    for i in range(1, len(values) + 1):
+      if i < len(values) and values[i] == values[i - 1] + 1:
+        continue
+      lo, hi = values[start], values[i - 1]
+      if lo == hi:
+        alternatives.append([(self.column, f'={lo}')])
+      else:
+        alternatives.append([(self.column, f'>={lo}'), (self.column, f'<={hi}')])
+      start = i
+    return alternatives
+
+  def evaluate (self, data: Mapping):
+    np = _numpy()
+    values = np.asarray(data[self.column])
+    admitted = list(self.values) if values.dtype.kind in 'iufb' else [str(v) for v in self.values]
+    return np.isin(values, admitted)
+
+  def __repr__ (self) -> str:
+    return f'col({self.column!r}).isin({list(self.values)!r})'
+
+class And (Predicate):
+  '''
+  Conjunction of predicates
+
+  Parameters
+  ----------
+  terms: Predicate
+    Predicates to combine
+  '''
+
+  __slots__ = ('terms', )
+
+  def __init__ (self, *terms: Predicate):
+    flat = []
+    for term in terms:
+      flat.extend(term.terms if isinstance(term, And) else (term, ))
+    object.__setattr__(self, 'terms', tuple(flat))
+
+  def __setattr__ (self, name, value):
+    raise AttributeError('Predicates are immutable')
+
+  def _key (self) -> tuple:
+    return self.terms
+
+  def columns (self) -> set:
+    return set().union(*(term.columns() for term in self.terms))
+
+  @property
+  def remote (self) -> bool:
+    return all(term.remote for term in self.terms)
+
+  def alternatives (self) -> List[List[Tuple[str, str]]]:
+    return [
+      [cond for conds in combination for cond in conds]
+      for combination in product(*(term.alternatives() for term in self.terms))
+    ]
+
+  def evaluate (self, data: Mapping):
+    mask = self.terms[0].evaluate(data)
+    for term in self.terms[1:]:
+      mask &= term.evaluate(data)
+    return mask
+
+  def __repr__ (self) -> str:
+    return ' & '.join(f'({term!r})' for term in self.terms)
+
+class Compare (Predicate):
+  '''
+  Comparison between two columns of the same record, e.g.
+  col('pm10') > col('pm25').
+  The server can not evaluate it, so it is applied locally
+  to the received records (see TriggerDB.lazy)
+
+  Parameters
+  ----------
+  column: str
+    Name of the left column
+
+  op: str
+    Comparison operator
+
+  other: str
+    Name of the right column
+  '''
+
+  __slots__ = ('column', 'op', 'other')
+
+  remote = False
+
+  def __init__ (self, column: str, op: str, other: str):
+    object.__setattr__(self, 'column', column)
+    object.__setattr__(self, 'op', op)
+    object.__setattr__(self, 'other', other)
+
+  def __setattr__ (self, name, value):
+    raise AttributeError('Predicates are immutable')
+
+  def _key (self) -> tuple:
+    return (self.column, self.op, self.other)
+
+  def columns (self) -> set:
+    return {self.column, self.other}
+
+  def alternatives (self) -> List[List[Tuple[str, str]]]:
+    raise ValueError(f'The comparison {self!r} can not be evaluated by the server: use TriggerDB.lazy')
+
+  def evaluate (self, data: Mapping):
+    np = _numpy()
+    return np.asarray(_OPERATORS[self.op](np.asarray(data[self.column]), np.asarray(data[self.other])), dtype=bool)
+
+  def __repr__ (self) -> str:
+    return f'col({self.column!r}) {"==" if self.op == "=" else self.op} col({self.other!r})'
+
+class col (object):
+  '''
+  Column reference for the construction of the predicates
+
+  Parameters
+  ----------
+  name: str
+    Name of the column
+
+  Examples
+  --------
+  Example of a query with multiple conditions on the same column::
+
+    from trigger import TriggerDB
+    from trigger import col
+
+    with TriggerDB() as db:
+      res = db.select(
+        table='myair',
+        where=(col('hour') >= 8) & (col('hour') <= 18) & col('email').isin(['DE000086', 'DE000087']),
+      )
+  '''
+
+  __slots__ = ('name', )
+
+  def __init__ (self, name: str):
+    self.name = name
+
+  def _condition (self, op: str, value) -> Predicate:
+    if isinstance(value, col):
+      return Compare(self.name, op, value.name)
+    return Condition(self.name, f'{op}{_format(value)}')
+
+  def __eq__ (self, value) -> Predicate:
+    return self._condition('=', value)
+
+  def __ne__ (self, value) -> Predicate:
+    return self._condition('!=', value)
+
+  def __lt__ (self, value) -> Predicate:
+    return self._condition('<', value)
+
+  def __le__ (self, value) -> Predicate:
+    return self._condition('<=', value)
+
+  def __gt__ (self, value) -> Predicate:
+    return self._condition('>', value)
+
+  def __ge__ (self, value) -> Predicate:
+    return self._condition('>=', value)
+
+  __hash__ = None
+
+  def between (self, low: Any, high: Any) -> Between:
+    '''
+    Closed range of values of the column
+
+    Parameters
+    ----------
+    low: Any
+      Minimum value (included)
+
+    high: Any
+      Maximum value (included)
+
+    Returns
+    -------
+    predicate: Between
+      Condition on the column
+    '''
+    return Between(self.name, low, high)
+
+  def isin (self, values: Iterable[Any]) -> In:
+    '''
+    Set of admitted values of the column
+
+    Parameters
+    ----------
+    values: Iterable
+      Admitted values
+
+    Returns
+    -------
+    predicate: In
+      Condition on the column
+    '''
+    return In(self.name, values)
+
+  def __repr__ (self) -> str:
+    return f'col({self.name!r})'
+
+def where_alternatives (
+  where: Union[None, Dict[str, str], List[Tuple[str, str]], Predicate]
+) -> List[List[Tuple[str, str]]]:
+  '''
+  Get the alternative conjunctions of conditions of the query
+
+  Parameters
+  ----------
+  where: dict or list or Predicate
+    Conditions of the query as dictionary, list of
+    (column, expression) pairs or predicate
+
+  Returns
+  -------
+  alternatives: list
+    List of (column, expression) lists, one for each query
+  '''
+  if isinstance(where, Predicate):
+    return where.compile()
+  if isinstance(where, dict):
+    return [list(where.items())]
+  return [list(where or [])]
@@ -0,0 +1,210 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import threading
+from typing import Optional
+
+from .utils import CRLF
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'ProgressReporter',
+  'progress_reporter',
+]
+
+class ProgressReporter (object):
+  '''
+  Progress of the queries in flight, shared by all the threads.
+
+  A single line with the number of queries in flight and the
+  aggregated records/sec and bytes/sec is refreshed by one
+  background thread, started at the first query and idle while
+  no query is running, so the concurrent queries do not start
+  any thread.
+  The line is written to the standard error, and only if it is
+  a terminal, so the logs and the piped outputs are untouched.
+
+  Parameters
+  ----------
+  interval : float (default := 0.1)
+    Seconds between two refreshes of the line
+
+  stream : file-like (default := None)
+    Output stream. If None, the current standard error is used
+
+  enabled : bool (default := None)
+    Display the progress. If None, it is displayed only if the
+    stream is a terminal
+  '''
+
+  _SYMBOLS = '|/-\\'
+
+  def __init__ (self, interval: float = 0.1, stream=None, enabled: Optional[bool] = None):
+    self.interval = interval
+    self._stream = stream
+    self._enabled = enabled
+    self._cond = threading.Condition()
+    self._active = 0
+    self._rows = 0
+    self._bytes = 0
+    self._since = 0.
+    self._shown = False
+    self._thread = None
+    self._pid = os.getpid()
+
+  @property
+  def stream (self):
+    '''
+    Get the output stream
+    '''
+    return self._stream if self._stream is not None else sys.stderr
+
+  @property
+  def enabled (self) -> bool:
+    '''
+    Check if the progress is displayed
+    '''
+    if self._enabled is not None:
+      return self._enabled
+    try:
+      return self.stream.isatty()
+    except (AttributeError, ValueError):
+      return False
+
+  @enabled.setter
+  def enabled (self, value: Optional[bool]):
+    '''
+    Enable or disable the progress (None to detect the terminal)
+    '''
+    self._enabled = value
+
+  @property
+  def active (self) -> int:
+    '''
+    Get the number of queries in flight
+    '''
+    return self._active
+
+  def begin (self) -> bool:
+    '''
+    Register a query in flight
+
+    Returns
+    -------
+    tracked: bool
+      True if the query is displayed, so end must be called
+    '''
+    if not self.enabled:
+      return False
+    with self._cond:
+      if self._active == 0:
+        # the rates refer to the current burst of queries
+        self._rows = self._bytes = 0
+        self._since = time.perf_counter()
+      self._active += 1
+      self._start()
+      self._cond.notify()
+    return True
+
+  def end (self):
+    '''
+    Unregister a query in flight
+    '''
+    with self._cond:
+      self._active = max(self._active - 1, 0)
+      if self._active == 0:
+        self._clear()
+
+  def add (self, rows: int = 0, nbytes: int = 0):
+    '''
+    Count the received records and bytes
+
+    Parameters
+    ----------
+    rows: int (default := 0)
+      Number of decoded records
+
+    nbytes: int (default := 0)
+      Number of received bytes
+    '''
+    with self._cond:
+      self._rows += rows
+      self._bytes += nbytes
+
+  def _start (self):
+    '''
+    Start the thread of the refreshes, if not running.
+    The processes created by fork do not inherit the thread
+    '''
+    if self._pid != os.getpid():
+      self._pid = os.getpid()
+      self._thread = None
+    if self._thread is None or not self._thread.is_alive():
+      self._thread = threading.Thread(target=self._run, name='trigger-progress', daemon=True)
+      self._thread.start()
+
+  def _clear (self):
+    '''
+    Erase the line of the progress
+    '''
+    if self._shown:
+      self._write(CRLF)
+      self._shown = False
+
+  def _write (self, text: str):
+    try:
+      self.stream.write(text)
+      self.stream.flush()
+    except (OSError, ValueError):
+      pass # closed stream
+
+  def _run (self):
+    '''
+    Refresh the line while any query is in flight
+    '''
+    idx = 0
+    while True:
+      with self._cond:
+        while self._active == 0:
+          self._cond.wait()
+        elapsed = max(time.perf_counter() - self._since, 1e-9)
+        self._write(
+          f'{CRLF}Analyzing... {self._SYMBOLS[idx % len(self._SYMBOLS)]} '
+          f'{self._active} queries | {self._rows / elapsed:,.0f} rows/s | '
+          f'{self._bytes / elapsed / 2 ** 20:.2f} MiB/s'
+        )
+        self._shown = True
+      idx += 1
+      time.sleep(self.interval)
+
+# process-wide instance
+_reporter = None
+_reporter_lock = threading.Lock()
+
+def progress_reporter () -> ProgressReporter:
+  '''
+  Get the progress reporter shared by all the queries of the process
+
+  Returns
+  -------
+  reporter: ProgressReporter
+    Process-wide reporter
+
+  Examples
+  --------
+  Disable the progress of all the queries::
+
+    from trigger.progress import progress_reporter
+
+    progress_reporter().enabled = False
+  '''
+  global _reporter
+  with _reporter_lock:
+    if _reporter is None:
+      _reporter = ProgressReporter()
+    return _reporter
@@ -0,0 +1,383 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import re
+from datetime import datetime
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Optional
+
+from .resultset import ResultSet
+from .resultset import column_dtype
+from .resultset import parse_aggregate
+from .resultset import assemble_timestamps
+from .predicates import where_alternatives
+from .lazy import column_domain
+from .lazy import separated_by
+from .lazy import aggregate
+from ._timerange import TIME_COLUMNS
+from ._timerange import range_conditions
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'Resampler',
+  'parse_rule',
+]
+
+# width of the buckets as number and unit
+_RULE = re.compile(r'^\s*(\d*)\s*(s|min|h|d)\s*$')
+# calendar column and duration of each unit
+_UNITS = {
+  's': ('second', timedelta(seconds=1)),
+  'min': ('minute', timedelta(minutes=1)),
+  'h': ('hour', timedelta(hours=1)),
+  'd': ('day', timedelta(days=1)),
+}
+# average number of records of a bucket below which the
+# records are aggregated locally instead of by the server
+MIN_BUCKET_ROWS = 50
+
+def _numpy ():
+  '''
+  Import NumPy for the local aggregation
+  '''
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError('NumPy is required for the resampling: pip install numpy')
+  return np
+
+def parse_rule (rule: str) -> Tuple[timedelta, str]:
+  '''
+  Get the width of the buckets of the resampling
+
+  Parameters
+  ----------
+  rule: str
+    Width of the buckets as number and unit ('s', 'min', 'h'
+    or 'd'), e.g. '15min' or '1h'
+
+  Returns
+  -------
+  step: timedelta
+    Width of the buckets
+
+  level: str
+    Calendar column of the unit
+
+  Examples
+  --------
+  >>> parse_rule('15min')
+  (datetime.timedelta(seconds=900), 'minute')
+  '''
+  match = _RULE.match(rule)
+  if not match or match.group(1) == '0':
+    raise ValueError(f"Invalid rule '{rule}'. Use a number followed by one of {list(_UNITS)}, e.g. '1h'")
+  level, unit = _UNITS[match.group(2)]
+  return int(match.group(1) or 1) * unit, level
+
+def _calendar (timestamps, levels: List[str]) -> Dict[str, Any]:
+  '''
+  Split the timestamps into the calendar columns
+
+  Parameters
+  ----------
+  timestamps: numpy.ndarray
+    Array of datetime64 values
+
+  levels: list
+    Calendar columns to compute
+
+  Returns
+  -------
+  columns: dict
+    Integer array of each calendar column
+  '''
+  np = _numpy()
+  units = {'year': 'Y', 'month': 'M', 'day': 'D', 'hour': 'h', 'minute': 'm', 'second': 's', 'microsecond': 'us'}
+  floors = {col: timestamps.astype(f'datetime64[{unit}]') for col, unit in units.items()}
+  res = {}
+  prev = None
+  for col in TIME_COLUMNS:
+    if col not in levels:
+      break
+    if prev is None:
+      res[col] = floors[col].astype(np.int64) + 1970
+    else:
+      offset = 1 if col in ('month', 'day') else 0
+      res[col] = (floors[col] - floors[prev]).astype(np.int64) + offset
+    prev = col
+  return res
+
+class Resampler (object):
+  '''
+  Aggregation of the records of the query in time buckets.
+
+  The aggregated functions of each bucket are computed by the
+  server, with a request for each bucket (and account, if the
+  grouping column is set) run concurrently over the pool of
+  connections, so only a record for each bucket is transferred.
+  If the buckets are too small to be worth a request, or they
+  can not be expressed as conditions on the calendar columns,
+  the records are retrieved and aggregated locally with
+  vectorized operations (NumPy is required).
+
+  Parameters
+  ----------
+  builder: QueryBuilder
+    Query to resample, with the time range set by between
+
+  rule: str
+    Width of the buckets as number and unit ('s', 'min', 'h'
+    or 'd'), e.g. '15min' or '1h'
+
+  by: str (default := None)
+    Column of the grouping of the buckets, e.g. 'email'
+
+  Examples
+  --------
+  Example of the hourly means of two accounts::
+
+    from trigger import TriggerDB
+    from trigger import col
+
+    with TriggerDB() as db:
+      rs = (
+        db.from_('myair')
+          .where(col('email').isin(['DE000086', 'DE000087']))
+          .between('2025-09-01', '2025-10-01')
+          .resample('1h', by='email')
+          .agg(pm25='AVG', pm10='MAX')
+      )
+      df = rs.to_pandas(timestamp_index=True)
+  '''
+
+  def __init__ (self, builder, rule: str, by: Optional[str] = None):
+    if builder._range is None:
+      raise ValueError('The resampling requires the time range of the query: use between(start, end)')
+    self.db = builder.db
+    self.table = builder.table
+    self.where = builder._where
+    self.start, self.end, _ = builder._range
+    self.step, self.level = parse_rule(rule)
+    self.levels = [col for col in self.db._keyset_columns(self.table) if col != 'microsecond']
+    if self.level not in self.levels:
+      raise ValueError(f"The rule '{rule}' is finer than the timestamps of the table '{self.table}'")
+    self.levels = self.levels[:self.levels.index(self.level) + 1]
+    if by is not None and (by in TIME_COLUMNS or by not in self.db._available_tables[self.table]):
+      raise ValueError(f"Invalid grouping column '{by}' for the table '{self.table}'")
+    self.by = by
+
+  def _aligned (self, moment: datetime) -> bool:
+    '''
+    Check if the time is at the beginning of a unit of the rule
+    '''
+    finer = TIME_COLUMNS[TIME_COLUMNS.index(self.level) + 1:]
+    return all(getattr(moment, col) == 0 for col in finer)
+
+  def _requests (self, buckets: List[datetime]) -> Optional[List[Tuple[Any, datetime, List[Tuple[str, str]]]]]:
+    '''
+    Get the conditions of the aggregated request of each
+    bucket and group
+
+    Parameters
+    ----------
+    buckets: list
+      Beginning of each bucket
+
+    Returns
+    -------
+    requests: list
+      Group value, bucket and conditions of each request, or
+      None if the buckets can not be sent to the server
+    '''
+    if not (self._aligned(self.start) and self._aligned(self.end)):
+      return None
+
+    bucket_conds = []
+    for start in buckets:
+      conds = range_conditions(start, min(start + self.step, self.end), self.levels)
+      # the partial aggregates of a bucket split in more queries can not be merged
+      if len(conds) != 1:
+        return None
+      bucket_conds.append(conds[0])
+
+    alternatives = where_alternatives(self.where)
+    # the partial aggregates of the alternatives can not be merged
+    if not separated_by(alternatives, [] if self.by is None else [self.by]):
+      return None
+    requests = []
+    seen = set()
+    for conds in alternatives:
+      values = [None] if self.by is None else column_domain(conds, self.by)
+      if values is None or seen & set(values):
+        return None
+      seen.update(values)
+      for value in values:
+        extra = [] if value is None else [(self.by, f'={value}')]
+        requests.extend((value, start, conds + extra + bconds) for start, bconds in zip(buckets, bucket_conds))
+    return requests
+
+  def _run (self, func, items: list, workers: Optional[int]) -> list:
+    '''
+    Run the function on the items over the pool of connections
+    '''
+    workers = workers or self.db._session_kwargs['pool_size']
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as executor:
+      return list(executor.map(func, items))
+
+  def _count (self, workers: Optional[int]) -> int:
+    '''
+    Get the number of records of the query in the time range
+    '''
+    queries = [
+      conds + rconds
+      for conds in where_alternatives(self.where)
+      for rconds in range_conditions(self.start, self.end, self.levels)
+    ]
+    counts = self._run(
+      lambda conds: self.db.select(table=self.table, columns=['COUNT(*)'], where=conds, columnar=False),
+      queries,
+      workers,
+    )
+    return sum((rows[0].get('COUNT(*)') or 0) if rows else 0 for rows in counts)
+
+  def _remote (self, requests: list, aggregates: List[str], workers: Optional[int]) -> Dict[str, Any]:
+    '''
+    Send an aggregated request for each bucket
+    '''
+    np = _numpy()
+    columns = list(dict.fromkeys(aggregates + ['COUNT(*)']))
+    results = self._run(
+      lambda req: self.db.select(table=self.table, columns=columns, where=req[2], columnar=False),
+      requests,
+      workers,
+    )
+    # the empty buckets are discarded
+    found = [(value, start, rows[0]) for (value, start, _), rows in zip(requests, results) if rows and rows[0].get('COUNT(*)')]
+
+    res = {}
+    if self.by is not None:
+      res[self.by] = np.array([value for value, _, _ in found], dtype=object if column_dtype(self.by) == 'str' else None)
+    res['_bucket'] = np.array([start for _, start, _ in found], dtype='datetime64[us]')
+    for col in aggregates:
+      dtype = np.int64 if parse_aggregate(col)[0] == 'COUNT' else np.float64
+      res[col] = np.array([np.nan if row.get(col) is None else row[col] for _, _, row in found], dtype=dtype)
+    return res
+
+  def _local (self, aggregates: List[str], workers: Optional[int]) -> Dict[str, Any]:
+    '''
+    Retrieve the records and aggregate them in the buckets
+    '''
+    np = _numpy()
+    # the finer columns are needed to split the records of unaligned buckets
+    levels = self.levels if self._aligned(self.start) else self.db._keyset_columns(self.table)
+    needed = set(levels) | {parse_aggregate(col)[1] for col in aggregates} - {'*'}
+    if self.by is not None:
+      needed.add(self.by)
+    fetch = [col for col in self.db._available_tables[self.table] if col in needed]
+    data = self.db.range_select(
+      table=self.table,
+      start=self.start,
+      end=self.end,
+      columns=fetch,
+      where=self.where,
+      resolution=self.level,
+      workers=workers or 1,
+      columnar=True,
+    ).to_numpy()
+
+    origin = np.datetime64(self.start, 'us')
+    step = np.timedelta64(self.step, 'us')
+    data['_bucket'] = (assemble_timestamps(data) - origin) // step if len(data[fetch[0]]) else np.empty(0, dtype=np.int64)
+    keys = ([self.by] if self.by is not None else []) + ['_bucket']
+    res = aggregate(data, keys=keys, aggregates=aggregates)
+    res['_bucket'] = origin + res['_bucket'].astype(np.int64) * step
+    return res
+
+  def agg (
+    self,
+    *aggregates: str,
+    min_rows: int = MIN_BUCKET_ROWS,
+    workers: Optional[int] = None,
+    **functions: Union[str, List[str]],
+  ) -> ResultSet:
+    '''
+    Compute the aggregated functions of each bucket
+
+    Parameters
+    ----------
+    *aggregates: str
+      Aggregated columns, e.g. 'COUNT(*)'
+
+    min_rows: int (default := MIN_BUCKET_ROWS)
+      Average number of records of a bucket below which the
+      records are retrieved and aggregated locally, since a
+      request for each bucket is not worth it.
+      The average is estimated with a single COUNT request
+
+    workers: int (default := None)
+      Number of concurrent requests.
+      If None, the size of the pool of connections is used
+
+    **functions: str or list
+      Aggregated functions of each column, e.g. pm25='AVG'
+      or pm10=['MIN', 'MAX']
+
+    Returns
+    -------
+    rs: ResultSet
+      Calendar columns of the beginning of the non-empty
+      buckets (down to the unit of the rule, or to the seconds
+      if the range is not aligned to it), grouping column
+      (if any) and aggregated values, sorted by group and time
+    '''
+    np = _numpy()
+    columns = list(aggregates)
+    for col, funcs in functions.items():
+      for func in [funcs] if isinstance(funcs, str) else funcs:
+        columns.append(f'{func.upper()}({col})')
+    if not columns:
+      raise ValueError('The resampling requires at least one aggregated function')
+    for col in columns:
+      if parse_aggregate(col) is None:
+        raise ValueError(f"Invalid aggregated column '{col}'")
+      self.db._check_column(table=self.table, column=col)
+
+    buckets = []
+    start = self.start
+    while start < self.end:
+      buckets.append(start)
+      start += self.step
+
+    requests = self._requests(buckets) if buckets else []
+    if requests:
+      total = self._count(workers)
+      if total / len(requests) < min_rows:
+        requests = None
+    if requests:
+      data = self._remote(requests, columns, workers)
+    elif buckets:
+      data = self._local(columns, workers)
+    else:
+      data = {'_bucket': np.empty(0, dtype='datetime64[us]'), **{col: np.empty(0) for col in columns}}
+      if self.by is not None:
+        data[self.by] = np.empty(0, dtype=object)
+
+    keys = ([self.by] if self.by is not None else []) + ['_bucket']
+    order = np.lexsort([data[key] for key in reversed(keys)])
+    # the buckets of an unaligned range begin within the unit of the rule
+    levels = self.levels if self._aligned(self.start) else [col for col in TIME_COLUMNS if col != 'microsecond']
+    res = _calendar(data['_bucket'][order], levels)
+    if self.by is not None:
+      res[self.by] = data[self.by][order]
+    for col in columns:
+      res[col] = data[col][order]
+    return ResultSet.from_columns(res)
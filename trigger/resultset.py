@@ -0,0 +1,496 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import re
+import math
+from array import array
+from collections.abc import Mapping
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Iterable
+from typing import Iterator
+from typing import Sequence
+from typing import Optional
+
+from ._timerange import TIME_COLUMNS
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'ResultSet',
+  'Row',
+  'column_dtype',
+  'parse_aggregate',
+  'assemble_timestamps',
+]
+
+# columns stored as strings
+_STRING_COLUMNS = {'email', 'created_at', 'last_login'}
+# columns stored as integers
+_INTEGER_COLUMNS = set(TIME_COLUMNS) | {'id', 'userId'}
+# aggregated column as FUNC(column)
+AGGREGATE = re.compile(r'^([A-Z]+)\((\w+|\*)\)$', re.IGNORECASE)
+
+def parse_aggregate (column: str) -> Optional[Tuple[str, str]]:
+  '''
+  Split the aggregated column into function and column
+
+  Parameters
+  ----------
+  column: str
+    Column name, e.g. 'AVG(pm25)'
+
+  Returns
+  -------
+  aggregate: tuple
+    Function (upper case) and column, or None if the column
+    is not aggregated
+  '''
+  match = AGGREGATE.match(column.strip())
+  if not match:
+    return None
+  return match.group(1).upper(), match.group(2)
+
+def column_dtype (column: str) -> str:
+  '''
+  Get the storage type of the column
+
+  Parameters
+  ----------
+  column: str
+    Name of the column (or aggregated function)
+
+  Returns
+  -------
+  dtype: str
+    Type code of the array module ('q' for integers, 'd' for floats)
+    or 'str' for the string columns
+  '''
+  parsed = parse_aggregate(column)
+  if parsed is not None:
+    return 'q' if parsed[0] == 'COUNT' else 'd'
+  if column in _STRING_COLUMNS:
+    return 'str'
+  if column in _INTEGER_COLUMNS:
+    return 'q'
+  return 'd'
+
+def assemble_timestamps (data: Union[Mapping, Sequence[dict]]):
+  '''
+  Combine the calendar columns of the records into a single
+  array of timestamps, using vectorized operations
+
+  Parameters
+  ----------
+  data: ResultSet or dict or list
+    Columns of the records as mapping of sequences (e.g. a
+    ResultSet) or list of records.
+    The missing calendar columns are set to their minimum value
+
+  Returns
+  -------
+  timestamps: numpy.ndarray
+    Array of datetime64[us] values.
+    NaT is used for the records with missing values
+
+  Examples
+  --------
+  >>> assemble_timestamps({'year': [2025], 'month': [9], 'day': [10], 'hour': [8]})
+  array(['2025-09-10T08:00:00.000000'], dtype='datetime64[us]')
+  '''
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError('NumPy is required for the timestamps: pip install numpy')
+
+  if not isinstance(data, (Mapping, ResultSet)):
+    data = ResultSet.from_rows(data, columns=[col for col in TIME_COLUMNS if data and col in data[0]])
+  columns = data.columns if isinstance(data, ResultSet) else list(data.keys())
+  if 'year' not in columns:
+    raise ValueError('The year column is required for the timestamps')
+
+  size = len(data['year'])
+  missing = np.zeros(size, dtype=bool)
+
+  def _values (col: str, default: int):
+    if col not in columns:
+      return np.full(size, default, dtype=np.int64)
+    values = np.asarray(data[col])
+    if values.dtype.kind == 'f':
+      nan = np.isnan(values)
+      missing[:] |= nan
+      values = np.where(nan, default, values)
+    return values.astype(np.int64, copy=False)
+
+  months = (_values('year', 1970) - 1970) * 12 + _values('month', 1) - 1
+  timestamps = months.astype('datetime64[M]').astype('datetime64[us]')
+  timestamps += (_values('day', 1) - 1).astype('timedelta64[D]')
+  timestamps += _values('hour', 0).astype('timedelta64[h]')
+  timestamps += _values('minute', 0).astype('timedelta64[m]')
+  timestamps += _values('second', 0).astype('timedelta64[s]')
+  timestamps += _values('microsecond', 0).astype('timedelta64[us]')
+  timestamps[missing] = np.datetime64('NaT')
+  return timestamps
+
+class Row (Mapping):
+  '''
+  Lazy view of a record of the ResultSet
+
+  Parameters
+  ----------
+  rs: ResultSet
+    Result set of the record
+
+  idx: int
+    Index of the record
+  '''
+
+  __slots__ = ('_rs', '_idx')
+
+  def __init__ (self, rs, idx: int):
+    self._rs = rs
+    self._idx = idx
+
+  def __getitem__ (self, column: str):
+    return self._rs._data[column][self._idx]
+
+  def __iter__ (self) -> Iterator[str]:
+    return iter(self._rs.columns)
+
+  def __len__ (self) -> int:
+    return len(self._rs.columns)
+
+  def as_dict (self) -> dict:
+    '''
+    Get the record as dictionary
+
+    Returns
+    -------
+    row: dict
+      Values of the record for each column
+    '''
+    return {col: self[col] for col in self._rs.columns}
+
+  def __repr__ (self) -> str:
+    return f'Row({self.as_dict()})'
+
+class ResultSet (object):
+  '''
+  Memory-compact columnar container of the query results
+
+  Each column is stored as a typed array, with the type
+  inferred from the table schema: integers for the timestamp
+  and identifier columns, floats for the measures and lists of
+  (interned) strings for the text columns.
+  Missing values of the numerical columns are stored as NaN.
+
+  Parameters
+  ----------
+  columns: list
+    Names of the columns
+
+  Examples
+  --------
+  Example of a columnar query::
+
+    from trigger import TriggerDB
+
+    with TriggerDB(columnar=True) as db:
+      rs = db.select('myair', columns=['hour', 'pm25'], limit=10_000)
+
+    print(len(rs), rs['pm25'][:10])
+    df = rs.to_pandas()
+  '''
+
+  def __init__ (self, columns: List[str]):
+    self.columns = list(columns)
+    self._data: Dict[str, Union[array, list]] = {}
+    self._intern: Dict[str, dict] = {}
+    for col in self.columns:
+      dtype = column_dtype(col)
+      if dtype == 'str':
+        self._data[col] = []
+        self._intern[col] = {}
+      else:
+        self._data[col] = array(dtype)
+    self._size = 0
+
+  @classmethod
+  def from_rows (cls, rows: Iterable[dict], columns: List[str] = None):
+    '''
+    Build the result set from the records
+
+    Parameters
+    ----------
+    rows: Iterable[dict]
+      Records to store, also as generator
+
+    columns: list (default := None)
+      Names of the columns.
+      If None, the keys of the first record are used
+
+    Returns
+    -------
+    rs: ResultSet
+      Columnar result set
+    '''
+    rows = iter(rows)
+    if columns is None:
+      first = next(rows, None)
+      rs = cls(list(first.keys()) if first is not None else [])
+      if first is not None:
+        rs.append(first)
+    else:
+      rs = cls(columns)
+    rs.extend(rows)
+    return rs
+
+  @classmethod
+  def from_columns (cls, data: Mapping):
+    '''
+    Build the result set from the values of each column
+
+    Parameters
+    ----------
+    data: Mapping
+      Values of each column as sequence or NumPy array,
+      all of the same length
+
+    Returns
+    -------
+    rs: ResultSet
+      Columnar result set
+    '''
+    rs = cls(list(data.keys()))
+    sizes = {len(values) for values in data.values()}
+    if len(sizes) > 1:
+      raise ValueError('The columns must have the same length')
+    for col, values in data.items():
+      if isinstance(rs._data[col], list):
+        rs._data[col] = [None if val is None else rs._intern[col].setdefault(val, val) for val in values]
+        continue
+      kind = getattr(getattr(values, 'dtype', None), 'kind', None)
+      if kind in ('i', 'u', 'b'):
+        rs._data[col] = array('q', values.astype('int64').tobytes())
+      elif kind == 'f':
+        rs._data[col] = array('d', values.astype('float64').tobytes())
+      else:
+        rs._data[col] = ResultSet.from_rows(({col: val} for val in values), columns=[col])._data[col]
+    rs._size = sizes.pop() if sizes else 0
+    return rs
+
+  def append (self, row: dict, constants: Optional[dict] = None):
+    '''
+    Append a record to the result set
+
+    Parameters
+    ----------
+    row: dict
+      Values of the record for each column
+
+    constants: dict (default := None)
+      Values of the columns missing in the record
+    '''
+    for col, values in self._data.items():
+      val = row.get(col) if constants is None or col in row else constants.get(col)
+      if isinstance(values, list):
+        if val is not None and col in self._intern:
+          val = self._intern[col].setdefault(val, val)
+        values.append(val)
+        continue
+      if val is None:
+        # integers can not represent missing values
+        if values.typecode == 'q':
+          values = self._data[col] = array('d', values)
+        val = math.nan
+      elif isinstance(val, (str, bytes)):
+        # the values are stored as they are, never parsed
+        values = self._data[col] = [None if math.isnan(v) else v for v in values]
+        values.append(val)
+        continue
+      try:
+        values.append(val)
+      except BufferError:
+        # the column is exported by to_numpy: the exported arrays
+        # keep the previous records and the column is copied
+        self._data[col] = self._append_number(array(values.typecode, values), val)
+      except (TypeError, OverflowError):
+        self._data[col] = self._append_number(values, val)
+    self._size += 1
+
+  @staticmethod
+  def _append_number (values: array, val) -> array:
+    '''
+    Append the number to the column, promoting the integers
+    to floats for the fractional or too large values
+
+    Parameters
+    ----------
+    values: array
+      Values of the column, not exported
+
+    val: int or float
+      Value to append
+
+    Returns
+    -------
+    values: array
+      Values of the column with the appended value
+    '''
+    try:
+      values.append(val)
+    except (TypeError, OverflowError):
+      if values.typecode == 'q':
+        values = array('d', values)
+      values.append(float(val))
+    return values
+
+  def extend (self, rows: Iterable[dict], constants: Optional[dict] = None):
+    '''
+    Append the records to the result set
+
+    Parameters
+    ----------
+    rows: Iterable[dict]
+      Records to append, also as generator
+
+    constants: dict (default := None)
+      Values of the columns missing in the records,
+      e.g. the account of the records
+    '''
+    for row in rows:
+      self.append(row, constants=constants)
+
+  def __len__ (self) -> int:
+    return self._size
+
+  def __iter__ (self) -> Iterator[Row]:
+    return (Row(self, idx) for idx in range(self._size))
+
+  def __getitem__ (self, key):
+    '''
+    Get a column (by name), a subset of columns (by list of names),
+    a record (by index) or a subset of records (by slice)
+    '''
+    if isinstance(key, str):
+      return self._data[key]
+    if isinstance(key, (list, tuple)):
+      rs = ResultSet.__new__(ResultSet)
+      rs.columns = list(key)
+      # the columns are shared, not copied
+      rs._data = {col: self._data[col] for col in key}
+      rs._intern = {col: self._intern[col] for col in key if col in self._intern}
+      rs._size = self._size
+      return rs
+    if isinstance(key, slice):
+      rs = ResultSet.__new__(ResultSet)
+      rs.columns = list(self.columns)
+      rs._data = {col: values[key] for col, values in self._data.items()}
+      rs._intern = self._intern
+      rs._size = len(range(*key.indices(self._size)))
+      return rs
+    if key < 0:
+      key += self._size
+    if not 0 <= key < self._size:
+      raise IndexError('ResultSet index out of range')
+    return Row(self, key)
+
+  def __repr__ (self) -> str:
+    return f'ResultSet(columns={self.columns}, rows={self._size})'
+
+  def nbytes (self) -> int:
+    '''
+    Get the memory occupied by the numerical columns
+
+    Returns
+    -------
+    nbytes: int
+      Number of bytes of the arrays
+    '''
+    return sum(
+      values.itemsize * len(values)
+      for values in self._data.values()
+      if isinstance(values, array)
+    )
+
+  def to_list (self) -> List[dict]:
+    '''
+    Get the records as list of dictionaries
+
+    Returns
+    -------
+    rows: list
+      Records of the result set
+    '''
+    return [row.as_dict() for row in self]
+
+  def to_numpy (self, column: str = None):
+    '''
+    Get the columns as NumPy arrays.
+    The numerical columns share the memory of the result set,
+    until records are appended: the appended records are stored
+    in a copy of the column, not seen by the exported arrays.
+
+    Parameters
+    ----------
+    column: str (default := None)
+      Name of the column to get.
+      If None, all the columns are returned
+
+    Returns
+    -------
+    arr: numpy.ndarray or dict
+      Array of the column or dictionary of arrays for each column
+    '''
+    try:
+      import numpy as np
+    except ImportError:
+      raise ImportError('NumPy is required for the conversion: pip install numpy')
+
+    def _convert (values):
+      if isinstance(values, list):
+        return np.array(values, dtype=object)
+      dtype = np.int64 if values.typecode == 'q' else np.float64
+      return np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype=dtype)
+
+    if column is not None:
+      return _convert(self._data[column])
+    return {col: _convert(values) for col, values in self._data.items()}
+
+  def timestamps (self):
+    '''
+    Get the timestamps of the records, combining the calendar
+    columns with vectorized operations
+
+    Returns
+    -------
+    timestamps: numpy.ndarray
+      Array of datetime64[us] values
+    '''
+    return assemble_timestamps(self)
+
+  def to_pandas (self, timestamp_index: bool = False):
+    '''
+    Get the result set as pandas DataFrame.
+    The numerical columns share the memory of the result set
+    when possible.
+
+    Parameters
+    ----------
+    timestamp_index: bool (default := False)
+      Use the timestamps of the records as index
+
+    Returns
+    -------
+    df: pandas.DataFrame
+      DataFrame of the records
+    '''
+    try:
+      import pandas as pd
+    except ImportError:
+      raise ImportError('pandas is required for the conversion: pip install pandas')
+    index = pd.DatetimeIndex(self.timestamps(), name='timestamp') if timestamp_index else None
+    return pd.DataFrame(self.to_numpy(), columns=self.columns, index=index, copy=False)
@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import threading
+from typing import Optional
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'AdaptiveLimiter',
+  'backoff_delay',
+]
+
+def backoff_delay (attempt: int, base: float = 0.5, cap: float = 30., retry_after: Optional[str] = None) -> float:
+  '''
+  Get the waiting time before the next attempt of a request,
+  as exponential backoff with full jitter
+
+  Parameters
+  ----------
+  attempt: int
+    Number of attempts already performed (starting from 0)
+
+  base: float (default := 0.5)
+    Base delay in seconds
+
+  cap: float (default := 30)
+    Maximum delay in seconds
+
+  retry_after: str (default := None)
+    Value of the Retry-After header of the response, if any
+
+  Returns
+  -------
+  delay: float
+    Waiting time in seconds
+  '''
+  delay = random.uniform(0, min(cap, base * 2 ** attempt))
+  # the server asked for a specific delay
+  if retry_after is not None:
+    try:
+      delay = max(delay, min(cap, float(retry_after)))
+    except ValueError:
+      pass
+  return delay
+
+class AdaptiveLimiter (object):
+  '''
+  Adaptive limit of the concurrent requests, following an
+  additive-increase/multiplicative-decrease (AIMD) policy:
+  the limit grows by one every window of successful requests
+  and it is cut as soon as the server is overloaded
+  (429/5xx responses or timeouts).
+  An optional cap on the number of requests per second is
+  also applied.
+
+  Parameters
+  ----------
+  initial : int (default := 8)
+    Initial number of concurrent requests
+
+  minimum : int (default := 1)
+    Minimum number of concurrent requests
+
+  maximum : int (default := 64)
+    Maximum number of concurrent requests
+
+  decrease : float (default := 0.5)
+    Multiplicative factor applied to the limit on overload
+
+  max_rate : float (default := None)
+    Maximum number of requests started per second.
+    If None, the rate is not limited
+
+  cooldown : float (default := 1)
+    Minimum time in seconds between two decreases, so a burst
+    of failures of the requests in flight cuts the limit once
+
+  Examples
+  --------
+  Example of a throttled connection for bulk workloads::
+
+    from trigger import TriggerDB
+    from trigger import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(initial=4, maximum=16, max_rate=50)
+
+    with TriggerDB(pool_size=16, throttle=limiter) as db:
+      res = db.from_('ecg').where(month='=9').parallel(workers=16).fetch()
+  '''
+
+  def __init__ (
+    self,
+    initial : int = 8,
+    minimum : int = 1,
+    maximum : int = 64,
+    decrease : float = 0.5,
+    max_rate : Optional[float] = None,
+    cooldown : float = 1.,
+  ):
+    if not 1 <= minimum <= initial <= maximum:
+      raise ValueError('The limits must satisfy 1 <= minimum <= initial <= maximum')
+    if not 0 < decrease < 1:
+      raise ValueError('The decrease factor must be in the range (0, 1)')
+
+    self.limit = float(initial)
+    self.minimum = minimum
+    self.maximum = maximum
+    self.decrease = decrease
+    self.max_rate = max_rate
+    self.cooldown = cooldown
+
+    self._in_flight = 0
+    self._next_start = 0.
+    self._last_decrease = 0.
+    self._cond = threading.Condition()
+
+  def acquire (self):
+    '''
+    Wait for a free slot for a new request
+    '''
+    with self._cond:
+      while self._in_flight >= int(self.limit):
+        self._cond.wait()
+      self._in_flight += 1
+
+      wait = 0.
+      if self.max_rate:
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1. / self.max_rate
+        wait = start - now
+
+    if wait > 0:
+      time.sleep(wait)
+
+  def release (self, overloaded: bool = False):
+    '''
+    Release the slot of a completed request and
+    update the limit
+
+    Parameters
+    ----------
+    overloaded: bool (default := False)
+      True if the server was overloaded by the request
+    '''
+    with self._cond:
+      self._in_flight -= 1
+      now = time.monotonic()
+      if overloaded:
+        if now - self._last_decrease >= self.cooldown:
+          self.limit = max(self.minimum, self.limit * self.decrease)
+          self._last_decrease = now
+      else:
+        # one more slot for each window of successful requests
+        self.limit = min(self.maximum, self.limit + 1. / self.limit)
+      self._cond.notify_all()
+
+  def stats (self) -> dict:
+    '''
+    Get the current status of the limiter
+
+    Returns
+    -------
+    stats: dict
+      Current limit and number of requests in flight
+    '''
+    with self._cond:
+      return {
+        'limit': int(self.limit),
+        'in_flight': self._in_flight,
+      }
@@ -0,0 +1,370 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import io
+import gzip
+import json
+import time
+import random
+import threading
+from pathlib import Path
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Union
+from typing import Optional
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'Cassette',
+  'FaultInjector',
+  'CassetteAdapter',
+]
+
+# version of the format of the cassettes
+_CASSETTE_VERSION = 1
+# modes of the transport
+TRANSPORT_MODES = ('record', 'replay')
+# session token stored in the cassettes in place of the real one
+RECORDED_TOKEN = 'recorded-session-token'
+
+def _request_key (method: str, url: str) -> str:
+  '''
+  Get the key of the request, independent of the host and of
+  the order of the parameters.
+  The bodies of the requests (credentials and tokens) are not
+  part of the key, so they are never stored
+
+  Parameters
+  ----------
+  method: str
+    HTTP method of the request
+
+  url: str
+    Full url of the request
+
+  Returns
+  -------
+  key: str
+    Method and normalized path of the request
+  '''
+  parts = urlsplit(url)
+  query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+  return f'{method.upper()} {parts.path}' + (f'?{query}' if query else '')
+
+def _response_entry (resp: requests.Response) -> dict:
+  '''
+  Get the status code, the content type and the body of the
+  received response
+  '''
+  return {
+    'status': resp.status_code,
+    'content_type': resp.headers.get('Content-Type'),
+    'body': resp.content.decode('utf-8', errors='replace'),
+  }
+
+class Cassette (object):
+  '''
+  On-disk collection of the HTTP exchanges with the server.
+
+  The responses of each request are stored in the order in
+  which they are received and replayed in the same order; the
+  last one is repeated when they are exhausted.
+  The session token of the login is replaced by a placeholder,
+  so the cassette can be shared as test fixture.
+  The cassette is a gzip-compressed JSON file.
+
+  Parameters
+  ----------
+  path: str
+    Path of the cassette file
+
+  mode: str
+    'record' to store the exchanges (overwriting the file) or
+    'replay' to read them from the file
+  '''
+
+  def __init__ (self, path: Union[str, Path], mode: str):
+    if mode not in TRANSPORT_MODES:
+      raise ValueError(f"Invalid transport '{mode}'. Available values are: {list(TRANSPORT_MODES)}")
+
+    self.path = Path(path)
+    self.mode = mode
+    self.email: Optional[str] = None
+    self._lock = threading.Lock()
+    self._responses: Dict[str, List[dict]] = {}
+    self._played: Dict[str, int] = {}
+
+    if mode == 'replay':
+      if not self.path.exists():
+        raise ValueError(f'Cassette not found: {self.path}')
+      with gzip.open(self.path, 'rt', encoding='utf-8') as fp:
+        data = json.load(fp)
+      if data.get('version') != _CASSETTE_VERSION:
+        raise ValueError(f'Unsupported cassette version: {data.get("version")}')
+      self.email = data.get('email')
+      self._responses = data['responses']
+
+  def __len__ (self) -> int:
+    return sum(len(responses) for responses in self._responses.values())
+
+  def record (self, key: str, status: int, headers: dict, body: bytes) -> dict:
+    '''
+    Store the response of the request
+
+    Parameters
+    ----------
+    key: str
+      Key of the request
+
+    status: int
+      Status code of the response
+
+    headers: dict
+      Headers of the response
+
+    body: bytes
+      Body of the response
+
+    Returns
+    -------
+    entry: dict
+      Status code, content type and body of the response
+    '''
+    entry = {
+      'status': status,
+      'content_type': headers.get('Content-Type'),
+      'body': body.decode('utf-8', errors='replace'),
+    }
+    with self._lock:
+      self._responses.setdefault(key, []).append(entry)
+    return entry
+
+  def play (self, key: str) -> dict:
+    '''
+    Get the next stored response of the request
+
+    Parameters
+    ----------
+    key: str
+      Key of the request
+
+    Returns
+    -------
+    entry: dict
+      Status code, content type and body of the response
+    '''
+    with self._lock:
+      responses = self._responses.get(key)
+      if not responses:
+        raise ValueError(f'Request not found in the cassette {self.path}: {key}')
+      idx = self._played.get(key, 0)
+      self._played[key] = idx + 1
+      return responses[min(idx, len(responses) - 1)]
+
+  def save (self):
+    '''
+    Write the recorded exchanges to the file
+    '''
+    if self.mode != 'record':
+      return
+    with self._lock:
+      data = {
+        'version': _CASSETTE_VERSION,
+        'email': self.email,
+        'responses': self._responses,
+      }
+      self.path.parent.mkdir(parents=True, exist_ok=True)
+      tmp = self.path.with_name(self.path.name + '.tmp')
+      with gzip.open(tmp, 'wt', encoding='utf-8') as fp:
+        json.dump(data, fp, separators=(',', ':'))
+      tmp.replace(self.path)
+
+class FaultInjector (object):
+  '''
+  Random faults applied to the responses of the queries, for
+  the tests of the retries and of the error handling without a
+  faulty server.
+  The faults are never recorded in the cassette.
+
+  Parameters
+  ----------
+  latency: float or tuple (default := 0)
+    Delay of each response in seconds, as fixed value or
+    (min, max) range of uniform values
+
+  error_rate: float (default := 0)
+    Probability to replace the response with a server error
+
+  error_status: int (default := 503)
+    Status code of the injected errors
+
+  truncate_rate: float (default := 0)
+    Probability to truncate the body of the response at a
+    random position
+
+  seed: int (default := None)
+    Seed of the faults, for reproducible runs
+  '''
+
+  def __init__ (
+    self,
+    latency: Union[float, tuple] = 0,
+    error_rate: float = 0,
+    error_status: int = 503,
+    truncate_rate: float = 0,
+    seed: Optional[int] = None,
+  ):
+    for name, rate in (('error_rate', error_rate), ('truncate_rate', truncate_rate)):
+      if not 0 <= rate <= 1:
+        raise ValueError(f'The {name} must be in [0, 1]')
+    self.latency = latency if isinstance(latency, tuple) else (latency, latency)
+    self.error_rate = error_rate
+    self.error_status = error_status
+    self.truncate_rate = truncate_rate
+    self._rng = random.Random(seed)
+    self._lock = threading.Lock()
+
+  def draw (self) -> Tuple[float, bool, Optional[float]]:
+    '''
+    Draw the random faults of a response
+
+    Returns
+    -------
+    fault: tuple
+      Delay in seconds, error flag and relative position of
+      the truncation (None if the body is not truncated)
+    '''
+    with self._lock:
+      delay = self._rng.uniform(*self.latency)
+      error = self._rng.random() < self.error_rate
+      truncate = self._rng.random() < self.truncate_rate
+      cut = self._rng.random()
+    return delay, error, cut if truncate else None
+
+  def apply (self, entry: dict, fault: Optional[tuple] = None) -> dict:
+    '''
+    Apply the random faults to the response
+
+    Parameters
+    ----------
+    entry: dict
+      Status code, content type and body of the response
+
+    fault: tuple (default := None)
+      Faults given by draw.
+      If None, new faults are drawn
+
+    Returns
+    -------
+    entry: dict
+      Response with the faults
+    '''
+    delay, error, cut = fault if fault is not None else self.draw()
+
+    if delay > 0:
+      time.sleep(delay)
+    if error:
+      return {'status': self.error_status, 'content_type': 'text/plain', 'body': 'Injected server error'}
+    if cut is not None and entry['status'] == 200:
+      return dict(entry, body=entry['body'][:int(len(entry['body']) * cut)])
+    return entry
+
+class CassetteAdapter (BaseAdapter):
+  '''
+  Transport adapter of the session which records the exchanges
+  with the server into the cassette or replays them without
+  any connection
+
+  Parameters
+  ----------
+  adapter: requests.adapters.HTTPAdapter
+    Adapter of the connections to the server, used to record
+
+  cassette: Cassette
+    Cassette of the exchanges, shared by all the sessions.
+    If None, the requests are sent to the server
+
+  faults: FaultInjector (default := None)
+    Faults applied to the responses
+  '''
+
+  def __init__ (self, adapter: BaseAdapter, cassette: Optional[Cassette], faults: Optional[FaultInjector] = None):
+    super().__init__()
+    self._adapter = adapter
+    self._cassette = cassette
+    self._faults = faults
+
+  def send (self, request: requests.PreparedRequest, stream: bool = False, **kwargs) -> requests.Response:
+    key = _request_key(request.method, request.url)
+    # the login and the logout are never faulty
+    faults = self._faults if request.method == 'GET' else None
+
+    if self._cassette is None:
+      resp = self._adapter.send(request, stream=stream, **kwargs)
+      if faults is None:
+        return resp
+      fault = faults.draw()
+      delay, error, cut = fault
+      # only the faulty responses are buffered, the others keep streaming
+      if not error and (cut is None or resp.status_code != 200):
+        if delay > 0:
+          time.sleep(delay)
+        return resp
+      entry = _response_entry(resp)
+      return self._build_response(request, faults.apply(entry, fault))
+
+    if self._cassette.mode == 'replay':
+      entry = self._cassette.play(key)
+    else:
+      resp = self._adapter.send(request, stream=False, **kwargs)
+      entry = _response_entry(resp)
+      if key.endswith('/auth'):
+        # the session token is replaced, since it stays valid after
+        # the recording (e.g. without logout or with the token cache)
+        body = RECORDED_TOKEN.encode('utf-8') if resp.status_code == 200 else resp.content
+        self._cassette.record(key, resp.status_code, resp.headers, body)
+        if request.body:
+          # only the account is stored, never the password
+          data = request.body.decode('utf-8') if isinstance(request.body, bytes) else request.body
+          self._cassette.email = dict(parse_qsl(data)).get('email')
+      else:
+        self._cassette.record(key, resp.status_code, resp.headers, resp.content)
+
+    if faults is not None:
+      entry = faults.apply(entry)
+    return self._build_response(request, entry)
+
+  def _build_response (self, request: requests.PreparedRequest, entry: dict) -> requests.Response:
+    '''
+    Build the response of the stored exchange, readable
+    also as stream
+    '''
+    body = entry['body'].encode('utf-8')
+    resp = requests.Response()
+    resp.status_code = entry['status']
+    resp.headers = CaseInsensitiveDict({
+      'Content-Type': entry['content_type'] or 'text/plain',
+      'Content-Length': str(len(body)),
+    })
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.raw = io.BytesIO(body)
+    resp.url = request.url
+    resp.request = request
+    resp.connection = self
+    return resp
+
+  def close (self):
+    self._adapter.close()
+    if self._cassette is not None:
+      self._cassette.save()
@@ -1,17 +1,24 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-import sys
-import time
-import requests
+import re
+import json
+import codecs
 import platform
-import threading
+from typing import Iterable
+from typing import Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+  import requests
 
 __author__  = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
 
 __all__ = [
   'buffered_request',
+  'make_session',
+  'iter_json_array',
 
   'RESET_COLOR_CODE',
   'GREEN_COLOR_CODE',
@@ -30,28 +37,63 @@ RED_COLOR_CODE    = '\033[38;5;196m'
 VIOLET_COLOR_CODE = '\033[38;5;141m'
 CRLF              = '\r\x1B[K' if platform.system() != 'Windows' else '\r\x1b[2K'
 
-def _spinner (msg: str, stop_event: threading.Event):
+# blanks and separators between the items of a JSON array
+_JSON_SEPARATORS = re.compile(r'[ \t\n\r,]*')
+
+def make_session (pool_size: int = 10, keep_alive: bool = True, retries: int = 3, wrap_adapter=None) -> 'requests.Session':
   '''
-  Disply a rotating spinner
+  Create a HTTP session with a pool of persistent connections
 
   Parameters
   ----------
-  msg: str
-    Initial message to display before the spinner
+  pool_size: int (default := 10)
+    Maximum number of connections kept alive in the pool
+
+  keep_alive: bool (default := True)
+    Re-use the connections among consecutive requests.
+    If False, each connection is closed after its response
 
-  stop_event: threading.Event
-    Stop criteria of the infinite loop
+  retries: int (default := 3)
+    Number of retries on the connection errors.
+    The errors given by the server are managed by the caller
+
+  wrap_adapter: callable (default := None)
+    Function which wraps the adapter of the connections into
+    a custom transport (e.g. the record/replay cassettes)
+
+  Returns
+  -------
+  session: requests.Session
+    Session to use for the requests
   '''
-  symbols = '|/-\\'
-  idx = 0
-  while not stop_event.is_set():
-    sys.stdout.write(f'\r{msg} {symbols[idx % len(symbols)]}')
-    sys.stdout.flush()
-    idx += 1
-    time.sleep(0.1)
-  sys.stdout.write('\r' + ' ' * (len(msg) + 2) + '\r') # clean the line
-
-def buffered_request (url: str, **kwargs):
+  # requests is imported only when a connection is needed
+  import requests
+  from requests.adapters import HTTPAdapter
+  from urllib3.util.retry import Retry
+
+  retry = Retry(
+    total=retries,
+    connect=retries,
+    read=0,
+    status=0,
+    backoff_factor=0.5,
+    raise_on_status=False,
+  )
+  adapter = HTTPAdapter(
+    pool_connections=1, # a single host is used
+    pool_maxsize=pool_size,
+    max_retries=retry,
+  )
+  if wrap_adapter is not None:
+    adapter = wrap_adapter(adapter)
+  session = requests.Session()
+  session.mount('https://', adapter)
+  session.mount('http://', adapter)
+  if not keep_alive:
+    session.headers['Connection'] = 'close'
+  return session
+
+def buffered_request (url: str, session: 'requests.Session' = None, spinner: bool = True, **kwargs):
   '''
   Pretty layout for a GET request
 
@@ -60,6 +102,14 @@ def buffered_request (url: str, **kwargs):
   url: str
     Url for the request
 
+  session: requests.Session (default := None)
+    Session to use for the request.
+    If None, a new connection is opened
+
+  spinner: bool (default := True)
+    Display the request in the progress of the process
+    (see trigger.progress)
+
   kwargs: dict
     Parameters to pass to the request
 
@@ -68,14 +118,82 @@ def buffered_request (url: str, **kwargs):
   res: requests
     Response of the requests
   '''
-  stop_event = threading.Event()
-  t = threading.Thread(target=_spinner, args=('Analyzing...', stop_event))
-  t.start()
+  if session is None:
+    import requests
+    getter = requests.get
+  else:
+    getter = session.get
+  if not spinner:
+    return getter(url, **kwargs)
 
+  # a single reporter displays all the requests in flight
+  from .progress import progress_reporter
+  progress = progress_reporter()
+  tracked = progress.begin()
   try:
-    resp = requests.get(url, **kwargs) # send the request
+    resp = getter(url, **kwargs) # send the request
+    if tracked and not kwargs.get('stream', False):
+      progress.add(nbytes=len(resp.content))
+    return resp
   finally:
-    stop_event.set()
-    t.join()
+    if tracked:
+      progress.end()
+
+def iter_json_array (chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator:
+  '''
+  Decode incrementally the items of a JSON array received
+  as a stream of chunks.
+  Only the current chunk and the item under decoding are
+  kept in memory.
+
+  Parameters
+  ----------
+  chunks: Iterable[bytes]
+    Stream of the raw bytes of the JSON array
+
+  encoding: str (default := 'utf-8')
+    Encoding of the text
+
+  Returns
+  -------
+  items: Iterator
+    Generator of the decoded items of the array
+  '''
+  decoder = json.JSONDecoder()
+  text = codecs.getincrementaldecoder(encoding)()
+  buffer = ''
+  started, closed = False, False
+
+  for chunk in chunks:
+    buffer += text.decode(chunk)
+    pos = 0
+
+    while not closed:
+      pos = _JSON_SEPARATORS.match(buffer, pos).end()
+      if pos == len(buffer):
+        break
+      if not started:
+        if buffer[pos] != '[':
+          raise ValueError('The response is not a JSON array')
+        started = True
+        pos += 1
+        continue
+      if buffer[pos] == ']':
+        closed = True
+        pos += 1
+        break
+      try:
+        item, end = decoder.raw_decode(buffer, pos)
+      except json.JSONDecodeError:
+        break # wait for the rest of the item
+      # numbers and literals could be truncated by the chunk
+      if end == len(buffer) and not isinstance(item, (dict, list, str)):
+        break
+      yield item
+      pos = end
+
+    buffer = buffer[pos:]
 
-  return resp
+  buffer += text.decode(b'', final=True)
+  if not closed or buffer.strip():
+    raise ValueError('Truncated or invalid JSON array')
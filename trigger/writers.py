@@ -0,0 +1,200 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import textwrap
+from pathlib import Path
+from typing import List
+from typing import Union
+from typing import Iterable
+from typing import Optional
+
+from .resultset import column_dtype
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = [
+  'FORMATS',
+  'infer_format',
+  'write_json',
+  'write_ndjson',
+  'write_csv',
+  'write_parquet',
+]
+
+# extensions of the supported output formats
+_EXTENSIONS = {
+  '.json': 'json',
+  '.ndjson': 'ndjson',
+  '.jsonl': 'ndjson',
+  '.csv': 'csv',
+  '.parquet': 'parquet',
+  '.pq': 'parquet',
+}
+
+def infer_format (path: Optional[Union[str, Path]], default: str = 'json') -> str:
+  '''
+  Get the output format from the extension of the file
+
+  Parameters
+  ----------
+  path: str
+    Path of the output file.
+    If None, the default format is returned
+
+  default: str (default := 'json')
+    Format of the unknown extensions
+
+  Returns
+  -------
+  fmt: str
+    Name of the format
+  '''
+  if path is None:
+    return default
+  return _EXTENSIONS.get(Path(path).suffix.lower(), default)
+
+def write_json (batches: Iterable[List[dict]], file) -> int:
+  '''
+  Write the records as an indented JSON array while
+  they are received
+
+  Parameters
+  ----------
+  batches: Iterable[list]
+    Batches of records to write
+
+  file: file-like
+    Output text stream
+
+  Returns
+  -------
+  size: int
+    Number of records written
+  '''
+  size = 0
+  for batch in batches:
+    for row in batch:
+      file.write(',\n' if size else '[\n')
+      file.write(textwrap.indent(json.dumps(row, indent=2, sort_keys=True), '  '))
+      size += 1
+    file.flush()
+  file.write('\n]\n' if size else '[]\n')
+  file.flush()
+  return size
+
+def write_ndjson (batches: Iterable[List[dict]], file) -> int:
+  '''
+  Write the records as newline-delimited JSON, one
+  record for each line
+
+  Parameters
+  ----------
+  batches: Iterable[list]
+    Batches of records to write
+
+  file: file-like
+    Output text stream
+
+  Returns
+  -------
+  size: int
+    Number of records written
+  '''
+  size = 0
+  for batch in batches:
+    file.write(''.join(json.dumps(row) + '\n' for row in batch))
+    file.flush()
+    size += len(batch)
+  return size
+
+def write_csv (batches: Iterable[List[dict]], file) -> int:
+  '''
+  Write the records as CSV, with the header given by the
+  columns of the first record
+
+  Parameters
+  ----------
+  batches: Iterable[list]
+    Batches of records to write
+
+  file: file-like
+    Output text stream, opened with newline=''
+
+  Returns
+  -------
+  size: int
+    Number of records written
+  '''
+  writer = None
+  size = 0
+  for batch in batches:
+    if not batch:
+      continue
+    if writer is None:
+      writer = csv.DictWriter(file, fieldnames=list(batch[0].keys()), extrasaction='ignore')
+      writer.writeheader()
+    writer.writerows(batch)
+    file.flush()
+    size += len(batch)
+  return size
+
+def write_parquet (batches: Iterable[List[dict]], file, columns: Optional[List[str]] = None) -> int:
+  '''
+  Write the records as Parquet file, with a row group
+  for each batch.
+  The schema is given by the storage type of the columns
+  of the first record
+
+  Parameters
+  ----------
+  batches: Iterable[list]
+    Batches of records to write
+
+  file: str or file-like
+    Path of the output file or binary stream
+
+  columns: list (default := None)
+    Columns of the schema written without records.
+    If None, nothing is written without records
+
+  Returns
+  -------
+  size: int
+    Number of records written
+  '''
+  try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+  except ImportError:
+    raise ImportError('PyArrow is required for the Parquet format: pip install pyarrow')
+
+  types = {'q': pa.int64(), 'd': pa.float64(), 'str': pa.string()}
+  writer = None
+  size = 0
+  try:
+    for batch in batches:
+      if not batch:
+        continue
+      if writer is None:
+        schema = pa.schema([(col, types[column_dtype(col)]) for col in batch[0].keys()])
+        writer = pq.ParquetWriter(file, schema)
+      writer.write_table(pa.Table.from_pylist(batch, schema=writer.schema))
+      size += len(batch)
+    # a valid file without row groups
+    if writer is None and columns is not None:
+      writer = pq.ParquetWriter(file, pa.schema([(col, types[column_dtype(col)]) for col in columns]))
+  finally:
+    if writer is not None:
+      writer.close()
+  return size
+
+# writer of each output format
+FORMATS = {
+  'json': write_json,
+  'ndjson': write_ndjson,
+  'csv': write_csv,
+  'parquet': write_parquet,
+}